@@ -0,0 +1,362 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Local content addressed cache of build actions.
+
+The edges of the rules in `global_config.action_cache_rules`, such as
+archiving, linking, protoc and javac, run through the `action`
+builtin tool. It keys an edge by the hash of its command line, the content
+of its declared inputs (the implicit ones included) and the paths of its
+declared outputs. On a hit, the outputs are restored from the cache instead
+of running the command, otherwise the command is run and its outputs are
+stored. So switching branches back and forth doesn't build the same
+artifacts again.
+
+Ninja passes the command to the tool in the `${action_file}` response file,
+since it can't be quoted on the command line. A rule which has a response
+file already has its content in front of the command, separated by
+`_RSP_SEPARATOR`, and the tool writes it to the original response file.
+
+The cache is a directory which several users of the host can share:
+
+    <cache_dir>/<key[:2]>/<key>/outputs.json
+    <cache_dir>/<key[:2]>/<key>/<index of output>
+
+Entries are written to a temporary directory and renamed into place, with
+permissions which let the other users use and evict them. A hit touches the
+entry, and after a build which stored anything, the least recently used
+entries over the size limit are removed.
+
+Behind the local cache, a remote cache may be shared by the machines, see
+`remote_cache`. Its hits are also stored in the local cache.
+
+A command which reads files it doesn't declare, or whose outputs are not
+only decided by its inputs, must not be cached.
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import time
+
+from blade import config
+from blade import console
+
+
+_OUTPUTS_FILE = 'outputs.json'
+_TMP_DIR = 'tmp'
+_STORED_STAMP = '.stored'
+_EVICTED_STAMP = '.evicted'
+
+_RSP_SEPARATOR = ' __blade_action_command__ '
+
+# Written in the build dir when the remote cache can't be connected to
+_REMOTE_DOWN_STAMP = '.blade.remote_cache.down'
+
+# The permissions of the shared cache
+_DIR_MODE = 0o777
+_FILE_MODE = 0o666
+
+# The pseudo rule name of all gen_rule targets, which have their own rules
+GEN_RULE = 'gen_rule'
+_GEN_RULE_SUFFIX = '__rule__'
+
+_VERSION = 1
+
+
+def cache_dir():
+    """Return the absolute cache dir, or '' if the local cache is disabled."""
+    path = config.get_item('global_config', 'action_cache_dir')
+    if not path or os.name == 'nt':
+        return ''
+    return os.path.abspath(os.path.expanduser(path))
+
+
+def remote_cache_url():
+    """Return the url of the remote cache, or '' if it is disabled, see `remote_cache`."""
+    if os.name == 'nt':
+        return ''
+    return config.get_item('global_config', 'remote_cache_url')
+
+
+def remote_down_stamp(build_dir):
+    """Return the stamp which disables the remote cache for the rest of the build."""
+    return os.path.join(build_dir, _REMOTE_DOWN_STAMP)
+
+
+def tool_args(build_dir):
+    """Return the arguments of the `action` builtin tool, or '' if no cache is enabled."""
+    args = []
+    if cache_dir():
+        args.append('--cache_dir=%s' % cache_dir())
+    url = remote_cache_url()
+    if url:
+        args.append('--remote=%s' % url.replace('$', '$$'))
+        args.append('--remote_policy=%s' % config.get_item('global_config', 'remote_cache_policy'))
+        args.append('--remote_timeout=%s' % config.get_item('global_config', 'remote_cache_timeout'))
+        args.append('--remote_down_stamp=%s' % remote_down_stamp(build_dir))
+    return ' '.join(args)
+
+
+def cached_rule(rule):
+    """Whether the edges of a rule run through the cache."""
+    if not cache_dir() and not remote_cache_url():
+        return False
+    rules = config.get_item('global_config', 'action_cache_rules')
+    if rule.endswith(_GEN_RULE_SUFFIX):
+        return GEN_RULE in rules
+    return rule in rules
+
+
+def wrap_command(command, rspfile: str | None = None, rspfile_content: str = ''):
+    """Return (command, rspfile, rspfile_content) of a rule which runs through the cache.
+
+    The `${action_cache}` variable is the builtin tool, declared in the header
+    of build.ninja, the edge variables are set by `edge_variables`.
+    """
+    args = '--action=${action_file} '
+    content = command
+    if rspfile:
+        args += '--rspfile=%s ' % rspfile
+        content = rspfile_content + _RSP_SEPARATOR + command
+    return ('${action_cache} %s${out} ${action_outputs} -- ${in} ${action_deps}' % args,
+            '${action_file}', content)
+
+
+def edge_variables(outputs, implicit_outputs, implicit_deps):
+    """Return the variables of an edge of a cached rule."""
+    variables = {'action_file': outputs[0] + '.action'}
+    if implicit_outputs:
+        variables['action_outputs'] = ' '.join(implicit_outputs)
+    if implicit_deps:
+        variables['action_deps'] = ' '.join(implicit_deps)
+    return variables
+
+
+def _make_shared_dirs(path):
+    """Create dirs, which the other users can write too."""
+    missing = []
+    while path and not os.path.isdir(path):
+        missing.append(path)
+        path = os.path.dirname(path)
+    for path in reversed(missing):
+        try:
+            os.mkdir(path)
+            os.chmod(path, _DIR_MODE)
+        except FileExistsError:
+            pass
+
+
+def _touch(path):
+    try:
+        with open(path, 'a'):
+            pass
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def _update_path(h, path):
+    """Hash a file, or every file under a dir, with their paths."""
+    if os.path.isfile(path):
+        h.update(b'f %s %s\n' % (path.encode(), file_digest(path).encode()))
+    elif os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                _update_path(h, os.path.join(root, name))
+    else:
+        h.update(b'm %s\n' % path.encode())
+
+
+def action_key(command, outputs, inputs):
+    """Return the cache key of an action."""
+    h = hashlib.sha256()
+    h.update(json.dumps([_VERSION, command, outputs]).encode())
+    for path in sorted(set(inputs)):
+        _update_path(h, path)
+    return h.hexdigest()
+
+
+class ActionCache:
+    """An action cache directory."""
+
+    def __init__(self, cache_dir, max_size=0):
+        """`max_size` is in bytes."""
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key, outputs):
+        """Restore the outputs of an action, return whether it is hit."""
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, _OUTPUTS_FILE)) as f:
+                entries = json.load(f)
+            if [entry['path'] for entry in entries] != outputs:
+                return False
+            for index, entry in enumerate(entries):
+                _restore_file(os.path.join(entry_dir, str(index)), entry['path'], entry['mode'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            console.debug('Failed to restore action %s: %s' % (key, e))
+            return False
+        try:
+            os.utime(entry_dir)  # For LRU
+        except OSError:  # Owned by another user without the permission
+            pass
+        return True
+
+    def put(self, key, outputs):
+        """Store the outputs of an action. Outputs which are dirs are not cacheable."""
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir) or not all(os.path.isfile(o) for o in outputs):
+            return
+        tmp_dir = os.path.join(self.cache_dir, _TMP_DIR, '%s.%d' % (key, os.getpid()))
+        try:
+            _make_shared_dirs(tmp_dir)
+            entries = []
+            for index, output in enumerate(outputs):
+                path = os.path.join(tmp_dir, str(index))
+                shutil.copyfile(output, path)
+                os.chmod(path, _FILE_MODE)
+                entries.append({'path': output, 'mode': os.stat(output).st_mode & 0o777})
+            with open(os.path.join(tmp_dir, _OUTPUTS_FILE), 'w') as f:
+                json.dump(entries, f)
+            os.chmod(os.path.join(tmp_dir, _OUTPUTS_FILE), _FILE_MODE)
+            _make_shared_dirs(os.path.dirname(entry_dir))
+            os.rename(tmp_dir, entry_dir)
+            _touch(os.path.join(self.cache_dir, _STORED_STAMP))
+        except OSError as e:
+            # Also when another build stored the same entry meanwhile.
+            console.debug('Failed to store action %s: %s' % (key, e))
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _entries(self):
+        """Return [(mtime, size, path)] of all entries."""
+        entries = []
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if prefix == _TMP_DIR or not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                try:
+                    size = sum(os.path.getsize(os.path.join(entry_dir, name))
+                               for name in os.listdir(entry_dir))
+                    entries.append((os.path.getmtime(entry_dir), size, entry_dir))
+                except OSError:
+                    continue
+        return entries
+
+    def evict(self):
+        """Remove the least recently used entries over the size limit, if anything was stored."""
+        try:
+            stored_time = os.path.getmtime(os.path.join(self.cache_dir, _STORED_STAMP))
+        except OSError:
+            return
+        evicted_stamp = os.path.join(self.cache_dir, _EVICTED_STAMP)
+        if os.path.exists(evicted_stamp) and os.path.getmtime(evicted_stamp) > stored_time:
+            return
+        _touch(evicted_stamp)
+        total = removed = 0
+        for _, size, entry_dir in sorted(self._entries(), reverse=True):
+            total += size
+            if total > self.max_size:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                removed += 1
+        if removed:
+            console.debug('Removed %d least recently used entries from the action cache' % removed)
+
+
+def file_digest(path):
+    """Return the sha256 of the content of a file."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _same_file_content(path1, path2):
+    try:
+        if os.path.getsize(path1) != os.path.getsize(path2):
+            return False
+    except OSError:
+        return False
+    return file_digest(path1) == file_digest(path2)
+
+
+def _restore_file(cached, path, mode):
+    """Restore an output, an unchanged one is not touched for `restat`."""
+    if _same_file_content(cached, path):
+        return
+    dirname = os.path.dirname(path)
+    if dirname:
+        os.makedirs(dirname, exist_ok=True)
+    tmp = '%s.%d.tmp' % (path, os.getpid())
+    shutil.copyfile(cached, tmp)
+    os.chmod(tmp, mode)
+    os.replace(tmp, path)
+
+
+def _get_remote(remote, key, outputs):
+    """Restore the outputs of an action from the remote cache, return whether it is hit."""
+    import tempfile  # pylint: disable=import-outside-toplevel
+    entries = remote.get_action(key)
+    if not entries or [entry['path'] for entry in entries] != outputs:
+        return False
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        paths = remote.download(entries, tmp_dir)
+        if not paths:
+            return False
+        try:
+            for path, entry in zip(paths, entries):
+                _restore_file(path, entry['path'], entry['mode'])
+        except OSError as e:
+            console.debug('Failed to restore action %s: %s' % (key, e))
+            return False
+    return True
+
+
+def read_action_file(action_file):
+    """Return (the content of the response file or None, the command) of an action."""
+    with open(action_file) as f:
+        command = f.read()
+    if _RSP_SEPARATOR in command:
+        rsp_content, command = command.split(_RSP_SEPARATOR, 1)
+        return rsp_content, command
+    return None, command
+
+
+def run(action_file, rspfile, outputs, inputs, cache_dir='', remote=None):
+    """Run an action through the local cache and the `RemoteCache`, return its exit code."""
+    rsp_content, command = read_action_file(action_file)
+    cache = ActionCache(cache_dir) if cache_dir else None
+    start_time = time.time()
+    key = action_key([command, rsp_content], outputs, inputs)
+    if cache and cache.get(key, outputs):
+        console.debug('Action cache hit: %s in %.2fs' % (outputs[0], time.time() - start_time))
+        return 0
+    if remote and remote.readable and _get_remote(remote, key, outputs):
+        console.debug('Remote cache hit: %s in %.2fs' % (outputs[0], time.time() - start_time))
+        if cache:
+            cache.put(key, outputs)
+        return 0
+    if rspfile:
+        with open(rspfile, 'w') as f:
+            f.write(rsp_content or '')
+    returncode = subprocess.call(command, shell=True)
+    if returncode == 0:
+        if rspfile:
+            os.remove(rspfile)  # As ninja does on success
+        if cache:
+            cache.put(key, outputs)
+        if remote and remote.writable and all(os.path.isfile(o) for o in outputs):
+            remote.upload(key, outputs)
+    return returncode
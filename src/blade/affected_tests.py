@@ -0,0 +1,123 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Selection of the tests affected by changed files.
+
+`blade test --changed-since=<git rev>` or `--changed-files=<files>` only
+builds and runs the tests which a change can affect, instead of the world:
+
+* A changed file affects the targets having it in their `srcs`, `hdrs` or
+  `testdata`, and all the targets in the dir of a changed BUILD file.
+* An affected target affects all its dependents, as expanded by the
+  dependency analysis.
+* A changed BLADE_ROOT affects everything.
+
+Files which are not owned by any loaded target, such as the headers of a
+library which doesn't declare them, affect nothing and are reported.
+"""
+
+
+import os
+
+from blade import console
+from blade import util
+
+
+def changed_files_since(revision):
+    """Return the files changed in the workspace since a git revision, or None on error.
+
+    The uncommitted changes and the untracked files are included. The paths
+    are relative to the workspace root, which is the current dir.
+    """
+    files = []
+    for cmd in (['git', 'diff', '--name-only', '--relative', revision, '--'],
+                ['git', 'ls-files', '--others', '--exclude-standard']):
+        try:
+            returncode, stdout, stderr = util.run_command(cmd)
+        except OSError as e:
+            console.error('Failed to run git for "--changed-since": %s' % e)
+            return None
+        if returncode != 0:
+            console.error('Failed to get the files changed since "%s": %s' % (revision, stderr.strip()))
+            return None
+        files += stdout.splitlines()
+    return files
+
+
+def parse_changed_files(changed_files, working_dir):
+    """Parse the comma-separated files of `--changed-files` relative to the workspace root."""
+    files = []
+    for path in filter(bool, map(str.strip, changed_files.split(','))):
+        if path.startswith('//'):
+            path = path[2:]
+        else:
+            path = os.path.join(working_dir, path)
+        files.append(path)
+    return files
+
+
+def _testdata_sources(target):
+    for testdata in target.attr.get('testdata', []):
+        src = testdata[0] if isinstance(testdata, tuple) else testdata
+        if src.startswith('//'):
+            yield src[2:]
+        else:
+            yield os.path.join(target.path, src)
+
+
+def target_source_files(target):
+    """Return the normalized source files (and testdata dirs) of a target."""
+    files = [os.path.join(target.path, src) for src in target.srcs]
+    files += [os.path.join(target.path, hdr) for hdr, _ in target.attr.get('expanded_hdrs', [])]
+    files += [os.path.join(target.path, hdr) for hdr in target.attr.get('textual_hdrs', [])]
+    files += _testdata_sources(target)
+    return set(os.path.normpath(f) for f in files)
+
+
+def _owner_targets(targets, changed_files):
+    """Return the keys of the targets owning the changed files, and the unowned files."""
+    owners = set()
+    owned = set()
+    changed_files = set(os.path.normpath(f) for f in changed_files)
+    changed_build_dirs = {os.path.dirname(f) or '.' for f in changed_files
+                          if os.path.basename(f) == 'BUILD'}
+    for key, target in targets.items():
+        if os.path.normpath(target.path) in changed_build_dirs:
+            owners.add(key)
+            owned.add(os.path.join(target.path, 'BUILD'))
+            continue
+        for source in target_source_files(target):
+            # A testdata dir owns the files under it
+            matched = [f for f in changed_files if util.path_under_dir(f, source)]
+            if matched:
+                owners.add(key)
+                owned.update(matched)
+    owned = set(os.path.normpath(f) for f in owned)
+    return owners, sorted(changed_files - owned)
+
+
+def affected_targets(targets, changed_files):
+    """Return the keys of the targets affected by the changed files.
+
+    `targets` are the analyzed targets, with their `expanded_dependents`.
+    """
+    if any(os.path.normpath(f) == 'BLADE_ROOT' for f in changed_files):
+        console.info('BLADE_ROOT is changed, all targets are affected')
+        return set(targets)
+    owners, unowned = _owner_targets(targets, changed_files)
+    if unowned:
+        console.info('%d changed files are not owned by any loaded target' % len(unowned))
+        for path in unowned:
+            console.debug('Not owned changed file: %s' % path)
+    affected = set(owners)
+    for key in owners:
+        affected.update(targets[key].expanded_dependents)
+    return affected
+
+
+def select_affected_tests(targets, command_targets, changed_files):
+    """Return the keys of the tests in the command targets affected by the changed files."""
+    affected = affected_targets(targets, changed_files)
+    return [key for key in command_targets
+            if key in affected and targets[key].type.endswith('_test')]
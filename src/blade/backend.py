@@ -14,10 +14,12 @@ objects to generate build rules.
 """
 
 
+import dataclasses
 import os
 import sys
 import textwrap
 
+from blade import action_cache
 from blade import rule_registry
 from blade import util
 from blade.ninja_rule import NinjaRule
@@ -43,6 +45,7 @@ class _NinjaFileHeaderGenerator:
 
         self.rules_buf = []
         self.__all_rule_names = set()
+        self.__pools = set()
 
 
     def _add_line(self, rule):
@@ -65,15 +68,49 @@ class _NinjaFileHeaderGenerator:
             depfile=depfile, generator=generator, pool=pool, restat=restat,
             rspfile=rspfile, rspfile_content=rspfile_content, deps=deps)
         self.__all_rule_names.add(rule.name)
-        for line in rule.emit():
+        for line in self.cacheable_rule(rule).emit():
             self._add_line(line)
 
+    def cacheable_rule(self, rule):
+        """Return the rule which runs through the action cache if it should, see `action_cache`."""
+        if rule.depfile or rule.deps or rule.generator or not action_cache.cached_rule(rule.name):
+            return rule
+        command, rspfile, rspfile_content = action_cache.wrap_command(
+                rule.command, rule.rspfile, rule.rspfile_content or '')
+        return dataclasses.replace(rule, command=command, rspfile=rspfile,
+                                   rspfile_content=rspfile_content)
+
+    def memory_pool(self, name, kind, depth=0):
+        """Declare a pool for the commands of a kind of memory estimate, see `build_memory`.
+
+        The depth is how many of them fit in the available memory, unless given.
+        Return the name of the pool, or None if the build jobs are not more.
+        """
+        jobs_num = self.blade.build_jobs_num()
+        if depth:
+            depth = min(depth, jobs_num)
+        else:
+            depth = self.blade.build_memory.jobs_by_memory(kind, jobs_num)
+        if depth >= jobs_num:
+            return None
+        if name not in self.__pools:
+            self.__pools.add(name)
+            self._add_line(textwrap.dedent('''\
+                    pool %s
+                      depth = %s
+                    ''') % (name, depth))
+        return name
+
     def generate_file_header(self):
         self._add_line(textwrap.dedent('''\
                 # build.ninja generated by blade
                 ninja_required_version = 1.7
                 builddir = %s
                 ''') % self.build_dir)
+        action_cache_args = action_cache.tool_args(self.build_dir)
+        if action_cache_args:
+            self._add_line('action_cache = %s\n' % self._builtin_command(
+                           'action', action_cache_args))
         # No more than 1 heavy target at a time
         self._add_line(textwrap.dedent('''\
                 pool heavy_pool
@@ -206,6 +243,7 @@ class NinjaFileGenerator:
             self.blade)
         code = ninja_script_header_generator.generate()
         code += self.blade.generate_targets_build_code()
+        code += self._emit_pch_builds()
         # cc_library targets have accumulated their undefined-symbol check
         # specs on the BuildManager; emit the single ``ccchkund_batch``
         # ninja rule now that all targets are generated and the spec list
@@ -214,6 +252,31 @@ class NinjaFileGenerator:
         self.__all_rule_names = ninja_script_header_generator.get_all_rule_names()
         return code
 
+    def _emit_pch_builds(self):
+        """Emit the builds of the precompiled headers the cc targets registered.
+
+        They are shared by targets with the same flags, so they are not in the
+        ninja file of any target.
+        """
+        code = []
+        for spec in self.blade.pch_specs():
+            outputs = spec['output']
+            if spec['inclusion_stack']:
+                outputs += ' | ' + spec['inclusion_stack']
+            inputs = spec['input']
+            if spec['order_only_deps']:
+                inputs += ' || ' + ' '.join(spec['order_only_deps'])
+            code.append('build %s: cxxpch %s\n' % (outputs, inputs))
+            variables = dict(spec['variables'])
+            if spec['inclusion_stack']:
+                variables['inclusion_stack'] = spec['inclusion_stack']
+            for name in sorted(variables):
+                code.append(('  %s = %s' % (name, variables[name])).rstrip() + '\n')
+            code.append('\n')
+        if code:
+            code.insert(0, '\n# Precompiled headers (see cc_targets.py)\n')
+        return code
+
     def _emit_cc_check_undefined_batch(self):
         """Emit the project-wide ``ccchkund_batch`` ninja rule + write the
         manifest JSON for it. Returns the ninja-file fragment to append.
@@ -20,9 +20,17 @@ import sys
 
 from blade import config
 from blade import console
+from blade import runfiles
+from blade.file_digests import FileDigests
 from blade.util import environ_add_path
 
 
+# Remembered content digests of the files in the workspace, see `FileDigests`
+_FILE_DIGESTS_FILE = '.blade.file.digests'
+# Content addressed store of the testdata files hardlinked into runfiles dirs
+_RUNFILES_STORE_DIR = '.blade.runfiles.store'
+
+
 class BinaryRunner:
     """BinaryRunner."""
 
@@ -33,6 +41,11 @@ class BinaryRunner:
         self.build_dir = build_manager.instance.get_build_dir()
         self.options = options
         self.target_database = target_database
+        self.file_digests = FileDigests(os.path.join(self.build_dir, _FILE_DIGESTS_FILE))
+        self.runfiles_stager = runfiles.RunfilesStager(
+                os.path.join(self.build_dir, _RUNFILES_STORE_DIR),
+                self.file_digests,
+                config.get_item('global_config', 'testdata_staging'))
 
     def _executable(self, target):
         """Returns the executable path."""
@@ -70,11 +83,10 @@ class BinaryRunner:
 
         # Prepare `<target_name>.runfiles` directory
         runfiles_dir = self._runfiles_dir(target)
-        shutil.rmtree(runfiles_dir, ignore_errors=True)
-        os.mkdir(runfiles_dir)
-
-        self._prepare_shared_libraries(target, runfiles_dir)
-        self._prepare_test_data(target)
+        entries = {}
+        self._prepare_shared_libraries(target, entries)
+        self._prepare_test_data(target, entries)
+        self.runfiles_stager.stage(runfiles_dir, entries)
 
         # Prepare environments
         run_env = dict(os.environ)
@@ -103,7 +115,7 @@ class BinaryRunner:
 
         return run_env
 
-    def _prepare_shared_libraries(self, target, runfiles_dir):
+    def _prepare_shared_libraries(self, target, entries):
         """Symlink shared libraries into the runfiles dir so the target finds them.
 
         Tests/binaries run with ``cwd=runfiles_dir``. blade links its own dynamic
@@ -120,17 +132,17 @@ class BinaryRunner:
         table carries no path, so the symlink-the-build-dir scheme does not
         apply; instead the dependency DLLs are flattened into runfiles and that
         dir is prepended to PATH at run time (see `_prepare_windows_dlls`).
+
+        The symlinks are added to the runfiles `entries` to stage.
         """
         if os.name == 'nt':
-            self._prepare_windows_dlls(target, runfiles_dir)
+            self._prepare_windows_dlls(target, entries)
             return
 
         # Symlink the build dir into runfiles so cwd-relative `<build_dir>/.../libX`
         # references resolve at run time (blade-built libraries have no soname, so
         # the build path is what is recorded in the binary). See issue #1167.
-        build_dir_link = os.path.join(runfiles_dir, os.path.basename(self.build_dir))
-        if not os.path.lexists(build_dir_link):
-            os.symlink(os.path.abspath(self.build_dir), build_dir_link)
+        entries[os.path.basename(self.build_dir)] = (runfiles.LINK, os.path.abspath(self.build_dir))
 
         # For shared libraries with a `soname`, their paths are not written into the executable;
         # they are always searched for in a set of configured directories.
@@ -138,18 +150,17 @@ class BinaryRunner:
         # libcrypto.so.1.0.0 => /lib64/libcrypto.so.1.0.0 (0x00007f0705d9f000)
         for soname, full_path in self._get_shared_libraries_with_soname(target):
             src = os.path.abspath(full_path)
-            dst = os.path.join(runfiles_dir, soname)
-            if os.path.lexists(dst):
+            if soname in entries:
                 console.warning('Trying to make duplicate symlink for shared library:\n'
                                 '%s -> %s\n'
                                 '%s -> %s already exists\n'
                                 'skipped, should check duplicate prebuilt '
                                 'libraries'
-                                % (dst, src, dst, os.path.realpath(dst)))
+                                % (soname, src, soname, entries[soname][1]))
                 continue
-            self._symlink_or_copy_file(src, dst)
+            entries[soname] = (runfiles.LINK, src)
 
-    def _prepare_windows_dlls(self, target, runfiles_dir):
+    def _prepare_windows_dlls(self, target, entries):
         """Flatten the transitive dependency DLLs into the runfiles dir.
 
         Windows has no rpath and the PE import table records only a DLL's base
@@ -163,9 +174,7 @@ class BinaryRunner:
             dll = self.target_database[dep].data.get('windows_dll')
             if not dll:
                 continue
-            dst = os.path.join(runfiles_dir, os.path.basename(dll))
-            if not os.path.lexists(dst):
-                self._symlink_or_copy_file(os.path.abspath(dll), dst)
+            entries.setdefault(os.path.basename(dll), (runfiles.LINK, os.path.abspath(dll)))
 
     def _get_shared_libraries_with_soname(self, target):
         """Get shared libraries with soname for one target that it depends."""
@@ -178,10 +187,33 @@ class BinaryRunner:
                     file_list.append(value)
         return file_list
 
-    def _prepare_test_data(self, target):
+    def _add_test_data_entries(self, target, src, dest, entries):
+        """Add the entries to stage a testdata file or dir at `dest`."""
+        if dest in entries:
+            target.warning('"%s" already existed, could not prepare testdata.' % dest)
+            return
+        kind = runfiles.READONLY_FILE if target.attr.get('readonly_testdata') else runfiles.FILE
+        if not os.path.isdir(src):
+            entries[dest] = (kind, src)
+            return
+        entries[dest] = (runfiles.DIR, src)
+        for root, dirs, files in os.walk(src, followlinks=True):
+            rel_root = os.path.relpath(root, src)
+            for name in dirs:
+                entries[os.path.normpath(os.path.join(dest, rel_root, name))] = (
+                        runfiles.DIR, os.path.join(root, name))
+            for name in files:
+                entries[os.path.normpath(os.path.join(dest, rel_root, name))] = (
+                        kind, os.path.join(root, name))
+
+    def _prepare_test_data(self, target, entries):
+        """Add the testdata of the target to the runfiles `entries`.
+
+        Files are staged as writable copies, or as read-only files sharing
+        the content if the test declares its testdata read-only.
+        """
         if 'testdata' not in target.attr:
             return
-        runfiles_dir = self._runfiles_dir(target)
         dest_list = []
         for i in target.attr['testdata']:
             if isinstance(i, tuple):
@@ -200,40 +232,28 @@ class BinaryRunner:
             dest = os.path.normpath(dest)
             self.__check_test_data_dest(target, dest, dest_list)
             dest_list.append(dest)
-            dest_path = os.path.join(runfiles_dir, dest)
-            if os.path.exists(dest_path):
-                target.warning('"%s" already existed, could not prepare testdata.' % dest)
-                continue
-            try:
-                os.makedirs(os.path.dirname(dest_path))
-            except OSError:
-                pass
-
-            if os.path.isfile(src):
-                shutil.copy2(src, dest_path)
-            elif os.path.isdir(src):
-                shutil.copytree(src, dest_path)
+            if os.path.exists(src):
+                self._add_test_data_entries(target, src, dest, entries)
 
-        self._prepare_extra_test_data(target)
+        self._prepare_extra_test_data(target, entries)
 
-    def _prepare_extra_test_data(self, target):
+    def _prepare_extra_test_data(self, target, entries):
         """Prepare extra test data specified in the .testdata file if it exists."""
         testdata = os.path.join(self.build_dir, target.path,
                                 '%s.testdata' % target.name)
         if os.path.isfile(testdata):
-            runfiles_dir = self._runfiles_dir(target)
             with open(testdata) as f:
                 for line in f:
                     data = line.strip().split()
+                    if not data:
+                        continue
                     if len(data) == 1:
                         src, dst = data[0], ''
                     else:
                         src, dst = data[0], data[1]
-                    dst = os.path.join(runfiles_dir, dst)
-                    dst_dir = os.path.dirname(dst)
-                    if not os.path.isdir(dst_dir):
-                        os.makedirs(dst_dir)
-                    shutil.copy2(src, dst)
+                    if not dst or dst.endswith('/'):
+                        dst = os.path.join(dst, os.path.basename(src))
+                    self._add_test_data_entries(target, src, os.path.normpath(dst), entries)
 
     def _clean_target(self, target):
         """Clean the executive environment."""
@@ -254,6 +274,7 @@ class BinaryRunner:
             target.error('is not a executable target')
             return 126
         run_env = self._prepare_env(target)
+        self.file_digests.save()
         cmd = [os.path.abspath(self._executable(target))] + self.options.args
         shell = target.data.get('run_in_shell', False)
         if shell:
@@ -6,8 +6,67 @@
 
 """
 Build accelerator (ccache, distcc, etc.) manage module.
+
+`cc_config.build_accelerator` selects the accelerators of the C/C++
+compilations, which prefix the compile commands:
+
+* ccache or sccache: a compiler cache. ccache gets `CCACHE_BASEDIR` set to
+  the workspace root, so the hits survive across checkouts at other paths,
+  and the sloppiness it needs to cache the compilations using precompiled
+  headers.
+* distcc: distributes the compilations to the hosts of `DISTCC_HOSTS` or of
+  the distcc hosts file. With ccache, it runs as `CCACHE_PREFIX`, on misses
+  only. The build jobs number is scaled to the job slots of the hosts.
+
+'auto' uses what is installed, a compiler cache preferred to another, and
+distcc if it has hosts. A toolchain whose compiler already runs through an
+accelerator, and MSVC, get none.
 """
 
+import json
+import os
+import re
+import shutil
+
+from blade import config
+from blade import console
+from blade import util
+
+
+ACCELERATORS = ('ccache', 'sccache', 'distcc')
+
+# The default job slots of a distcc host, see `man distcc`
+_DISTCC_REMOTE_SLOTS = 4
+_DISTCC_LOCAL_SLOTS = 2
+
+# Without them, ccache doesn't cache the compilations using a precompiled header
+_CCACHE_PCH_SLOPPINESS = ('pch_defines', 'time_macros')
+
+
+def _distcc_hosts():
+    """Return the host specs of distcc, from `DISTCC_HOSTS` or the hosts files."""
+    hosts = os.environ.get('DISTCC_HOSTS')
+    if hosts is None:
+        distcc_dir = os.environ.get('DISTCC_DIR', os.path.expanduser('~/.distcc'))
+        for path in (os.path.join(distcc_dir, 'hosts'), '/etc/distcc/hosts'):
+            if os.path.isfile(path):
+                with open(path) as f:
+                    hosts = ' '.join(line.split('#', 1)[0] for line in f)
+                break
+    # Options such as "--randomize" are not hosts
+    return [host for host in (hosts or '').split() if not host.startswith('--')]
+
+
+def distcc_remote_slots(hosts):
+    """Return the number of jobs the remote hosts of distcc take, by their "/LIMIT"s."""
+    slots = 0
+    for host in hosts:
+        name = re.split(r'[:/,]', host.split('@')[-1], 1)[0]
+        if name == 'localhost':  # Run locally, counted in the local jobs
+            continue
+        m = re.search(r'/(\d+)', host)
+        slots += int(m.group(1)) if m else _DISTCC_REMOTE_SLOTS
+    return slots
 
 
 class BuildAccelerator:
@@ -15,6 +74,42 @@ class BuildAccelerator:
 
     def __init__(self, toolchain):
         self.__toolchain = toolchain
+        self.compiler_cache = None  # 'ccache', 'sccache' or None
+        self.distcc = False
+        self.__distcc_hosts = []
+        self._detect()
+
+    def _detect(self):
+        setting = config.get_item('cc_config', 'build_accelerator')
+        if setting == 'none' or self.__toolchain.cc_is('msvc'):
+            return
+        cc = self.__toolchain.get_cc_commands()[0]
+        if cc and os.path.basename(cc.split()[0]) in ACCELERATORS:
+            console.debug('The compiler "%s" is already accelerated' % cc)
+            return
+        if setting == 'auto':
+            wanted = ('ccache', 'sccache', 'distcc')
+        else:
+            wanted = setting.split('+')
+        for name in wanted:
+            if not shutil.which(name):
+                if setting != 'auto':
+                    console.warning('"cc_config.build_accelerator": %s is not found' % name)
+                continue
+            if name == 'distcc':
+                hosts = _distcc_hosts()
+                if self.compiler_cache == 'sccache' or not hosts:
+                    continue
+                self.distcc = True
+                self.__distcc_hosts = hosts
+            elif not self.compiler_cache:
+                self.compiler_cache = name
+        if self.compiler_cache or self.distcc:
+            console.debug('Build accelerator: %s' % ' + '.join(
+                [n for n in (self.compiler_cache, 'distcc' if self.distcc else None) if n]))
+
+    def _prefix(self):
+        return self.compiler_cache or ('distcc' if self.distcc else '')
 
     def get_cc_commands(self):
         """Get correct c/c++ commands with proper build accelerator prefix
@@ -22,11 +117,104 @@ class BuildAccelerator:
             cc, cxx, linker
         """
         cc, cxx, ld = self.__toolchain.get_cc_commands()
+        prefix = self._prefix()
+        if prefix:
+            cc, cxx = '%s %s' % (prefix, cc), '%s %s' % (prefix, cxx)
         return cc, cxx, ld
-    
+
     def get_ar_command(self):
         return self.__toolchain.get_ar()
 
-    def adjust_jobs_num(self, cpu_core_num):
-        # Calculate job numbers smartly
-        return cpu_core_num
+    def setup_environ(self, root_dir, pch=False):
+        """Set the environment variables of the accelerators for the build commands.
+
+        Those set by the user are kept, the sloppiness of ccache is added to
+        if the build uses precompiled headers.
+        """
+        if self.compiler_cache == 'ccache':
+            os.environ.setdefault('CCACHE_BASEDIR', root_dir)
+            if self.distcc:
+                os.environ.setdefault('CCACHE_PREFIX', 'distcc')
+            if pch:
+                self._add_ccache_sloppiness(_CCACHE_PCH_SLOPPINESS)
+
+    @staticmethod
+    def _add_ccache_sloppiness(wanted):
+        """Add to the sloppiness of ccache, of the environment or else of its config."""
+        sloppiness = os.environ.get('CCACHE_SLOPPINESS')
+        if sloppiness is None:
+            returncode, stdout, _ = util.run_command(['ccache', '--get-config=sloppiness'])
+            sloppiness = stdout.strip() if returncode == 0 else ''
+        items = [item for item in re.split(r'[,\s]+', sloppiness) if item]
+        items += [item for item in wanted if item not in items]
+        os.environ['CCACHE_SLOPPINESS'] = ','.join(items)
+
+    def adjust_jobs_num(self, cpu_core_num, memory_per_job=0):
+        """Calculate job numbers smartly, by the load of the host and its available memory.
+
+        The load other than the build takes some cores, but no more than half
+        of them, since it may go away soon. At most as many jobs as
+        `memory_per_job` MiB fit in the available memory are run. With distcc,
+        the job slots of the remote hosts are added.
+        """
+        jobs_num = cpu_core_num
+        try:
+            load = os.getloadavg()[0]
+        except (AttributeError, OSError):  # Not available on Windows
+            load = 0.0
+        if load >= 1:
+            jobs_num = max(cpu_core_num - int(load), (cpu_core_num + 1) // 2)
+            console.debug('Load average is %.2f, use %d of %d cores' % (load, jobs_num, cpu_core_num))
+        memory = util.available_memory()
+        if memory and memory_per_job:
+            memory_jobs_num = max(1, memory // memory_per_job)
+            if memory_jobs_num < jobs_num:
+                console.debug('%d MiB memory is available, %d MiB per job' % (memory, memory_per_job))
+                jobs_num = memory_jobs_num
+        if self.distcc:
+            remote_slots = distcc_remote_slots(self.__distcc_hosts)
+            console.debug('distcc has %d remote job slots' % remote_slots)
+            jobs_num += remote_slots
+        return jobs_num
+
+    def cache_stats(self):
+        """Return the (hits, misses) counters of the compiler cache, or None."""
+        if self.compiler_cache == 'ccache':
+            returncode, stdout, _ = util.run_command(['ccache', '--print-stats'])
+            if returncode != 0:
+                return None
+            stats = {}
+            for line in stdout.splitlines():
+                fields = line.split('\t')
+                if len(fields) == 2 and fields[1].isdigit():
+                    stats[fields[0]] = int(fields[1])
+            return (stats.get('direct_cache_hit', 0) + stats.get('preprocessed_cache_hit', 0),
+                    stats.get('cache_miss', 0))
+        if self.compiler_cache == 'sccache':
+            returncode, stdout, _ = util.run_command(
+                    ['sccache', '--show-stats', '--stats-format=json'])
+            if returncode != 0:
+                return None
+            try:
+                stats = json.loads(stdout)['stats']
+                return (sum(stats['cache_hits']['counts'].values()),
+                        sum(stats['cache_misses']['counts'].values()))
+            except (ValueError, KeyError, TypeError):
+                return None
+        return None
+
+    def report_cache_stats(self, stats_before):
+        """Report the hit rate of the compiler cache since `stats_before` of `cache_stats`.
+
+        The counters are of the whole cache, so other builds running
+        meanwhile are also counted.
+        """
+        if not stats_before:
+            return
+        stats = self.cache_stats()
+        if not stats:
+            return
+        hits, misses = stats[0] - stats_before[0], stats[1] - stats_before[1]
+        if hits + misses > 0:
+            console.info('%s: %d hits, %d misses, %.1f%% hit rate' % (
+                         self.compiler_cache, hits, misses, 100.0 * hits / (hits + misses)))
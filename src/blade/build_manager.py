@@ -18,6 +18,10 @@ import subprocess
 import sys
 import time
 
+from blade import action_cache
+from blade import affected_tests
+from blade import build_memory
+from blade import build_trace
 from blade import config
 from blade import console
 from blade import maven
@@ -132,6 +136,16 @@ class Blade:
         # instead of once per cc_library. See issue #1225.
         self.__cc_check_undefined_specs = []
 
+        # {output: spec} of the precompiled headers, shared by the cc targets
+        # with the same header and compile flags, see `CcTarget._register_pch`.
+        self.__pch_specs = {}
+
+        # [(target key, ninja file)] of the targets to build
+        self.__target_ninja_files = []
+
+        # [(stage name, start time, end time)] of the stages run, for `--trace`
+        self.__stage_times = []
+
         # Indicate whether the deps list is expanded by expander or not
         self.__targets_expanded = False
 
@@ -139,6 +153,7 @@ class Blade:
         # source of truth for the build-dir platform triple); reuse that instance.
         self.__build_toolchain = toolchain
         self.build_accelerator = BuildAccelerator(self.__build_toolchain)
+        self.build_memory = build_memory.BuildMemory(self.__build_dir)
         self.__build_jobs_num = 0
 
         self.__build_script = os.path.join(self.__build_dir, 'build.ninja')
@@ -173,10 +188,39 @@ class Blade:
         console.info('Analyzing dependency graph...')
         self.__sorted_targets_keys = analyze_deps(self.__build_targets)
         self.__targets_expanded = True
+        if self.__command == 'test' and (self.__options.changed_since or
+                                         self.__options.changed_files):
+            self._select_affected_tests()
 
         console.info('Analyzing done.')
         return self.__build_targets  # For test
 
+    def _changed_files(self):
+        if self.__options.changed_files:
+            return affected_tests.parse_changed_files(self.__options.changed_files,
+                                                      self.__working_dir)
+        return affected_tests.changed_files_since(self.__options.changed_since)
+
+    def _select_affected_tests(self):
+        """Only keep the tests affected by the changed files, and what they depend on."""
+        changed_files = self._changed_files()
+        if changed_files is None:
+            return
+        tests = affected_tests.select_affected_tests(
+                self.__build_targets, self.__expanded_command_targets, changed_files)
+        console.info('%d changed files affect %d tests' % (len(changed_files), len(tests)))
+        keys = set(tests)
+        for key in tests:
+            keys.update(self.__build_targets[key].expanded_deps)
+        self.__build_targets = {key: target for key, target in self.__build_targets.items()
+                                if key in keys}
+        for target in self.__build_targets.values():
+            target.dependents &= keys
+            target.expanded_dependents &= keys
+        self.__sorted_targets_keys = [key for key in self.__sorted_targets_keys if key in keys]
+        self.__direct_targets = set(key for key in self.__direct_targets if key in keys)
+        self.__expanded_command_targets = set(tests)
+
     def build_script(self):
         """Return build script file name"""
         return self.__build_script
@@ -321,6 +365,24 @@ class Blade:
         during target generation."""
         return self.__cc_check_undefined_specs
 
+    def register_pch(self, spec):
+        """Record a precompiled header a cc target uses.
+
+        ``spec`` is a dict of ``output``, ``inclusion_stack``, ``input``,
+        ``variables`` and ``order_only_deps``. The targets which share it add
+        their ``order_only_deps``. Called before generating the targets, also
+        for those whose ninja files are cached, so every one is emitted.
+        """
+        old = self.__pch_specs.get(spec['output'])
+        if old:
+            old['order_only_deps'] = sorted(set(old['order_only_deps']) | set(spec['order_only_deps']))
+        else:
+            self.__pch_specs[spec['output']] = spec
+
+    def pch_specs(self):
+        """Return the precompiled header specs, ordered by output."""
+        return [self.__pch_specs[k] for k in sorted(self.__pch_specs)]
+
     def _write_inclusion_declaration_file(self):
         from blade import cc_targets  # pylint: disable=import-outside-toplevel
         inclusion_declaration_file = os.path.join(self.__build_dir, 'inclusion_declaration.data')
@@ -365,17 +427,40 @@ class Blade:
         from blade import vcpkg
         vcpkg.setup(self)
 
-    def build(self):
-        """Implement the "build" subcommand."""
+    def build(self, on_progress=None):
+        """Implement the "build" subcommand.
+
+        `on_progress()` is called repeatedly while building, see `ninja_runner.build`.
+        """
         console.info('Building...')
         console.flush()
+        log_offset = build_trace.log_offset(self.__build_dir)
+        if self.build_memory.learning():
+            on_progress = self._sample_build_memory(on_progress)
+        self.build_accelerator.setup_environ(self.__root_dir, pch=bool(self.__pch_specs))
+        cache_stats = self.build_accelerator.cache_stats()
+        remote_down_stamp = action_cache.remote_down_stamp(self.__build_dir)
+        if os.path.exists(remote_down_stamp):
+            os.remove(remote_down_stamp)  # Retry the remote cache in each build
         start_time = time.time()
         returncode = ninja_runner.build(
             self.get_build_dir(),
             self.build_script(),
             self.build_jobs_num(),
             targets='',  # empty => build all default ninja targets
-            options=self.__options)
+            options=self.__options,
+            on_progress=on_progress)
+        self.record_stage_time('build', start_time, time.time())
+        self.build_memory.save()
+        self._evict_action_cache()
+        if os.path.exists(remote_down_stamp):
+            console.warning('The remote cache could not be connected to, '
+                            'it was not used by the rest of the build')
+        self.build_accelerator.report_cache_stats(cache_stats)
+        if getattr(self.__options, 'trace', None):
+            build_trace.write_trace(os.path.join(self.__working_dir, self.__options.trace),
+                                    self.__stage_times, start_time, self.__build_dir,
+                                    log_offset, self.__build_script, self.__target_ninja_files)
         self._write_build_stamp_file(start_time, returncode)
         if returncode != 0:
             console.error('Build failure.')
@@ -383,6 +468,37 @@ class Blade:
             console.info('Build success.')
         return returncode
 
+    def benchmark(self):
+        """Implement the "benchmark" subcommand, see `link_benchmark`."""
+        returncode = self.build()
+        if returncode != 0:
+            return returncode
+        targets = []
+        for key in sorted(self.__expanded_command_targets):
+            target = self.__build_targets[key]
+            if target.type in ('cc_binary', 'cc_test'):
+                targets.append((key, target._get_target_file('bin')))
+        from blade import link_benchmark  # pylint: disable=import-outside-toplevel
+        return link_benchmark.run(self.__build_script, self.__build_toolchain, targets,
+                                  self.__options.linkers, self.__options.runs)
+
+    def _evict_action_cache(self):
+        cache_dir = action_cache.cache_dir()
+        if cache_dir:
+            max_size = config.get_item('global_config', 'action_cache_max_size') << 20
+            action_cache.ActionCache(cache_dir, max_size).evict()
+
+    def _sample_build_memory(self, on_progress):
+        """Return the `on_progress` which also samples the memory of the build commands."""
+        from blade import cc_rule_support  # pylint: disable=import-outside-toplevel
+        lto = cc_rule_support._lto_mode(self.__options, self.__build_toolchain) is not None
+
+        def sample():
+            self.build_memory.sample(lto)
+            if on_progress:
+                on_progress()
+        return sample
+
     def run(self):
         """Build and run target"""
         ret = self.build()
@@ -398,13 +514,15 @@ class Blade:
     def test(self):
         """Build and run tests."""
         if not self.__options.no_build:
+            if self.__options.pipeline and not self.__options.dry_run:
+                return self._test(build=self.build)
             ret = self.build()
             if ret != 0:
                 return ret
         return self._test()
 
-    def _test(self):
-        """Run tests."""
+    def _test(self, build=None):
+        """Run tests, while building them by `build` if it is given."""
         exclude_tests = []
         if self.__options.exclude_tests:
             exclude_tests = target_pattern.normalize_str_list(self.__options.exclude_tests,
@@ -417,7 +535,7 @@ class Blade:
                 self.__build_targets,
                 exclude_tests,
                 self.test_jobs_num())
-        return test_runner.run()
+        return test_runner.run(build)
 
     @staticmethod
     def _remove_paths(paths):
@@ -723,10 +841,15 @@ class Blade:
             target.before_generate()
             target_ninja = self._find_or_generate_target_ninja_file(target)
             if target_ninja:
+                self.__target_ninja_files.append((k, target_ninja))
                 target._remove_on_clean(target_ninja)
                 code += 'include %s\n' % target_ninja
         return code
 
+    def record_stage_time(self, stage, start_time, end_time):
+        """Record the time a stage took, for the build trace."""
+        self.__stage_times.append((stage, start_time, end_time))
+
     def get_build_toolchain(self):
         """Return build toolchain instance."""
         return self.__build_toolchain
@@ -737,7 +860,8 @@ class Blade:
         jobs_num = config.get_item('global_config', 'build_jobs')
         if jobs_num > 0:
             return jobs_num
-        jobs_num = self.build_accelerator.adjust_jobs_num(cpu_count())
+        jobs_num = self.build_accelerator.adjust_jobs_num(
+                cpu_count(), self.build_memory.estimate('compile'))
         console.info('Adjust build jobs number(-j N) to be %d' % jobs_num)
         return jobs_num
 
@@ -0,0 +1,187 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Memory awareness of the build.
+
+Large C++ translation units and LTO links take gigabytes each, so running
+one job per core can run a host out of memory. Each kind of build command
+has an estimated peak memory:
+
+* compile: a C/C++ compilation.
+* link, lto_link: a link, without and with LTO.
+* javac: a java compilation.
+
+The estimates are in `global_config.build_memory_estimates`. The build jobs
+number is capped by the available memory divided by the compile estimate,
+and the other kinds run in ninja pools sized the same way.
+
+With `global_config.learn_build_memory`, the processes ninja runs are
+sampled during the build, and their peak RSS by kind replaces the estimates
+in the next builds. It is kept in the build dir.
+"""
+
+
+import json
+import os
+import time
+
+from blade import config
+from blade import console
+from blade import util
+
+
+KINDS = ('compile', 'link', 'lto_link', 'javac')
+
+# In MiB
+DEFAULT_ESTIMATES = {
+    'compile': 1024,
+    'link': 2048,
+    'lto_link': 8192,
+    'javac': 1024,
+}
+
+# A learned peak is used with this headroom, and decays by this rate per build
+# which runs the same kind of commands, to forget the heavy ones removed.
+_HEADROOM = 1.25
+_DECAY = 0.9
+
+# Sample the processes at most once in this many seconds
+_SAMPLE_INTERVAL = 1.0
+
+_COMPILERS = frozenset(['cc1', 'cc1plus', 'cc1obj', 'cc1objplus'])
+_LINKERS = frozenset(['ld', 'ld.bfd', 'ld.gold', 'ld.lld', 'lld', 'mold', 'collect2', 'link.exe'])
+_LTO_LINKERS = frozenset(['lto1', 'lto-wrapper'])
+
+
+def process_kind(argv, lto):
+    """Return the kind of build command a process is doing by its argv, or None."""
+    if not argv:
+        return None
+    name = os.path.basename(argv[0])
+    if name in _COMPILERS:
+        return 'compile'
+    if name.startswith('clang') and '-cc1' in argv:
+        return 'compile'
+    if name in _LTO_LINKERS:
+        return 'lto_link'
+    if name in _LINKERS:
+        return 'lto_link' if lto else 'link'
+    if name == 'javac' or 'com.sun.tools.javac.Main' in argv:
+        return 'javac'
+    return None
+
+
+class BuildMemory:
+    """The memory estimates of the build commands, and the learning of them."""
+
+    def __init__(self, build_dir):
+        self.__path = os.path.join(build_dir, '.blade.build.memory')
+        self.__learned = self._load()
+        self.__peaks = {}  # {kind: MiB} of this build
+        self.__next_sample_time = 0
+
+    def _load(self):
+        try:
+            with open(self.__path) as f:
+                learned = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(learned, dict):
+            return {}
+        return {k: v for k, v in learned.items() if k in KINDS and isinstance(v, (int, float))}
+
+    @staticmethod
+    def learning():
+        return config.get_item('global_config', 'learn_build_memory')
+
+    def estimate(self, kind):
+        """Return the estimated peak memory of a kind of build command in MiB."""
+        if self.learning() and self.__learned.get(kind):
+            return int(self.__learned[kind] * _HEADROOM) + 1
+        estimates = config.get_item('global_config', 'build_memory_estimates')
+        return estimates.get(kind, DEFAULT_ESTIMATES[kind])
+
+    def jobs_by_memory(self, kind, jobs_num):
+        """Return how many commands of a kind can run in the available memory, up to `jobs_num`."""
+        memory = util.available_memory()
+        if not memory:
+            return jobs_num
+        return max(1, min(jobs_num, memory // max(1, self.estimate(kind))))
+
+    def sample(self, lto):
+        """Sample the peak RSS of the build commands running under this process.
+
+        Called repeatedly while building, it actually samples once a while.
+        """
+        now = time.time()
+        if now < self.__next_sample_time:
+            return
+        self.__next_sample_time = now + _SAMPLE_INTERVAL
+        for pid in _descendant_pids(os.getpid()):
+            kind = process_kind(_read_argv(pid), lto)
+            if kind:
+                peak = _read_peak_rss(pid)
+                if peak > self.__peaks.get(kind, 0):
+                    self.__peaks[kind] = peak
+
+    def save(self):
+        """Merge the peaks sampled in this build into the learned ones."""
+        if not self.__peaks:
+            return
+        learned = dict(self.__learned)
+        for kind, peak in self.__peaks.items():
+            learned[kind] = max(peak, int(learned.get(kind, 0) * _DECAY))
+            console.debug('Peak memory of %s commands: %d MiB, learned %d MiB' % (
+                          kind, peak, learned[kind]))
+        try:
+            with open(self.__path, 'w') as f:
+                json.dump(learned, f)
+        except OSError as e:
+            console.debug('Failed to save the learned build memory: %s' % e)
+            return
+        self.__learned = learned
+        self.__peaks = {}
+
+
+def _children_pids(pid):
+    """Return the children of a process, through procfs."""
+    children = []
+    try:
+        for tid in os.listdir('/proc/%d/task' % pid):
+            with open('/proc/%d/task/%s/children' % (pid, tid)) as f:
+                children += [int(child) for child in f.read().split()]
+    except (OSError, ValueError):
+        pass
+    return children
+
+
+def _descendant_pids(pid):
+    result = []
+    stack = _children_pids(pid)
+    while stack:
+        child = stack.pop()
+        result.append(child)
+        stack += _children_pids(child)
+    return result
+
+
+def _read_argv(pid):
+    try:
+        with open('/proc/%d/cmdline' % pid, 'rb') as f:
+            return f.read().decode('utf-8', 'replace').split('\0')[:-1]
+    except OSError:
+        return []
+
+
+def _read_peak_rss(pid):
+    """Return the peak RSS of a process in MiB, 0 if it is gone."""
+    try:
+        with open('/proc/%d/status' % pid) as f:
+            for line in f:
+                # VmHWM:    123456 kB
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
@@ -0,0 +1,307 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+The build trace of `--trace=<file>`.
+
+It is a Chrome trace event JSON file, which chrome://tracing and Perfetto
+open, of the stages of blade (load, analyze, vcpkg, generate) and of every
+ninja edge run by the build, taken from `.ninja_log`. The edges are mapped
+back to the targets which own them by the per-target ninja files, and laid
+out in lanes like the ninja jobs which ran them.
+
+The ninja files also give the dependencies between the edges, so the
+critical path of the build, the chain of dependent edges which bounded its
+wall time, is computed and marked in the trace. It is also in the `blade`
+section of the file, with the time spent by each target, and reported on
+the console.
+"""
+
+
+import json
+import os
+
+from blade import console
+
+
+# Number of targets reported on the console
+_TOP_TARGETS_SHOWN = 10
+
+# Pseudo owner of the edges in the main build.ninja
+_BLADE_OWNER = '(blade)'
+
+
+class NinjaEdge:
+    """An edge run by ninja, from .ninja_log."""
+
+    def __init__(self, start, end, outputs):
+        self.start = start  # Seconds since ninja started
+        self.end = end
+        self.outputs = outputs
+        self.owner = None
+        self.deps = []  # NinjaEdge
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+
+def log_offset(build_dir):
+    """Return the size of .ninja_log before a build, to read the edges it runs later."""
+    path = os.path.join(build_dir, '.ninja_log')
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def read_ninja_log(build_dir, offset, since):
+    """Return the edges ninja ran since the log was `offset` bytes long.
+
+    Ninja may recompact the log when it starts. The entries of the outputs
+    modified since `since`, a time, are then taken instead.
+    """
+    path = os.path.join(build_dir, '.ninja_log')
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except OSError:
+        return []
+    recompacted = len(data) < offset
+    if not recompacted:
+        data = data[offset:]
+    edges = {}  # {(start, end, command hash): NinjaEdge}
+    for line in data.decode('utf-8', 'replace').splitlines():
+        fields = line.split('\t')
+        if len(fields) != 5 or line.startswith('#'):
+            continue
+        start, end, mtime, output, cmdhash = fields
+        if recompacted:
+            mtime = int(mtime)
+            if mtime > 1e11:  # In nanoseconds since ninja 1.10
+                mtime /= 1e9
+            if mtime < since - 1:
+                continue
+        key = (int(start), int(end), cmdhash)
+        if key in edges:
+            edges[key].outputs.append(os.path.normpath(output))
+        else:
+            edges[key] = NinjaEdge(int(start) / 1000.0, int(end) / 1000.0,
+                                   [os.path.normpath(output)])
+    return sorted(edges.values(), key=lambda e: (e.start, e.end))
+
+
+def _split_ninja_paths(text):
+    """Split a list of ninja paths, with the `$` escapes, into the unescaped paths."""
+    paths, path, i = [], [], 0
+    while i < len(text):
+        c = text[i]
+        if c == '$' and i + 1 < len(text):
+            path.append(text[i + 1])
+            i += 2
+            continue
+        if c == ' ':
+            if path:
+                paths.append(''.join(path))
+                path = []
+        else:
+            path.append(c)
+        i += 1
+    if path:
+        paths.append(''.join(path))
+    return paths
+
+
+def _split_build_statement(line):
+    """Return (outputs, inputs) of a `build` line, the implicit ones included."""
+    body = line[len('build '):]
+    # The first `:` which is not escaped ends the outputs
+    i = 0
+    while i < len(body):
+        if body[i] == '$':
+            i += 2
+            continue
+        if body[i] == ':':
+            break
+        i += 1
+    outputs = [p for p in _split_ninja_paths(body[:i]) if p != '|']
+    inputs = _split_ninja_paths(body[i + 1:])[1:]  # Without the rule
+    return outputs, [p for p in inputs if p not in ('|', '||')]
+
+
+def read_build_statements(ninja_file):
+    """Return [(outputs, inputs)] of the build statements of a ninja file."""
+    statements = []
+    try:
+        with open(ninja_file, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line.startswith('build '):
+                    outputs, inputs = _split_build_statement(line.rstrip('\r\n'))
+                    statements.append(([os.path.normpath(p) for p in outputs],
+                                       [os.path.normpath(p) for p in inputs]))
+    except OSError as e:
+        console.debug('Failed to read %s: %s' % (ninja_file, e))
+    return statements
+
+
+def link_edges(edges, ninja_files):
+    """Set the owners and the dependencies of the edges by the ninja files.
+
+    `ninja_files` is [(owner, ninja file)]. Inputs which ninja didn't build
+    this time are not depended on.
+    """
+    edge_of_output = {}
+    for edge in edges:
+        for output in edge.outputs:
+            edge_of_output[output] = edge
+    producer = {}  # {output: owner, inputs}
+    for owner, ninja_file in ninja_files:
+        for outputs, inputs in read_build_statements(ninja_file):
+            for output in outputs:
+                producer[output] = (owner, inputs)
+    # Phony edges are not logged, go through them to what they alias
+    for edge in edges:
+        deps = {}
+        visited = set()
+        stack = []
+        for output in edge.outputs:
+            owner, inputs = producer.get(output, (None, []))
+            if edge.owner is None:
+                edge.owner = owner
+            stack += inputs
+        while stack:
+            path = stack.pop()
+            if path in visited:
+                continue
+            visited.add(path)
+            dep = edge_of_output.get(path)
+            if dep is not None:
+                if dep is not edge:
+                    deps[id(dep)] = dep
+            elif path in producer:
+                stack += producer[path][1]
+        edge.deps = list(deps.values())
+        if edge.owner is None:
+            edge.owner = _BLADE_OWNER
+
+
+def critical_path(edges):
+    """Return the chain of dependent edges which took the longest time, first one first."""
+    # A dependency ends before its dependents start
+    best = {}  # {id(edge): (length, previous edge)}
+    for edge in sorted(edges, key=lambda e: e.end):
+        length, previous = 0.0, None
+        for dep in edge.deps:
+            if id(dep) in best and best[id(dep)][0] > length:
+                length, previous = best[id(dep)][0], dep
+        best[id(edge)] = (length + edge.duration, previous)
+    if not best:
+        return []
+    edge = max(edges, key=lambda e: best[id(e)][0])
+    path = []
+    while edge is not None:
+        path.append(edge)
+        edge = best[id(edge)][1]
+    return list(reversed(path))
+
+
+def target_times(edges, path):
+    """Return {owner: [edges count, total time, time on the critical path]}."""
+    times = {}
+    for edge in edges:
+        item = times.setdefault(edge.owner, [0, 0.0, 0.0])
+        item[0] += 1
+        item[1] += edge.duration
+    for edge in path:
+        times[edge.owner][2] += edge.duration
+    return times
+
+
+def _assign_lanes(edges):
+    """Return the lane of each edge, like the ninja job which could have run it."""
+    lanes_end = []
+    lanes = {}
+    for edge in sorted(edges, key=lambda e: (e.start, e.end)):
+        for lane, end in enumerate(lanes_end):
+            if end <= edge.start:
+                break
+        else:
+            lane = len(lanes_end)
+            lanes_end.append(0)
+        lanes_end[lane] = edge.end
+        lanes[id(edge)] = lane
+    return lanes
+
+
+def _us(seconds):
+    return int(seconds * 1e6)
+
+
+def trace_events(stages, ninja_start_time, edges, path):
+    """Return the trace events of the stages and the edges.
+
+    `stages` is [(name, start time, end time)], times are seconds since the epoch.
+    """
+    origin = min([s[1] for s in stages] + [ninja_start_time])
+    events = [
+        {'name': 'process_name', 'ph': 'M', 'pid': 1, 'args': {'name': 'blade'}},
+        {'name': 'process_name', 'ph': 'M', 'pid': 2, 'args': {'name': 'ninja'}},
+        {'name': 'thread_name', 'ph': 'M', 'pid': 2, 'tid': 0,
+         'args': {'name': 'critical path'}},
+    ]
+    for name, start, end in stages:
+        events.append({'name': name, 'cat': 'stage', 'ph': 'X', 'pid': 1, 'tid': 0,
+                       'ts': _us(start - origin), 'dur': _us(end - start)})
+    on_path = set(id(edge) for edge in path)
+    lanes = _assign_lanes(edges)
+    offset = ninja_start_time - origin
+    for edge in edges:
+        event = {
+            'name': os.path.basename(edge.outputs[0]),
+            'cat': 'edge',
+            'ph': 'X',
+            'pid': 2,
+            'tid': lanes[id(edge)] + 1,
+            'ts': _us(offset + edge.start),
+            'dur': _us(edge.duration),
+            'args': {'target': edge.owner, 'outputs': edge.outputs,
+                     'critical': id(edge) in on_path},
+        }
+        events.append(event)
+        if id(edge) in on_path:
+            events.append(dict(event, cat='critical', tid=0))
+    return events
+
+
+def write_trace(trace_file, stages, ninja_start_time, build_dir, log_offset_before,
+                build_script, ninja_files):
+    """Write the trace of a build, and report its critical path.
+
+    `ninja_files` is [(owner target key, the ninja file of the target)],
+    besides the main `build_script`.
+    """
+    edges = read_ninja_log(build_dir, log_offset_before, ninja_start_time)
+    link_edges(edges, [(_BLADE_OWNER, build_script)] + ninja_files)
+    path = critical_path(edges)
+    times = target_times(edges, path)
+    trace = {
+        'traceEvents': trace_events(stages, ninja_start_time, edges, path),
+        'displayTimeUnit': 'ms',
+        'blade': {
+            'critical_path': [{'target': e.owner, 'outputs': e.outputs,
+                               'start': e.start, 'duration': e.duration} for e in path],
+            'targets': {owner: {'edges': count, 'time': total, 'critical_time': critical}
+                        for owner, (count, total, critical) in times.items()},
+        },
+    }
+    try:
+        with open(trace_file, 'w') as f:
+            json.dump(trace, f)
+    except OSError as e:
+        console.warning('Failed to write the build trace to %s: %s' % (trace_file, e))
+        return
+    console.info('Build trace of %d edges is written to %s' % (len(edges), trace_file))
+    if path:
+        console.notice('Critical path: %.2fs in %d edges, bound by:' % (
+                       sum(e.duration for e in path), len(path)))
+        critical = sorted(((item[2], owner) for owner, item in times.items() if item[2]),
+                          reverse=True)
+        for seconds, owner in critical[:_TOP_TARGETS_SHOWN]:
+            console.notice(f'  {seconds:.4g}s\t{owner}', prefix=False)
@@ -1245,55 +1245,152 @@ def generate_resource_index(args):
     return _generate_resource_index(targets, sources, name, path)
 
 
-def generate_resource(args):
-    """Convert a file to a C byte array (replaces xxd -i | sed)."""
+def generate_resource(args, incbin=''):
+    """Embed a file as C data (replaces xxd -i | sed).
+
+    With ``--incbin=1`` an assembler stub that `.incbin`s the file is
+    generated instead of a C byte array, see `_generate_asm_resource`.
+    """
     output = args[0]
     inputs = args[1:]
     _declare_outputs(output)
+    if incbin:
+        return _generate_asm_resource(inputs, output)
     return _generate_c_resource(inputs, output)
 
 
+# Bytes of resource data converted per block, a multiple of the line length.
+_C_RESOURCE_BLOCK_SIZE = 1 << 20
+_C_RESOURCE_BYTES_PER_LINE = 16
+
+
+def _c_byte_array_lines(data):
+    """Format `data` as C array initializer lines, 16 `0x..` items per line.
+
+    Each byte takes exactly 6 characters (`0xab, `), so the hex digits and the
+    line breaks are filled in with strided slice assignments instead of a
+    Python loop over every byte, which is what made big resources slow.
+    """
+    import binascii  # pylint: disable=import-outside-toplevel
+    width = 6
+    line_width = width * _C_RESOURCE_BYTES_PER_LINE
+    for start in range(0, len(data), _C_RESOURCE_BLOCK_SIZE):
+        block = data[start:start + _C_RESOURCE_BLOCK_SIZE]
+        digits = binascii.hexlify(block)
+        text = bytearray(b'0x00, ') * len(block)
+        text[2::width] = digits[0::2]
+        text[3::width] = digits[1::2]
+        text[line_width - 1::line_width] = b'\n' * (len(block) // _C_RESOURCE_BYTES_PER_LINE)
+        if len(block) % _C_RESOURCE_BYTES_PER_LINE:
+            text[-1:] = b'\n'
+        yield text
+
+
 def _generate_c_resource(inputs, output):
     """Generate a C source file from binary resource files.
 
     Emits ``const char RESOURCE_<name>[]`` with hex byte data and
     ``const unsigned int RESOURCE_<name>_len`` for each input file.
     """
-    parts = []
-    for input_file in inputs:
-        with open(input_file, 'rb') as f:
-            data = f.read()
-        var_name = util.regular_variable_name(input_file)
-        parts.append(f'const char RESOURCE_{var_name}[] = {{')
-        for i in range(0, len(data), 12):
-            chunk = data[i:i + 12]
-            hex_bytes = ', '.join(f'0x{b:02x}' for b in chunk)
-            parts.append(f'  {hex_bytes}{"," if i + 12 < len(data) else ""}')
-        parts.append('};')
-        parts.append(f'const unsigned int RESOURCE_{var_name}_len = {len(data)};')
-        parts.append('')
+    with open(output, 'wb') as f:
+        for input_file in inputs:
+            with open(input_file, 'rb') as r:
+                data = r.read()
+            var_name = util.regular_variable_name(input_file)
+            f.write(f'const char RESOURCE_{var_name}[] = {{\n'.encode())
+            for lines in _c_byte_array_lines(data):
+                f.write(lines)
+            f.write(b'};\n')
+            f.write(f'const unsigned int RESOURCE_{var_name}_len = {len(data)};\n\n'.encode())
+
+
+_ASM_RESOURCE_PROLOGUE = '''\
+/* This file was automatically generated by blade */
+#if defined(__APPLE__)
+#  define BLADE_RESOURCE_SYMBOL(name) _##name
+#  define BLADE_RESOURCE_SECTION .const
+#else
+#  define BLADE_RESOURCE_SYMBOL(name) name
+#  define BLADE_RESOURCE_SECTION .section .rodata
+#endif
+#if defined(__ELF__)
+#  define BLADE_RESOURCE_OBJECT(sym, len) .type sym, %object; .size sym, len
+#else
+#  define BLADE_RESOURCE_OBJECT(sym, len)
+#endif
+'''
+
+_ASM_RESOURCE_ENTRY = '''
+    BLADE_RESOURCE_SECTION
+    .globl BLADE_RESOURCE_SYMBOL({name})
+    .balign 16
+BLADE_RESOURCE_SYMBOL({name}):
+    .incbin "{path}"
+    BLADE_RESOURCE_OBJECT({name}, {size})
+    .globl BLADE_RESOURCE_SYMBOL({name}_len)
+    .balign 4
+BLADE_RESOURCE_SYMBOL({name}_len):
+    .long {size}
+    BLADE_RESOURCE_OBJECT({name}_len, 4)
+'''
+
+_ASM_RESOURCE_EPILOGUE = '''
+#if defined(__ELF__)
+    .section .note.GNU-stack, "", %progbits
+#endif
+'''
+
+
+def _generate_asm_resource(inputs, output):
+    """Generate a preprocessed assembler source embedding resource files.
+
+    Defines the same ``RESOURCE_<name>`` and ``RESOURCE_<name>_len`` symbols
+    as `_generate_c_resource`, but the data is pulled in by the assembler's
+    `.incbin`, so there is nothing to format and nothing for the compiler to
+    parse, however big the resource is.
+
+    The stub only names the file, so it is rewritten on every run: its new
+    mtime is what makes ninja assemble it again when the resource changes.
+    The paths are relative to the workspace root, where ninja runs.
+    """
     with open(output, 'w') as f:
-        f.write('\n'.join(parts))
-        f.write('\n')
-
-
-def generate_javac_compile(args):
+        f.write(_ASM_RESOURCE_PROLOGUE)
+        for input_file in inputs:
+            path = util.to_unix_path(input_file).replace('\\', '\\\\').replace('"', '\\"')
+            f.write(_ASM_RESOURCE_ENTRY.format(
+                name='RESOURCE_' + util.regular_variable_name(input_file),
+                path=path, size=os.path.getsize(input_file)))
+        f.write(_ASM_RESOURCE_EPILOGUE)
+
+
+def generate_javac_compile(args, javac='javac', compression_level='',
+                           javac_server='', javac_server_max_concurrency='1',
+                           javac_server_idle_timeout='0'):
     """Compile Java sources and create a jar file.
 
     Arguments are positional:
-        classes_dir  output_jar  source_encoding  classpath  [javacflags...] -- [sources...]
+        classes_dir  output_jar  source_encoding  classpath  -- [javacflags...] -- [sources...]
+
+    The ``--`` sentinels separate javac flags from the arguments and the source
+    files so that multi-word Ninja variables (``${javacflags}``, ``${in}``) can
+    be unpacked unambiguously, and javac flags in the ``--name=value`` form
+    (e.g. ``--release=11``) are not parsed as options of this tool.
 
-    The ``--`` sentinel separates javac flags from source files so that
-    multi-word Ninja variables (``${javacflags}``, ``${in}``) can be
-    unpacked unambiguously.
+    The jar is written in-process by `_write_jar` rather than by the `jar`
+    command, which saves a JVM startup per edge.
+
+    When `javac_server` (the build dir) is given, the compilation is sent to
+    the warm compile server (see `blade.javac_server`) instead, falling back
+    to a local `javac` if the server can't be used.
     """
     import subprocess  # pylint: disable=import-outside-toplevel
-    sep = args.index('--')
+    flags_sep = args.index('--')
+    sep = args.index('--', flags_sep + 1)
     classes_dir = args[0]
     output = args[1]
     source_encoding = args[2]
     classpath = args[3]
-    javacflags = args[4:sep]
+    javacflags = args[flags_sep + 1:sep]
     sources = args[sep + 1:]
 
     _declare_outputs(output)
@@ -1307,10 +1404,21 @@ def generate_javac_compile(args):
     # `java_multiple_files`). See issue #1054.
     sources = _expand_java_srcjars(sources, classes_dir + '.srcs')
 
-    cmd = ['javac', '-encoding', source_encoding, '-d', classes_dir,
-           '-classpath', classpath] + javacflags + sources
-    subprocess.check_call(cmd)
-    subprocess.check_call(['jar', 'cf', output, '-C', classes_dir, '.'])
+    javac_args = ['-encoding', source_encoding, '-d', classes_dir,
+                  '-classpath', classpath] + javacflags + sources
+    result = None
+    if javac_server:
+        from blade import javac_server as server  # pylint: disable=import-outside-toplevel
+        result = server.run(javac_server, javac, int(javac_server_max_concurrency),
+                            int(javac_server_idle_timeout), javac_args)
+    if result is None:
+        subprocess.check_call([javac] + javac_args)
+    else:
+        returncode, diagnostics = result
+        sys.stderr.write(diagnostics.decode('utf-8', errors='replace'))
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode, [javac] + javac_args)
+    _write_jar(output, _list_jar_dir_entries(classes_dir), compression_level)
 
 
 def _expand_java_srcjars(sources, extract_dir):
@@ -1364,31 +1472,148 @@ def generate_proto_java_srcjar(args):
                     z.write(full, arcname)
 
 
+# Every jar entry gets this fixed timestamp (the earliest date a zip can
+# hold), so identical inputs always produce byte-identical jars.
+_JAR_ENTRY_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+_JAR_MANIFEST = 'META-INF/MANIFEST.MF'
+_JAR_DEFAULT_MANIFEST = b'Manifest-Version: 1.0\r\nCreated-By: Blade\r\n\r\n'
+
+
+def _jar_compression(compression_level):
+    """Map `java_config.jar_compression_level` to zipfile (method, level)."""
+    import zipfile  # pylint: disable=import-outside-toplevel
+    if compression_level == '':
+        return zipfile.ZIP_DEFLATED, None
+    level = int(compression_level)
+    if level == 0:
+        return zipfile.ZIP_STORED, None
+    return zipfile.ZIP_DEFLATED, level
+
+
+def _list_jar_dir_entries(root):
+    """Return {arcname: path} for every file under `root`."""
+    entries = {}
+    for dirpath, _, files in os.walk(root):
+        for name in files:
+            path = os.path.join(dirpath, name)
+            entries[util.to_unix_path(os.path.relpath(path, root))] = path
+    return entries
+
+
+def _jar_entry_order(entries):
+    """Return the sorted arcnames of `entries` plus their parent directories.
+
+    `META-INF/MANIFEST.MF` goes first, as `java.util.jar.JarInputStream`
+    only finds the manifest when it is one of the leading entries.
+    """
+    names = set()
+    for arcname in entries:
+        names.add(arcname)
+        dir = os.path.dirname(arcname)
+        while dir:
+            names.add(dir + '/')
+            dir = os.path.dirname(dir)
+    names.discard(_JAR_MANIFEST)
+    names.discard('META-INF/')
+    return ['META-INF/', _JAR_MANIFEST] + sorted(names)
+
+
+def _write_jar(output, entries, compression_level):
+    """Write a jar with deterministic entry order and timestamps.
+
+    Args:
+        entries: dict of arcname -> content, where content is either a file
+            path or the entry bytes. A default manifest is supplied unless
+            `META-INF/MANIFEST.MF` is among the entries.
+
+    The jar is built next to `output` and only moved into place when its
+    content differs, so an unchanged jar keeps its mtime and ninja's
+    `restat` can prune the dependent edges.
+    """
+    import filecmp  # pylint: disable=import-outside-toplevel
+    import zipfile  # pylint: disable=import-outside-toplevel
+    compression, level = _jar_compression(compression_level)
+    tmp = output + '.tmp'
+    with zipfile.ZipFile(tmp, 'w', compression, compresslevel=level, allowZip64=True) as jar:
+        for arcname in _jar_entry_order(entries):
+            info = zipfile.ZipInfo(arcname, date_time=_JAR_ENTRY_DATE_TIME)
+            if arcname.endswith('/'):
+                info.external_attr = (0o40755 << 16) | 0x10
+                jar.writestr(info, b'')
+                continue
+            info.compress_type = compression
+            info.external_attr = 0o644 << 16
+            content = entries.get(arcname, _JAR_DEFAULT_MANIFEST)
+            if isinstance(content, str):
+                with open(content, 'rb') as f:
+                    content = f.read()
+            jar.writestr(info, content, compress_type=compression, compresslevel=level)
+    if os.path.exists(output) and filecmp.cmp(tmp, output, shallow=False):
+        os.remove(tmp)
+    else:
+        os.replace(tmp, output)
+
+
 def generate_java_jar(compression_level, args):
-    jar, target = args[0], args[1]
+    """Merge a classes jar (if any) and resources into the final jar.
+
+    Invoked as ``java_jar --compression_level=<level> <out.jar> [<name>__classes__.jar] <resources...>``.
+    """
+    import zipfile  # pylint: disable=import-outside-toplevel
+    target = args[0]
     _declare_outputs(target)
     resources_dir = target.replace('.jar', '.resources')
-    arg = args[2]
+    arg = args[1]
+    entries = {}
     if arg.endswith('__classes__.jar'):
-        classes_jar = arg
-        resources = args[3:]
-    else:
-        classes_jar = ''
+        with zipfile.ZipFile(arg) as classes_jar:
+            for name in classes_jar.namelist():
+                if not name.endswith('/'):
+                    entries[name] = classes_jar.read(name)
         resources = args[2:]
-
-    def archive_resources(resources_dir, resources, new=True):
-        options = ('c' if new else 'u') + 'f' + compression_level
-        cmd = [f'{jar} {options} {target}']
-        for resource in resources:
-            cmd.append(f"-C '{resources_dir}' '{os.path.relpath(resource, resources_dir)}'")
-        return util.shell(cmd)
-
-    if classes_jar:
-        shutil.copy2(classes_jar, target)
-        if resources:
-            return archive_resources(resources_dir, resources, False)
     else:
-        return archive_resources(resources_dir, resources, True)
+        resources = args[1:]
+    for resource in resources:
+        entries[util.to_unix_path(os.path.relpath(resource, resources_dir))] = resource
+    _write_jar(target, entries, compression_level)
+
+
+# Annotation processors are looked up on the classpath when no processor
+# path is given, and they need their real code to run.
+_JAVA_PROCESSOR_SERVICE = 'META-INF/services/javax.annotation.processing.Processor'
+
+
+def generate_java_abi(args):
+    """Derive the interface-only jar of a java_library jar.
+
+    Invoked as ``java_abi <out.abi.jar> <in.jar>``. See `blade.java_abi`.
+    A jar providing annotation processors is kept whole.
+    """
+    import zipfile  # pylint: disable=import-outside-toplevel
+    from blade import java_abi  # pylint: disable=import-outside-toplevel
+    output, input = args
+    _declare_outputs(output)
+    entries = {}
+    with zipfile.ZipFile(input) as jar:
+        names = [name for name in jar.namelist() if not name.endswith('/')]
+        keep_whole = _JAVA_PROCESSOR_SERVICE in names
+        for name in names:
+            if keep_whole:
+                entries[name] = jar.read(name)
+                continue
+            if not name.endswith('.class'):
+                continue
+            data = jar.read(name)
+            if name.endswith('module-info.class'):
+                entries[name] = data
+                continue
+            try:
+                data = java_abi.class_abi(data)
+            except java_abi.ClassFormatError as e:
+                console.debug(f'{input}: keep {name} unchanged: {e}')
+            if data is not None:
+                entries[name] = data
+    _write_jar(output, entries, '0')
 
 
 def generate_java_resource(args):
@@ -1660,7 +1885,7 @@ def _pybin_add_zip(pybin, libname, filter, exclusions, dirs, dirs_with_init_py):
             if filter(name) and not _is_python_excluded_path(name, exclusions):
                 if dirs is not None and dirs_with_init_py is not None:
                     _update_init_py_dirs(name, dirs, dirs_with_init_py)
-                pybin.writestr(name, lib.read(name))
+                pybin.copy_member(lib, name)
 
 
 def _pybin_add_egg(pybin, libname, exclusions):
@@ -1683,33 +1908,38 @@ def _pybin_add_whl(pybin, libname, exclusions, dirs, dirs_with_init_py):
     _pybin_add_zip(pybin, libname, filter, exclusions, dirs, dirs_with_init_py)
 
 
-def generate_python_binary(pybin, basedir, exclusions, mainentry, args):
+def generate_python_binary(pybin, basedir, exclusions, mainentry, args, precompile=''):
     # pybin is the wrapper script.  The zip always goes to
     # <pybin_without_extension>.zip, identical on all platforms.
-    import zipfile  # pylint: disable=import-outside-toplevel
+    from blade import python_zip  # pylint: disable=import-outside-toplevel
     base, _ = os.path.splitext(pybin)
     zip_path = base + '.zip'
     _declare_outputs(pybin, zip_path)
 
-    # Generate the pure zip file — identical on all platforms.
-    pybin_zip = zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
-    exclusions = exclusions.split(',')
-    dirs, dirs_with_init_py = set(), set()
-    for arg in args:
-        if arg.endswith('.pylib'):
-            _pybin_add_pylib(pybin_zip, arg, exclusions, dirs, dirs_with_init_py)
-        elif arg.endswith('.egg'):
-            _pybin_add_egg(pybin_zip, arg, exclusions)
-        elif arg.endswith('.whl'):
-            _pybin_add_whl(pybin_zip, arg, exclusions, dirs, dirs_with_init_py)
-        else:
-            assert False, 'Unknown file type "%s" to build python_binary' % arg
-
-    # Insert __init__.py into each dir if missing
-    dirs_missing_init_py = dirs - dirs_with_init_py
-    for dir in sorted(dirs_missing_init_py):
-        pybin_zip.writestr(os.path.join(dir, '__init__.py'), '')
-    pybin_zip.writestr('__init__.py', '')
+    # Generate the pure zip file — identical on all platforms. Unchanged
+    # members are reused from the previous zip, see `blade.python_zip`.
+    pybin_zip = python_zip.PythonBinaryZip(zip_path, precompile=bool(precompile))
+    try:
+        exclusions = exclusions.split(',')
+        dirs, dirs_with_init_py = set(), set()
+        for arg in args:
+            if arg.endswith('.pylib'):
+                _pybin_add_pylib(pybin_zip, arg, exclusions, dirs, dirs_with_init_py)
+            elif arg.endswith('.egg'):
+                _pybin_add_egg(pybin_zip, arg, exclusions)
+            elif arg.endswith('.whl'):
+                _pybin_add_whl(pybin_zip, arg, exclusions, dirs, dirs_with_init_py)
+            else:
+                assert False, 'Unknown file type "%s" to build python_binary' % arg
+
+        # Insert __init__.py into each dir if missing
+        dirs_missing_init_py = dirs - dirs_with_init_py
+        for dir in sorted(dirs_missing_init_py):
+            pybin_zip.writestr(os.path.join(dir, '__init__.py'), '')
+        pybin_zip.writestr('__init__.py', '')
+    except BaseException:
+        pybin_zip.discard()
+        raise
     pybin_zip.close()
 
     if os.name == 'nt':
@@ -1780,6 +2010,28 @@ def generate_go_overlay(args, out, build_dir):
     return 0
 
 
+def generate_action(args, action, rspfile='', cache_dir='', remote='',
+                    remote_policy='readwrite', remote_timeout='10', remote_down_stamp=''):
+    """Run a build action through the action cache, see `action_cache`.
+
+    Arguments are positional:
+        outputs... -- inputs...
+    """
+    from blade import action_cache  # pylint: disable=import-outside-toplevel
+    sep = args.index('--')
+    remote_cache = None
+    if remote:
+        from blade import remote_cache as rc  # pylint: disable=import-outside-toplevel
+        remote_cache = rc.RemoteCache(remote, remote_policy, float(remote_timeout),
+                                      remote_down_stamp)
+    try:
+        return action_cache.run(action, rspfile, args[:sep], args[sep + 1:],
+                                cache_dir=cache_dir, remote=remote_cache)
+    finally:
+        if remote_cache:
+            remote_cache.close()
+
+
 _BUILTIN_TOOLS = {
     'scm': generate_scm,
     'go_overlay': generate_go_overlay,
@@ -1795,6 +2047,7 @@ _BUILTIN_TOOLS = {
     'resource': generate_resource,
     'resource_index': generate_resource_index,
     'java_jar': generate_java_jar,
+    'java_abi': generate_java_abi,
     'java_resource': generate_java_resource,
     'java_test': generate_java_test,
     'java_fatjar': generate_fat_jar,
@@ -1806,6 +2059,7 @@ _BUILTIN_TOOLS = {
     'python_library': generate_python_library,
     'python_binary': generate_python_binary,
     'dwp': generate_dwp,
+    'action': generate_action,
 }
 
 
@@ -40,7 +40,12 @@ if TYPE_CHECKING:
 # `多个防止重包含可能对其有用：` is the Chinese of `Multiple include guards...`;
 # after that marker the trailing file list is noise, but later lines (e.g. a
 # cuda error) may still matter, so we don't `exit` early.
+#
+# The precompiled headers gcc uses (`! x.gch`) or rejects (`x x.gch`) are
+# dropped, the headers in them are checked with the inclusion stack of the
+# precompiled header.
 _INCLUSION_SPLITTER_AWK = r'''
+/^[!x] / { next }                                    # a precompiled header
 /Multiple include guards may be useful for:|多个防止重包含可能对其有用：/ { stop = 1 }
 /^\.+ [^\/]/ && !end { started = 1; print $0 }       # an inclusion-stack line
 !/^\.+ / && started { end = 1 }                      # first line after the stack
@@ -706,6 +711,51 @@ def _lto_plugin_ar_nm(toolchain: 'ToolChain') -> tuple[str | None, str | None]:
     return (ar or None), (nm or None)
 
 
+# --- Linker selection ---------------------------------------------------------
+#
+# Linking is on the critical path of most incremental builds, and the faster
+# linkers are an order of magnitude faster than GNU ld on big binaries.
+# `cc_config.linker` selects one by the `-fuse-ld=` driver flag, probed by
+# `supports_link_flag` so a linker which is not installed (or which the
+# driver doesn't know, such as mold with gcc < 12) is never used. Linux only:
+# macOS keeps ld64 and MSVC its own linker.
+
+# The fast linkers 'auto' selects from, the fastest first
+FAST_LINKERS = ('mold', 'lld')
+
+
+def usable_linkers(toolchain: 'ToolChain', linkers=FAST_LINKERS) -> list[str]:
+    """Return the linkers the toolchain can link with by `-fuse-ld=`."""
+    if toolchain.target_os != 'linux' or toolchain.cc_is('msvc'):
+        return []
+    return [linker for linker in linkers if toolchain.supports_link_flag('-fuse-ld=' + linker)]
+
+
+def _select_linker(options: 'argparse.Namespace', toolchain: 'ToolChain') -> str:
+    """Return the linker of `cc_config.linker` to use, or '' for the default one.
+
+    'auto' selects the fastest usable one of `FAST_LINKERS`. lld can't link the
+    LTO objects of gcc (GIMPLE, not bitcode), so it is not selected then.
+    """
+    setting = config.get_item('cc_config', 'linker')
+    if setting == 'default':
+        return ''
+    if setting != 'auto':
+        if usable_linkers(toolchain, [setting]):
+            return setting
+        if toolchain.target_os == 'linux' and not toolchain.cc_is('msvc'):
+            console.warning('"cc_config.linker": %s is not usable, use the default linker' % setting)
+        return ''
+    candidates = FAST_LINKERS
+    if _lto_mode(options, toolchain) and toolchain.cc_is('gcc'):
+        candidates = tuple(linker for linker in candidates if linker != 'lld')
+    linkers = usable_linkers(toolchain, candidates)
+    if linkers:
+        console.debug('Linker: %s' % linkers[0])
+        return linkers[0]
+    return ''
+
+
 # --- MSVC (native cl.exe) LTO (#1378) ----------------------------------------
 #
 # MSVC's LTO is Link-Time Code Generation: `/GL` on every compile, `/LTCG` on
@@ -821,6 +871,9 @@ class CcRuleGenerator:
     def _builtin_command(self, builder, args=''):
         return self._ctx.builtin_command(builder, args)
 
+    def _memory_pool(self, name, kind, depth=0):
+        return self._ctx.memory_pool(name, kind, depth)
+
     def generate_rule(self, name, command, description=None, depfile=None,
                       generator=False, pool=None, restat=False, rspfile=None,
                       rspfile_content=None, deps=None):
@@ -1043,6 +1096,10 @@ class CcRuleGenerator:
             if self.build_toolchain.supports_link_flag(no_warn_dup):
                 linkflags.append(no_warn_dup)
 
+        linker = _select_linker(self.options, self.build_toolchain)
+        if linker:
+            linkflags.append('-fuse-ld=' + linker)
+
         cppflags = self.build_toolchain.filter_cc_flags(cppflags)
         return cppflags, linkflags
 
@@ -1202,6 +1259,7 @@ class CcRuleGenerator:
         py = sys.executable
         wrapper = self._msvc_tee_wrapper_py()
         template = '"%s" -B %s ${inclusion_stack} -- ' % (py, wrapper)
+        pool = self._memory_pool('compile_pool', 'compile')
 
         cc_command = template + ('"%s" /nologo /c /showIncludes %s %s %s %s /Fo${out} ${c_warnings} /external:W0 ${cppflags} ${sanitize} ${lto} ${includes} ${extra_compile_flags} ${in}' % (
             cc, optimize, ' '.join(cppflags), ' '.join(cflags), include_flags))
@@ -1209,6 +1267,7 @@ class CcRuleGenerator:
                            command=cc_command,
                            description='CC ${in}',
                            deps='msvc',
+                           pool=pool,
                            restat=True)
 
         cxx_command = template + ('"%s" /nologo /c /showIncludes %s %s %s %s /Fo${out} ${cxx_warnings} /external:W0 ${cppflags} ${sanitize} ${lto} ${includes} ${extra_compile_flags} ${in}' % (
@@ -1217,6 +1276,7 @@ class CcRuleGenerator:
                            command=cxx_command,
                            description='CXX ${in}',
                            deps='msvc',
+                           pool=pool,
                            restat=True)
 
         # For cxxhdrs: use /showIncludes to generate inclusion info for header
@@ -1454,6 +1514,8 @@ class CcRuleGenerator:
         includes = ' '.join(['-I%s' % inc for inc in includes])
 
         template = self._cc_compile_command_wrapper_template('${inclusion_stack}')
+        # The compilations distributed by distcc don't take the local memory
+        pool = None if self.build_accelerator.distcc else self._memory_pool('compile_pool', 'compile')
 
         cc_command = ('%s -o ${out} -MMD -MF ${out}.d -c -fPIC %s %s ${optimize} ${lto} '
                       '${c_warnings} ${cppflags} ${sanitize} ${extra_compile_flags} %s ${includes} ${in}') % (
@@ -1463,21 +1525,34 @@ class CcRuleGenerator:
                            description='CC ${in}',
                            depfile='${out}.d',
                            deps='gcc',
+                           pool=pool,
                            # restat lets ninja prune the inclusion check when the
                            # per-source `${inclusion_stack}` (`<src>.incstk`) is
                            # unchanged (written write-if-changed). See issue #1161.
                            restat=True)
 
-        cxx_command = ('%s -o ${out} -MMD -MF ${out}.d -c -fPIC %s %s ${optimize} ${lto} '
-                       '${cxx_warnings} ${cppflags} ${sanitize} ${extra_compile_flags} %s ${includes} ${in}') % (
-                               cxx, ' '.join(cxxflags), ' '.join(cppflags), includes)
+        cxx_flags = ('-MMD -MF ${out}.d -c -fPIC %s %s ${optimize} ${lto} ${cxx_warnings} '
+                     '${cppflags} ${sanitize} ${extra_compile_flags} %s ${includes}') % (
+                             ' '.join(cxxflags), ' '.join(cppflags), includes)
+        # ${pch} uses the precompiled header of the target, see `CcTarget._register_pch`
+        cxx_command = '%s -o ${out} %s ${pch} ${in}' % (cxx, cxx_flags)
         self.generate_rule(name='cxx',
                            command=template % cxx_command,
                            description='CXX ${in}',
                            depfile='${out}.d',
                            deps='gcc',
+                           pool=pool,
                            restat=True)  # see the cc rule / issue #1161
 
+        # Precompile a header with the same flags as the sources which use it,
+        # its inclusion stack is checked with theirs.
+        self.generate_rule(name='cxxpch',
+                           command=template % ('%s -x c++-header -o ${out} %s ${in}' % (cxx, cxx_flags)),
+                           description='CXX PCH ${in}',
+                           depfile='${out}.d',
+                           deps='gcc',
+                           pool=pool)
+
         self.generate_rule(name='secretcc',
                            command=template % (cc_config['secretcc'] + ' ' + cxx_command),
                            description='SECRET CC ${in}',
@@ -1613,6 +1688,14 @@ class CcRuleGenerator:
             if deterministic:
                 extra += 'D'
             if thin:
+                # A thin archive only refers to its members by path, so it is
+                # useless out of the build dir. `arfull` turns it into a real
+                # one for packaging, from its members listed by `ar t` (the
+                # paths relative to the cwd), see PackageTarget.
+                self.generate_rule(
+                        name='arfull',
+                        command=f'rm -f $out; {ar} rcs{extra} $out $$({ar} t $in)',
+                        description='AR FULL ${out}')
                 extra += 'T'
             command = f'rm -f $out; {ar} rcs{extra} $out $in'
         else:
@@ -1642,14 +1725,11 @@ class CcRuleGenerator:
 
         link_jobs = config.get_item('link_config', 'link_jobs')
         if link_jobs:
-            link_jobs = min(link_jobs, self.blade.build_jobs_num())
-            console.info('Adjust parallel link jobs number to %s' % link_jobs)
-            pool = 'link_pool'
-            self._add_line(textwrap.dedent('''\
-                    pool %s
-                      depth = %s''') % (pool, link_jobs))
-        else:
-            pool = None
+            console.info('Adjust parallel link jobs number to %s' % min(
+                         link_jobs, self.blade.build_jobs_num()))
+        # Otherwise as many as fit in the memory
+        link_kind = 'lto_link' if _lto_mode(self.options, self.build_toolchain) else 'link'
+        pool = self._memory_pool('link_pool', link_kind, link_jobs)
 
         # Linking might have a lot of object files exceeding maximal length of a bash command line.
         # Using response file can resolve this problem.
@@ -1735,7 +1815,7 @@ class CcRuleGenerator:
 
         template = self._cc_compile_command_wrapper_template('${inclusion_stack}', cuda=True)
 
-        _, cxx, _ = self.build_accelerator.get_cc_commands()
+        _, cxx, _ = self.build_toolchain.get_cc_commands()  # The host compiler of nvcc
         cu_command = '%s -ccbin "%s" -o ${out} -MMD -MF ${out}.d ' \
             '-Xcompiler -fPIC %s %s %s ${optimize} ${cu_warnings} ' \
             '%s ${includes} ${cppflags} ${cuflags} -c ${in}' % (
@@ -1813,7 +1893,7 @@ class CcRuleGenerator:
         wrapper = self._msvc_tee_wrapper_py()
         template = '"%s" -B %s ${inclusion_stack} -- ' % (py, wrapper)
 
-        _, cxx, _ = self.build_accelerator.get_cc_commands()
+        _, cxx, _ = self.build_toolchain.get_cc_commands()  # The host compiler of nvcc
         cu_command = template + ('"${cmd}" -ccbin "%s" -o ${out} -c '
                                  '-Xcompiler /nologo -Xcompiler /showIncludes '
                                  '%s %s %s '
@@ -30,12 +30,14 @@ from blade.blade_types import StrOrListOpt
 from blade.constants import HEAP_CHECK_VALUES
 from blade.target import Target
 from blade.util import (
+    md5sum,
     mkdir_p,
     path_under_dir,
     run_command,
     stable_unique,
     var_to_list,
-    var_to_list_or_none)
+    var_to_list_or_none,
+    write_if_changed)
 from blade.version import LooseVersion as version_parse
 
 
@@ -458,6 +460,16 @@ class CcTarget(Target):
         # strategy is one choice for the whole build -- so only False is acted on.
         lto = kwargs.pop('lto', None)
 
+        # 'pch' (cc-only): a header precompiled once and used by the C++ sources
+        # of the target, instead of compiling it in each of them. Targets whose
+        # compile flags are the same share it, see `_register_pch`.
+        pch = kwargs.pop('pch', None)
+
+        # 'unity' (cc-only, default None = follow `cc_config.unity`). Set
+        # unity=False on a target whose sources can't be compiled together
+        # (e.g. conflicting file-local names), see `_write_unity_sources`.
+        unity = kwargs.pop('unity', None)
+
         super().__init__(
                 name=name,
                 type=type,
@@ -471,6 +483,13 @@ class CcTarget(Target):
         self.attr['sanitize'] = bool(sanitize)
         if lto is not None:
             self.attr['lto'] = bool(lto)
+        if pch:
+            if not is_header_file(pch):
+                self.error('"pch" must be a header file, got "%s"' % pch)
+            else:
+                self.attr['pch'] = self._expand_sources([pch])[0][1]
+        if unity is not None:
+            self.attr['unity'] = bool(unity)
         self._check_defs(defs)
         self._check_incorrect_no_warning(warning)
 
@@ -1016,7 +1035,18 @@ class CcTarget(Target):
         emit_inclusion_stack = self._emits_inclusion_stack()
         objs = []
         inclusion_stacks = []
-        for src, full_src in expanded_srcs:
+        # The sources in unity batches are compiled through their unity source.
+        srcs = {src for src, _ in expanded_srcs}
+        compiles = []
+        batched = set()
+        for unity_src, batch in self.data.get('unity_batches', []):
+            if batch[0][0] in srcs:
+                compiles.append((unity_src, os.path.join(objs_dir, unity_src),
+                                 [full_src for _, full_src in batch]))
+                batched.update(src for src, _ in batch)
+        compiles = [(src, full_src, []) for src, full_src in expanded_srcs
+                    if src not in batched] + compiles
+        for src, full_src, batch_srcs in compiles:
             # secret source is not really exist and is not target of any build, declare it as phony
             # to avoid file missing error
             if secret and path_under_dir(full_src, self.build_dir):
@@ -1028,15 +1058,19 @@ class CcTarget(Target):
             emit_stack = emit_inclusion_stack and rule != 'as'
             objvars, stack = vars, None
             extra = self._extra_compile_flags_for(src)
-            if emit_stack or extra:
+            # Not Objective-C++, which can't use the C++ one
+            pch = self.data.get('pch') if rule == 'cxx' and src.endswith(('.cc', '.cpp', '.cxx')) else None
+            if emit_stack or extra or pch:
                 objvars = dict(vars)
                 if emit_stack:
                     stack = os.path.join(objs_dir, src) + '.incstk'
                     objvars['inclusion_stack'] = stack
                 if extra:
                     objvars['extra_compile_flags'] = ' '.join(extra)
+                if pch:
+                    objvars['pch'] = pch['flags']
             self.generate_build(rule, obj, inputs=full_src,
-                                implicit_deps=implicit_deps,
+                                implicit_deps=implicit_deps + batch_srcs + ([pch['output']] if pch else []),
                                 order_only_deps=order_only_deps,
                                 implicit_outputs=[stack] if stack else None,
                                 variables=objvars, clean=[])
@@ -1088,6 +1122,9 @@ class CcTarget(Target):
             # Fallback (e.g. cuda, or compdb dump where no `.H` is produced): the
             # `.o` is the ordering/trigger dep as before.
             implicit_deps += objs
+        pch = self.data.get('pch')
+        if pch and pch['inclusion_stack']:
+            implicit_deps.append(pch['inclusion_stack'])
 
         check_info_file = self.data['inclusion_check_info_file']
         check_result_file = check_info_file + '.result'
@@ -1102,6 +1139,8 @@ class CcTarget(Target):
         self.generate_build('ar', output, inputs=objs,
                             order_only_deps=inclusion_check_result)
         self._add_default_target_file(tc.STATIC_LIB_LABEL, output)
+        if tc.target_os == 'linux' and config.get_item('cc_library_config', 'thin'):
+            self.data['thin_archive'] = output
         # `_static_cc_library` is gated by `if objs:` in CcLibrary.generate(),
         # so header-only libs never reach here -- they have no objects, hence
         # no `.a`, no `.syms`, and no undefined-symbol check. Consumers that
@@ -1523,6 +1562,14 @@ class CcTarget(Target):
                 config.get_item('cc_config', 'unused_deps_suppress').get(self.key, []),
             'keep_deps': self.attr.get('keep_deps', []),
         }
+        pch = self.data.get('pch')
+        if pch and pch['inclusion_stack']:
+            target_check_info['pch'] = [self.attr['pch'], pch['inclusion_stack'], pch['wrapper']]
+        if self.data.get('unity_batches') and self._emits_inclusion_stack():
+            objs_dir = self._target_file_path(self.name + '.objs')
+            target_check_info['unity'] = {
+                src: os.path.join(objs_dir, unity_src) + '.incstk'
+                for unity_src, batch in self.data['unity_batches'] for src, _ in batch}
         content = pickle.dumps(target_check_info)
 
         # Only update file when content changes to avoid unnecessary recheck
@@ -1556,6 +1603,97 @@ class CcTarget(Target):
         with open(filename + '.extra', 'wb') as f:
             f.write(pickle.dumps(extra_target_check_info))
 
+    def _register_pch(self):
+        """Register the precompiled header of the target to be built, see `Blade.register_pch`.
+
+        It is built with the compile vars of the C++ sources, in a dir keyed by
+        them, so the targets with the same header and flags share it. gcc finds
+        `<wrapper>.gch` when the wrapper, which includes the header, is
+        included, and falls back to the header if it can't use it; ccache
+        needs `-fpch-preprocess` to cache such compilations. clang is given
+        the `.pch` file.
+        """
+        header = self.attr.get('pch')
+        if not header:
+            return
+        tc = self.blade.get_build_toolchain()
+        if tc.cc_is('msvc'):
+            self.warning('"pch" is not supported by MSVC yet, ignored')
+            return
+        variables = self._get_cc_vars()
+        extra = self.attr.get('extra_cxxflags')
+        if extra:
+            variables['extra_compile_flags'] = ' '.join(extra)
+        clang = tc.cc_is('clang')
+        key = md5sum(str([header, clang, sorted(variables.items())]))
+        pch_dir = os.path.join(self.build_dir, '.pch', key[:16])
+        wrapper = os.path.join(pch_dir, os.path.basename(header))
+        if clang:
+            output = wrapper + '.pch'
+            flags = '-include-pch %s' % output
+        else:
+            output = wrapper + '.gch'
+            flags = '-Winvalid-pch -fpch-preprocess -include %s' % wrapper
+            mkdir_p(pch_dir)
+            write_if_changed(wrapper, '#include "%s"\n' % header)
+        stack = wrapper + '.incstk' if self._emits_inclusion_stack() else None
+        self.data['pch'] = {'output': output, 'flags': flags, 'inclusion_stack': stack,
+                            'wrapper': wrapper}
+        self.blade.register_pch({
+            'output': output,
+            'inclusion_stack': stack,
+            'input': header,
+            'variables': variables,
+            'order_only_deps': self._collect_cc_compile_deps(),
+        })
+
+    def _write_unity_sources(self):
+        """Write the unity sources of the target, which include batches of its sources.
+
+        With `cc_config.unity` or the `unity` attribute, the C and the C++
+        sources which are not generated are each compiled in batches of about
+        `cc_config.unity_batch_size` sources, in the order of their paths. A
+        batch ends after a source whose path hashes to a multiple of the size
+        (or at twice the size), so adding or removing a source only changes
+        its own batch, not all of the following ones. A single source is
+        compiled as usual.
+        """
+        unity = self.attr.get('unity')
+        if unity is None:
+            unity = config.get_item('cc_config', 'unity')
+        size = config.get_item('cc_config', 'unity_batch_size')
+        # The compilation database lists the sources themselves
+        if not unity or size < 2 or self.attr.get('secret') or not self._emits_inclusion_stack():
+            return
+        groups = {'.c': [], '.cc': []}
+        for src, full_src in self.attr['expanded_srcs']:
+            if path_under_dir(full_src, self.build_dir):
+                continue
+            if src.endswith(('.cc', '.cpp', '.cxx')):
+                groups['.cc'].append((src, full_src))
+            elif src.endswith('.c'):
+                groups['.c'].append((src, full_src))
+        objs_dir = self._target_file_path(self.name + '.objs')
+        unity_batches = []
+        for ext, sources in groups.items():
+            batches, batch = [], []
+            for src, full_src in sorted(sources):
+                batch.append((src, full_src))
+                if len(batch) >= 2 * size or int(md5sum(full_src), 16) % size == 0:
+                    batches.append(batch)
+                    batch = []
+            if batch:
+                batches.append(batch)
+            for batch in batches:
+                if len(batch) < 2:
+                    continue
+                unity_src = os.path.splitext(batch[0][0])[0] + '.unity' + ext
+                path = os.path.join(objs_dir, unity_src)
+                mkdir_p(os.path.dirname(path))
+                write_if_changed(path, ''.join('#include "%s"\n' % full_src for _, full_src in batch))
+                unity_batches.append((unity_src, batch))
+        self.data['unity_batches'] = unity_batches
+
     def _incchk_is_valid(self, filename, content, info):
         """Check whether the existing incchk file is still valid."""
         with open(filename, 'rb') as f:
@@ -1779,6 +1917,8 @@ class CcLibrary(CcTarget):
 
     def _before_generate(self):  # override
         """Override"""
+        self._register_pch()
+        self._write_unity_sources()
         self._write_inclusion_check_info()
         self._check_binary_link_only()
         self._check_hdrs_existence()
@@ -3050,6 +3190,8 @@ class CcBinary(CcTarget):
 
     def _before_generate(self):  # override
         """Override"""
+        self._register_pch()
+        self._write_unity_sources()
         self._write_inclusion_check_info()
         self._check_hdrs_existence()
 
@@ -3235,6 +3377,8 @@ class CcPlugin(CcTarget):
 
     def _before_generate(self):  # override
         """Override"""
+        self._register_pch()
+        self._write_unity_sources()
         self._write_inclusion_check_info()
 
     def generate(self):
@@ -3368,6 +3512,11 @@ class CcTest(CcBinary):
             exclusive: bool,
             heap_check: str | None,
             heap_check_debug: bool,
+            shard_count: int,
+            readonly_testdata: bool,
+            test_cpu: int,
+            test_memory: int | str,
+            test_lock: str,
             kwargs: dict[str, object]):
         """Init method."""
         # pylint: disable=too-many-locals
@@ -3405,6 +3554,9 @@ class CcTest(CcBinary):
         self.attr['testdata'] = var_to_list(testdata)
         self.attr['always_run'] = always_run
         self.attr['exclusive'] = exclusive
+        self._set_shard_count(shard_count)
+        self.attr['readonly_testdata'] = readonly_testdata
+        self._set_test_resources(test_cpu, test_memory, test_lock)
         self._add_tags('lang:cc', 'type:test')
 
         gtest_lib = var_to_list(cc_test_config['gtest_libs'])
@@ -3457,6 +3609,11 @@ def cc_test(name: str,
             exclusive: bool = False,
             heap_check: str | None = None,
             heap_check_debug: bool = False,
+            shard_count: int = 0,
+            readonly_testdata: bool = False,
+            test_cpu: int = 1,
+            test_memory: int | str = 0,
+            test_lock: str = '',
             **kwargs: object):
     """cc_test target."""
     # pylint: disable=too-many-locals
@@ -3485,6 +3642,11 @@ def cc_test(name: str,
             exclusive=exclusive,
             heap_check=heap_check,
             heap_check_debug=heap_check_debug,
+            shard_count=shard_count,
+            readonly_testdata=readonly_testdata,
+            test_cpu=test_cpu,
+            test_memory=test_memory,
+            test_lock=test_lock,
             kwargs=kwargs)
     cc_test_target.attr['keep_deps'] = [cc_test_target._unify_dep(d) for d in keep_deps]
     build_manager.instance.register_target(cc_test_target)
@@ -83,6 +83,7 @@ class CommandLineParser:
     def _check_subcommand(self, command, options, targets):
         """Check correctness of subcommand."""
         actions = {
+            'benchmark': self._check_benchmark_command,
             'build': self._check_build_command,
             'clean': self._check_clean_command,
             'dump': self._check_dump_command,
@@ -115,6 +116,8 @@ class CommandLineParser:
 
     def _check_test_options(self, options, targets):
         """check that test command options."""
+        if options.changed_since and options.changed_files:
+            console.fatal('--changed-since and --changed-files can not be used together')
 
     def _check_plat_and_profile_options(self, options, targets):
         """check platform and profile options."""
@@ -156,6 +159,12 @@ class CommandLineParser:
         """check build options."""
         self._check_build_options(options, targets)
 
+    def _check_benchmark_command(self, options, targets):
+        """check benchmark options."""
+        self._check_build_options(options, targets)
+        if options.runs < 1:
+            console.fatal('--runs must be at least 1')
+
     def _check_dump_command(self, options, targets):
         """check build options."""
         self._check_build_options(options, targets)
@@ -288,6 +297,11 @@ class CommandLineParser:
             '--show-builds-slower-than', dest='show_builds_slower_than', metavar='SECONDS', type=float,
             help='Show build commands which are slower than specified seconds')
 
+        parser.add_argument(
+            '--trace', dest='trace', metavar='FILE',
+            help='Write a Chrome trace JSON of the blade stages and the build commands, '
+                 'with the critical path of the build')
+
     def __add_coverage_arguments(self, parser):
         """Add coverage arguments."""
         parser.add_argument(
@@ -378,6 +392,28 @@ class CommandLineParser:
             action='store_true', default=None,
             help='Generate .dwp file. If not enabled, only dwo files will be generated')
 
+    def __add_unity_arguments(self, parser):
+        """Add unity build arguments."""
+        parser.add_argument(
+            '--unity', dest='unity',
+            action='store_true', default=None,
+            help='Compile the C/C++ sources of each target in batches (unity build), '
+                 'overriding cc_config.unity')
+        parser.add_argument(
+            '--no-unity', dest='unity',
+            action='store_false', default=None,
+            help='Compile each C/C++ source on its own, overriding cc_config.unity')
+
+    def _add_benchmark_arguments(self, parser):
+        """Add benchmark arguments for parser."""
+        parser.add_argument(
+            '--linkers', dest='linkers', type=str, default=None,
+            help='Comma separated linkers to compare with the default one, '
+                 'such as "mold,lld". Default to the usable fast linkers')
+        parser.add_argument(
+            '--runs', dest='runs', type=int, default=3,
+            help='Number of links of each binary with each linker, the best time is reported')
+
     def _add_query_arguments(self, parser):
         """Add query arguments for parser."""
         self.__add_plat_profile_arguments(parser)
@@ -443,10 +479,23 @@ class CommandLineParser:
             dest='no_build', default=False,
             help='Run tests directly without build')
 
+        parser.add_argument(
+            '--pipeline', action='store_true',
+            dest='pipeline', default=False,
+            help='Run each test as soon as it is built, while the build goes on')
+
         parser.add_argument(
             '--exclude-tests', dest='exclude_tests', default='', metavar='TARGET_LIST',
             help='Exclude tests which matches this comma-separated target pattern list')
 
+        parser.add_argument(
+            '--changed-since', dest='changed_since', default='', metavar='GIT_REVISION',
+            help='Only build and run the tests affected by the files changed since this git revision')
+
+        parser.add_argument(
+            '--changed-files', dest='changed_files', default='', metavar='FILE_LIST',
+            help='Only build and run the tests affected by this comma-separated file list')
+
         parser.add_argument(
             '--run-unrepaired-tests', dest='run_unrepaired_tests', action='store_true',
             help=constants.HELP.run_unrepaired_tests)
@@ -465,6 +514,7 @@ class CommandLineParser:
             self.__add_pgo_arguments(parser)
             self.__add_lto_arguments(parser)
             self.__add_fission_arguments(parser)
+            self.__add_unity_arguments(parser)
 
     def _add_common_arguments(self, *parsers):
         for parser in parsers:
@@ -498,7 +548,8 @@ class CommandLineParser:
                 '--exclude-targets', dest='exclude_targets', type=str, default='',
                 help='Comma separated target patterns to be excluded from loading')
             parser.add_argument(
-                '--jar-compression-level', dest='jar_compression_level', type=str, choices=['', '0'],
+                '--jar-compression-level', dest='jar_compression_level', type=str,
+                choices=([''] + [str(i) for i in range(10)]),
                 help=constants.HELP.jar_compression_level)
             parser.add_argument(
                 '--fat-jar-compression-level', dest='fat_jar_compression_level', type=str,
@@ -585,11 +636,18 @@ class CommandLineParser:
             'init',
             help='Create a BLADE_ROOT in the current directory')
 
+        benchmark_parser = sub_parser.add_parser(
+            'benchmark',
+            help='Build the specified targets and time linking their cc binaries '
+                 'and tests with each linker')
+
         self._add_common_arguments(build_parser, run_parser, test_parser,
                                    clean_parser, query_parser, dump_parser,
-                                   root_parser, init_parser)
+                                   root_parser, init_parser, benchmark_parser)
         self._add_init_arguments(init_parser)
-        self._add_build_arguments(build_parser, run_parser, test_parser, dump_parser)
+        self._add_build_arguments(build_parser, run_parser, test_parser, dump_parser,
+                                  benchmark_parser)
+        self._add_benchmark_arguments(benchmark_parser)
         self._add_run_arguments(run_parser)
         self._add_test_arguments(test_parser)
         self._add_clean_arguments(clean_parser)
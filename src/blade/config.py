@@ -56,8 +56,47 @@ _CONFIG_TEMPLATE = {
         'debug_info_level': 'mid',
         'build_jobs': 0,
         'build_jobs__help__': constants.HELP.build_jobs,
+        'build_memory_estimates': {},
+        'build_memory_estimates__help__': 'Estimated peak memory in MiB of the build commands of '
+            'each kind: "compile", "link", "lto_link" and "javac". The build jobs and the ninja '
+            'pools are sized by the available memory with them.',
+        'learn_build_memory': False,
+        'learn_build_memory__help__': 'Whether sample the peak memory of the build commands and '
+            'use it instead of the estimates in later builds',
         'test_jobs': 0,
         'test_jobs__help__': 'The number of test jobs to run simultaneously',
+        'test_shard_time': 0,
+        'test_shard_time__help__': 'Split a cc_test whose last run took longer than this many '
+            'seconds into shards of about this time. 0 (default) disables automatic sharding.',
+        'test_result_cache_dir': '',
+        'test_result_cache_dir__help__': 'Directory of the content addressed test result cache, '
+            'which can be shared by the workspaces of the host. Empty (default) disables it.',
+        'test_result_cache_max_size': 4096,
+        'test_result_cache_max_size__help__': 'Size limit of the test result cache in MiB, the '
+            'least recently used results are removed beyond it.',
+        'action_cache_dir': '',
+        'action_cache_dir__help__': 'Directory of the content addressed cache of build actions, '
+            'which can be shared by the users of the host. Empty (default) disables it.',
+        'action_cache_max_size': 10240,
+        'action_cache_max_size__help__': 'Size limit of the action cache in MiB, the least '
+            'recently used actions are removed beyond it.',
+        'action_cache_rules': ['ar', 'link', 'solink', 'proto', 'protojava', 'protopython',
+                               'protogo', 'protodescriptors', 'javac', 'javajar', 'javaabi',
+                               'fatjar', 'onejar', 'resource', 'resource_index', 'package'],
+        'action_cache_rules__help__': 'The ninja rules whose edges run through the action cache, '
+            '"gen_rule" (opt-in) stands for all gen_rule targets',
+        'remote_cache_url': '',
+        'remote_cache_url__help__': 'Url of the remote HTTP cache of build actions, with the '
+            '/ac/ and /cas/ paths of bazel-remote. Empty (default) disables it.',
+        'remote_cache_policy': 'readwrite',
+        'remote_cache_policy__help__': 'Whether the remote cache is read and written: '
+            '"readwrite" (default), "readonly" or "writeonly"',
+        'remote_cache_timeout': 10,
+        'remote_cache_timeout__help__': 'Timeout of the requests to the remote cache in seconds',
+        'testdata_staging': 'auto',
+        'testdata_staging__help__': 'How testdata files are staged into runfiles dirs: "auto" '
+            '(default) reflinks them, and hardlinks the read-only ones to read-only copies in the build dir, '
+            '"copy" always copies them.',
         'run_unrepaired_tests': False,
         'run_unrepaired_tests__help__': constants.HELP.run_unrepaired_tests,
         'glob_error_severity': 'error',
@@ -107,6 +146,12 @@ _CONFIG_TEMPLATE = {
         'benchmark_libs': [],
         'benchmark_main_libs': [],
         'secretcc': '',
+        'build_accelerator': 'auto',
+        'build_accelerator__help__': 'Accelerators of the C/C++ compilations: "auto" (what is '
+            'installed), "ccache", "sccache", "distcc", "ccache+distcc" or "none"',
+        'linker': 'default',
+        'linker__help__': 'The linker of the C/C++ links on Linux: "default" (of the compiler), '
+            '"auto" (the fastest usable one of mold and lld), "mold", "lld", "gold" or "bfd"',
         'debug_info_levels': {
             'no': ['-g0'],
             'low': ['-g1'],
@@ -116,6 +161,11 @@ _CONFIG_TEMPLATE = {
         'fission': False,
         'dwp': False,
         'fission__help__': 'Whether to generate split dwarf debug info',
+        'unity': False,
+        'unity__help__': 'Whether to compile the C/C++ sources of each target in batches '
+            '(unity build), see also the "unity" attribute of cc targets',
+        'unity_batch_size': 8,
+        'unity_batch_size__help__': 'The average number of sources in a unity batch',
         # PIE posture for executables. blade compiles every TU with -fPIC so a
         # single object set can serve .a / .so / exe (compile once, link many),
         # but never touches -pie / -no-pie -- the resulting binary's PIE-ness is
@@ -184,6 +234,11 @@ _CONFIG_TEMPLATE = {
         'thin': False,
         'hdrs_missing_severity': 'error',
         'hdrs_missing_suppress': set(),
+        'resource_embedding': 'auto',
+        'resource_embedding__help__': 'How resource_library embeds its files: "c" generates C '
+            'byte arrays, "incbin" generates assembler stubs using .incbin, which are much '
+            'faster to build for big files. "auto" (default) uses "incbin" except for MSVC '
+            'and Windows targets.',
         # Validate that a cc_library's declared deps cover every undefined
         # symbol it references, without requiring a shared-library link.
         # See issue #1225. EXPERIMENTAL -- the check ships on by default but at
@@ -276,6 +331,18 @@ _CONFIG_TEMPLATE = {
         'jar_compression_level__help__': constants.HELP.jar_compression_level,
         'fat_jar_compression_level': "6",
         'fat_jar_compression_level__help__': constants.HELP.fat_jar_compression_level,
+        'abi_jar': True,
+        'abi_jar__help__':
+            'Compile dependents against interface-only jars of java_library, '
+            'so that implementation-only changes do not recompile them',
+        'javac_server': False,
+        'javac_server__help__':
+            'Compile java sources in a persistent warm javac server (JDK 16+, not on Windows)',
+        'javac_server_max_concurrency': 0,
+        'javac_server_max_concurrency__help__':
+            'Max concurrent compilations in the javac server, 0 means the number of CPUs',
+        'javac_server_idle_timeout': 1800,
+        'javac_server_idle_timeout__help__': 'Seconds before an idle javac server exits',
         'debug_info_levels': {
             'no': ['-g:none'],
             'low': ['-g:source'],
@@ -323,6 +390,14 @@ _CONFIG_TEMPLATE = {
         'go_home': os.path.expandvars('$HOME/go'),
     },
 
+    'python_config': {
+        '__help__': 'Python Configuration',
+        'precompile': False,
+        'precompile__help__':
+            'Embed .pyc files compiled by the build interpreter into py_binary zips, '
+            'to save compiling the sources on each launch',
+    },
+
     'proto_library_config': {
         '__help__': 'Protobuf Configuration',
         'protoc': 'thirdparty/protobuf/bin/protoc',
@@ -960,6 +1035,20 @@ def _check_test_related_envs(kwargs):
                 f'"global_config.test_related_envs": Invalid env name or regex "{name}", {e}')
 
 
+def _check_build_memory_estimates(kwargs):
+    from blade import build_memory  # pylint: disable=import-outside-toplevel
+    estimates = kwargs.get('build_memory_estimates')
+    if not isinstance(estimates, dict):
+        return
+    for kind, value in estimates.items():
+        if kind not in build_memory.KINDS:
+            _blade_config.error(f'Invalid kind "{kind}" in "global_config.build_memory_estimates", '
+                                f'can only be in {build_memory.KINDS}')
+        elif not isinstance(value, int) or value <= 0:
+            _blade_config.error(f'"global_config.build_memory_estimates" of "{kind}" must be '
+                                f'a positive number of MiB')
+
+
 def _check_default_visibility(kwargs):
     if 'default_visibility' not in kwargs:
         return
@@ -975,6 +1064,8 @@ def _check_default_visibility(kwargs):
 
 
 _DUPLICATED_SOURCE_ACTION_VALUES = {'warning', 'error', 'none', None}
+_TESTDATA_STAGING_VALUES = {'auto', 'copy'}
+_REMOTE_CACHE_POLICY_VALUES = {'readwrite', 'readonly', 'writeonly'}
 
 
 @config_rule
@@ -995,10 +1086,13 @@ def config_items(**kwargs):
 def global_config(append=None, **kwargs):
     """global_config section."""
     _check_kwarg_enum_value(kwargs, 'duplicated_source_action', _DUPLICATED_SOURCE_ACTION_VALUES)
+    _check_kwarg_enum_value(kwargs, 'testdata_staging', _TESTDATA_STAGING_VALUES)
+    _check_kwarg_enum_value(kwargs, 'remote_cache_policy', _REMOTE_CACHE_POLICY_VALUES)
     debug_info_levels = _blade_config.get_section('cc_config')['debug_info_levels'].keys()
     _check_kwarg_enum_value(kwargs, 'debug_info_level', debug_info_levels)
     _check_test_related_envs(kwargs)
     _check_default_visibility(kwargs)
+    _check_build_memory_estimates(kwargs)
     _blade_config.update_config('global_config', append, kwargs)
 
 
@@ -1035,6 +1129,9 @@ def cc_library_config(append=None, **kwargs):
     if 'allow_undefined' in kwargs:
         _validate_allow_undefined(
             kwargs['allow_undefined'], 'cc_library_config.allow_undefined')
+    if kwargs.get('resource_embedding', 'auto') not in ('auto', 'c', 'incbin'):
+        _blade_config.error('cc_library_config: "resource_embedding" must be one of '
+                            '"auto", "c" or "incbin", got %r' % kwargs['resource_embedding'])
     _blade_config.update_config('cc_library_config', append, kwargs)
 
 
@@ -1061,6 +1158,8 @@ def _validate_allow_undefined(value, where):
 
 
 _PIE_VALUES = ('auto', 'yes', 'no')
+_BUILD_ACCELERATOR_VALUES = ('auto', 'ccache', 'sccache', 'distcc', 'ccache+distcc', 'none')
+_LINKER_VALUES = ('default', 'auto', 'mold', 'lld', 'gold', 'bfd')
 
 
 @config_rule
@@ -1068,6 +1167,8 @@ def cc_config(append=None, **kwargs):
     """extra cc config, like extra cpp include path splited by space."""
     _check_kwarg_enum_value(kwargs, 'hdr_dep_missing_severity', constants.SEVERITIES)
     _check_kwarg_enum_value(kwargs, 'pie', _PIE_VALUES)
+    _check_kwarg_enum_value(kwargs, 'build_accelerator', _BUILD_ACCELERATOR_VALUES)
+    _check_kwarg_enum_value(kwargs, 'linker', _LINKER_VALUES)
     if 'extra_incs' in kwargs:
         extra_incs = kwargs['extra_incs']
         if isinstance(extra_incs, str) and ' ' in extra_incs:
@@ -1170,6 +1271,12 @@ def go_config(append=None, **kwargs):
     _blade_config.update_config('go_config', append, kwargs)
 
 
+@config_rule
+def python_config(append=None, **kwargs):
+    """python_config."""
+    _blade_config.update_config('python_config', append, kwargs)
+
+
 @config_rule
 def proto_library_config(append=None, **kwargs):
     """protoc config."""
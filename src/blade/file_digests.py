@@ -0,0 +1,64 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Content digests of files, remembered by their path, size and mtime.
+
+Hashing big files on every run would cost about as much as running small
+tests, so the sha256 of each file is kept in a json file in the build dir
+and only computed again when the size or the mtime of the file changes.
+"""
+
+
+import hashlib
+import json
+import os
+import threading
+
+from blade import console
+
+
+class FileDigests:
+    """The remembered file digests of a build dir."""
+
+    def __init__(self, path):
+        self.path = path
+        self.digests = {}  # {path: [size, mtime_ns, digest]}
+        self.lock = threading.Lock()
+        try:
+            with open(self.path) as f:
+                self.digests = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def digest(self, path):
+        """Return the sha256 hex digest of the content of a file."""
+        st = os.stat(path)
+        known = self.digests.get(path)
+        if known and known[0] == st.st_size and known[1] == st.st_mtime_ns:
+            return known[2]
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                h.update(block)
+        digest = h.hexdigest()
+        self.remember(path, digest, st)
+        return digest
+
+    def remember(self, path, digest, st=None):
+        """Record the digest of a file just written with known content."""
+        if st is None:
+            st = os.stat(path)
+        with self.lock:
+            self.digests[path] = [st.st_size, st.st_mtime_ns, digest]
+
+    def save(self):
+        with self.lock:
+            # Forget the files which are gone
+            self.digests = {path: value for path, value in self.digests.items()
+                            if os.path.exists(path)}
+            try:
+                with open(self.path, 'w') as f:
+                    json.dump(self.digests, f)
+            except OSError as e:
+                console.debug('Failed to save file digests: %s' % e)
@@ -13,6 +13,7 @@ Allow users defining their custom build rules.
 import os
 import re
 
+from blade import action_cache
 from blade import build_manager
 from blade import build_rules
 from blade import cc_targets
@@ -41,6 +42,13 @@ rule %s
 '''
 
 
+# The rule template of a gen_rule run through the action cache, see `action_cache`.
+_CACHED_RULE_FORMAT = _RULE_FORMAT + '''\
+  rspfile = %s
+  rspfile_content = %s
+'''
+
+
 class GenRuleTarget(Target):
     """General Rule Target"""
 
@@ -238,7 +246,12 @@ class GenRuleTarget(Target):
         rule = '%s__rule__' % regular_variable_name(self._source_file_path(self.name))
         cmd = self._wrap_command(self._expand_command())
         description = f"{self.attr['cmd_name']} {self.fullname}"
-        self._write_rule(_RULE_FORMAT % (rule, cmd, description))
+        if action_cache.cached_rule(rule):
+            action_cmd, rspfile, rspfile_content = action_cache.wrap_command(cmd)
+            self._write_rule(_CACHED_RULE_FORMAT % (rule, action_cmd, description,
+                                                    rspfile, rspfile_content))
+        else:
+            self._write_rule(_RULE_FORMAT % (rule, cmd, description))
 
         outputs = self.attr['outputs']
         inputs = self._expand_srcs()
@@ -204,7 +204,7 @@ def _is_inclusion_line(line):
     return line.startswith('.')
 
 
-def _parse_inclusion_stacks(path, build_dir, system_incs=()):
+def _parse_inclusion_stacks(path, build_dir, system_incs=(), transparent_hdr=None):
     """Parae headers inclusion stacks from file.
 
     Given the following inclusions found in the app/example/foo.cc.incstk:
@@ -239,6 +239,10 @@ def _parse_inclusion_stacks(path, build_dir, system_incs=()):
             ['build_release/app/example/proto/bar.pb.h'],
             ['common/rpc/rpc_client.h', 'build_release/common/rpc/rpc_options.pb.h'],
         ]
+
+    The `transparent_hdr`, the wrapper of a precompiled header which gcc
+    fell back to, is not reported, the headers it includes are reported as
+    included by its includer.
     """
     direct_hdrs = []  # The directly included header files
     stacks, hdrs_stack = [], []
@@ -257,6 +261,7 @@ def _parse_inclusion_stacks(path, build_dir, system_incs=()):
 
     current_level = 0
     skip_level = -1
+    transparent_level = -1
     with open(path) as f:
         for line in f:
             line = line.rstrip()  # Strip `\n`
@@ -267,6 +272,14 @@ def _parse_inclusion_stacks(path, build_dir, system_incs=()):
             if level == -1:
                 console.log(f'{path}: Unrecognized line {line}')
                 break
+            if transparent_level != -1:
+                if level > transparent_level:
+                    level -= 1
+                else:
+                    transparent_level = -1
+            if transparent_hdr and posixpath.normpath(hdr) == transparent_hdr:
+                transparent_level = level
+                continue
             if level == 1 and not os.path.isabs(hdr):
                 direct_hdrs.append(_remove_build_dir_prefix(posixpath.normpath(hdr), build_dir))
             if level > current_level:
@@ -293,6 +306,42 @@ def _parse_inclusion_stacks(path, build_dir, system_incs=()):
     return direct_hdrs, stacks
 
 
+def _split_unity_inclusion_stack(path, build_dir, system_incs=()):
+    """Split the inclusion stack of a unity source into those of the sources it includes.
+
+    Given the following inclusions found in the app/example/foo.objs/foo.unity.cc.incstk:
+
+        . ./app/example/foo.cc
+        .. ./app/example/foo.h
+        . ./app/example/bar.cc
+        .. ./common/rpc/rpc_client.h
+
+    Return the lines of the inclusion stack of each source, one level up:
+
+        {
+            'app/example/foo.cc': ['. ./app/example/foo.h'],
+            'app/example/bar.cc': ['. ./common/rpc/rpc_client.h'],
+        }
+    """
+    sections = {}
+    lines = None
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip()
+            if not _is_inclusion_line(line):
+                break
+            level, hdr = _parse_hdr_level_line(line, system_incs)
+            if level == 1:
+                src = _remove_build_dir_prefix(posixpath.normpath(hdr), build_dir)
+                lines = sections.setdefault(src, [])
+            elif level > 1 and lines is not None:
+                if line.startswith(_MSVC_INCUSION_PREFIX):
+                    lines.append(_MSVC_INCUSION_PREFIX + line[len(_MSVC_INCUSION_PREFIX) + 1:])
+                else:
+                    lines.append(line[1:])
+    return sections
+
+
 def _parse_hdr_level_line(line, system_incs=()):
     """Parse a normal line of a header stack file (GCC or MSVC format).
 
@@ -395,6 +444,11 @@ class Checker:
         self.unused_deps_severity = target.get('unused_deps_severity', 'debug')
         self.unused_deps_suppress = set(target.get('unused_deps_suppress', []))
         self.keep_deps = set(target.get('keep_deps', []))
+        # [header, its inclusion stack file, its wrapper] of the precompiled header.
+        pch = target.get('pch')
+        self.pch = [to_unix_path(p) for p in pch] if pch else None
+        # {source: inclusion stack file of the unity source it is compiled in}
+        self.unity = {to_unix_path(k): to_unix_path(v) for k, v in target.get('unity', {}).items()}
 
         inclusion_declaration_file = os.path.join(self.build_dir, 'inclusion_declaration.data')
         self.global_declaration = GlobalDeclaration(inclusion_declaration_file)
@@ -414,6 +468,25 @@ class Checker:
             return ''
         return path
 
+    def _write_unity_inclusion_stacks(self):
+        """Write the `<src>.incstk` of the sources compiled in unity sources.
+
+        They are split from the inclusion stacks of the unity sources, so the
+        sources are checked on their own as usual.
+        """
+        full_srcs = dict(self.expanded_srcs)
+        objs_dir = '/'.join([self.build_dir, self.path, self.name + '.objs'])
+        for stack_file in sorted(set(self.unity.values())):
+            if not os.path.exists(stack_file):
+                continue
+            sections = _split_unity_inclusion_stack(stack_file, self.build_dir, self.system_incs)
+            for src, stack_file_of_src in self.unity.items():
+                if stack_file_of_src != stack_file:
+                    continue
+                lines = sections.get(full_srcs.get(src), [])
+                with open(objs_dir + '/' + src + '.incstk', 'w') as f:
+                    f.writelines(line + '\n' for line in lines)
+
     def _hdr_is_declared(self, hdr):
         return self._hdr_is_declared_in(hdr, self.declared_hdrs, self.declared_incs)
 
@@ -606,16 +679,16 @@ class Checker:
         # See blade-build#1226.
         scanned_count = [0]  # list to mutate from the closure below
 
-        def check_file(src, full_src):
+        def check_file(src, full_src, path=None, included=(), compiled_path=None):
             if path_under_dir(full_src, self.build_dir):  # Don't check generated files.
                 return
-            path = self._find_inclusion_file(src)
-            if not path:
+            path = path or self._find_inclusion_file(src)
+            if not path or not os.path.exists(path):
                 console.warning('No inclusion file found for %s' % full_src)
                 return
             scanned_count[0] += 1
             direct_hdrs, stacks = _parse_inclusion_stacks(
-                path, self.build_dir, self.system_incs)
+                path, self.build_dir, self.system_incs, self.pch and self.pch[2])
             # `-H` silently elides direct `#include`s already pulled in by an
             # earlier transitive chain (multiple-include-guard optimization),
             # so supplement the depth-1 set with the source's literal
@@ -626,8 +699,8 @@ class Checker:
             # and the design note in `doc/*/develop/hdrs_check.md`.
             scanned = _scan_source_includes(full_src)
             compiled_paths = _read_all_incstk_paths(
-                path, self.build_dir, self.system_incs)
-            direct_hdrs = list(set(direct_hdrs) | (scanned & compiled_paths))
+                compiled_path or path, self.build_dir, self.system_incs)
+            direct_hdrs = list(set(direct_hdrs) | (scanned & compiled_paths) | set(included))
             all_direct_hdrs.update(direct_hdrs)
             missing_dep_hdrs = set()
             self._check_direct_headers(
@@ -645,12 +718,23 @@ class Checker:
             if missing_dep_hdrs:
                 missing_details[src] = list(missing_dep_hdrs)
 
+        # A header included by an earlier source of a unity source is not in the
+        # inclusion stack of a later one, but in the compiled paths of the unity
+        # source, so it is found by scanning the later source.
+        self._write_unity_inclusion_stacks()
         for src, full_src in self.expanded_srcs:
-            check_file(src, full_src)
+            check_file(src, full_src, compiled_path=self.unity.get(src))
 
         for hdr, full_hdr in self.expanded_hdrs:
             check_file(hdr, full_hdr)
 
+        if self.pch:
+            # The headers in the precompiled header are not in the inclusion
+            # stacks of the sources which use it, but in its own one. The
+            # precompiled header is included by the target itself.
+            pch, stack_file, _ = self.pch
+            check_file(pch, pch, stack_file, included=[pch])
+
         severity = self.severity
         if direct_check_msg:
             console.diagnose(self.source_location, severity,
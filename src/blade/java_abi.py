@@ -0,0 +1,363 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Derive interface-only ("ABI") class files for compiling dependents against.
+
+A java_library's jar changes on every edit, but most edits only touch method
+bodies or private members, which can't affect how dependents compile. The
+`java_abi` builtin tool rewrites every class of a library jar keeping only
+what javac needs to compile against it:
+
+* private fields and methods, static initializers and all `Code` attributes
+  are dropped;
+* debug and runtime-only attributes (`SourceFile`, `NestHost`,
+  `NestMembers`, `BootstrapMethods`, type annotations, ...) are dropped;
+* local and anonymous classes are dropped, along with their `InnerClasses`
+  entries;
+* the constant pool is rebuilt from what the remaining structures reference,
+  in traversal order, so it no longer records constants used only by code.
+
+`ConstantValue` is kept, since javac inlines compile-time constants into
+dependents. A class this module can't parse is passed through unchanged.
+"""
+
+
+import struct
+
+
+class ClassFormatError(Exception):
+    """The input is not a class file this module understands."""
+
+
+_ACC_PRIVATE = 0x0002
+
+# Constant pool tags.
+_UTF8 = 1
+_INTEGER = 3
+_FLOAT = 4
+_LONG = 5
+_DOUBLE = 6
+_CLASS = 7
+_STRING = 8
+_FIELDREF = 9
+_METHODREF = 10
+_INTERFACE_METHODREF = 11
+_NAME_AND_TYPE = 12
+_METHOD_HANDLE = 15
+_METHOD_TYPE = 16
+_DYNAMIC = 17
+_INVOKE_DYNAMIC = 18
+_MODULE = 19
+_PACKAGE = 20
+
+# Number of u2 constant pool references following the tag, for tags whose
+# payload is nothing but references.
+_REF_COUNTS = {
+    _CLASS: 1, _STRING: 1, _METHOD_TYPE: 1, _MODULE: 1, _PACKAGE: 1,
+    _FIELDREF: 2, _METHODREF: 2, _INTERFACE_METHODREF: 2, _NAME_AND_TYPE: 2,
+}
+_RAW_SIZES = {_INTEGER: 4, _FLOAT: 4, _LONG: 8, _DOUBLE: 8}
+
+_CLASS_ATTRIBUTES = frozenset([
+    'Signature', 'Deprecated', 'Synthetic', 'InnerClasses', 'EnclosingMethod',
+    'PermittedSubclasses', 'Record',
+    'RuntimeVisibleAnnotations', 'RuntimeInvisibleAnnotations',
+])
+_FIELD_ATTRIBUTES = frozenset([
+    'ConstantValue', 'Signature', 'Deprecated', 'Synthetic',
+    'RuntimeVisibleAnnotations', 'RuntimeInvisibleAnnotations',
+])
+_METHOD_ATTRIBUTES = frozenset([
+    'Exceptions', 'Signature', 'Deprecated', 'Synthetic', 'AnnotationDefault',
+    'MethodParameters',
+    'RuntimeVisibleAnnotations', 'RuntimeInvisibleAnnotations',
+    'RuntimeVisibleParameterAnnotations', 'RuntimeInvisibleParameterAnnotations',
+])
+_RECORD_COMPONENT_ATTRIBUTES = frozenset([
+    'Signature', 'RuntimeVisibleAnnotations', 'RuntimeInvisibleAnnotations',
+])
+
+
+class _Reader:
+    """Big-endian cursor over a bytes object."""
+
+    def __init__(self, data, pos=0):
+        self.data = data
+        self.pos = pos
+
+    def u1(self):
+        self.pos += 1
+        return self.data[self.pos - 1]
+
+    def u2(self):
+        self.pos += 2
+        return struct.unpack_from('>H', self.data, self.pos - 2)[0]
+
+    def u4(self):
+        self.pos += 4
+        return struct.unpack_from('>I', self.data, self.pos - 4)[0]
+
+    def bytes(self, n):
+        self.pos += n
+        if self.pos > len(self.data):
+            raise ClassFormatError('truncated class file')
+        return self.data[self.pos - n:self.pos]
+
+
+class _ConstantPool:
+    """Rebuilds a constant pool holding only the entries that get referenced."""
+
+    def __init__(self, old_entries):
+        self.old = old_entries  # index -> (tag, payload), payload per tag
+        # Attribute names are looked up by value when writing them back.
+        self.utf8_indexes = {}
+        for index, (tag, payload) in old_entries.items():
+            if tag == _UTF8:
+                self.utf8_indexes.setdefault(payload.decode('utf-8', errors='replace'), index)
+        self.mapping = {}
+        self.entries = []  # encoded entries in new index order
+        self.count = 1
+
+    def ref(self, old_index):
+        """Intern the old entry (and its dependencies), return its new index."""
+        if old_index == 0:
+            return 0
+        if old_index in self.mapping:
+            return self.mapping[old_index]
+        try:
+            tag, payload = self.old[old_index]
+        except KeyError:
+            raise ClassFormatError('bad constant pool index %d' % old_index) from None
+        if tag in _REF_COUNTS:
+            encoded = struct.pack('>B', tag) + b''.join(
+                struct.pack('>H', self.ref(i)) for i in payload)
+        elif tag == _METHOD_HANDLE:
+            kind, index = payload
+            encoded = struct.pack('>BBH', tag, kind, self.ref(index))
+        elif tag in (_DYNAMIC, _INVOKE_DYNAMIC):
+            bootstrap, name_and_type = payload
+            # The bootstrap method table is gone along with the code using it.
+            encoded = struct.pack('>BHH', tag, bootstrap, self.ref(name_and_type))
+        elif tag == _UTF8:
+            encoded = struct.pack('>BH', tag, len(payload)) + payload
+        else:
+            encoded = struct.pack('>B', tag) + payload
+        new_index = self.count
+        self.mapping[old_index] = new_index
+        self.entries.append(encoded)
+        self.count += 2 if tag in (_LONG, _DOUBLE) else 1
+        return new_index
+
+    def utf8(self, old_index):
+        tag, payload = self.old[old_index]
+        if tag != _UTF8:
+            raise ClassFormatError('expect utf8 at constant pool index %d' % old_index)
+        return payload.decode('utf-8', errors='replace')
+
+    def encode(self):
+        return struct.pack('>H', self.count) + b''.join(self.entries)
+
+
+def _read_constant_pool(reader):
+    entries = {}
+    count = reader.u2()
+    index = 1
+    while index < count:
+        tag = reader.u1()
+        if tag == _UTF8:
+            entries[index] = (tag, reader.bytes(reader.u2()))
+        elif tag in _RAW_SIZES:
+            entries[index] = (tag, reader.bytes(_RAW_SIZES[tag]))
+        elif tag in _REF_COUNTS:
+            entries[index] = (tag, tuple(reader.u2() for _ in range(_REF_COUNTS[tag])))
+        elif tag == _METHOD_HANDLE:
+            entries[index] = (tag, (reader.u1(), reader.u2()))
+        elif tag in (_DYNAMIC, _INVOKE_DYNAMIC):
+            entries[index] = (tag, (reader.u2(), reader.u2()))
+        else:
+            raise ClassFormatError('unknown constant pool tag %d' % tag)
+        index += 2 if tag in (_LONG, _DOUBLE) else 1
+    return entries
+
+
+def _read_attributes(reader, pool):
+    """Return a list of (name, info bytes)."""
+    attributes = []
+    for _ in range(reader.u2()):
+        name = pool.utf8(reader.u2())
+        attributes.append((name, reader.bytes(reader.u4())))
+    return attributes
+
+
+def _read_members(reader, pool):
+    """Return a list of (access, name index, descriptor index, attributes)."""
+    members = []
+    for _ in range(reader.u2()):
+        access, name, descriptor = reader.u2(), reader.u2(), reader.u2()
+        members.append((access, name, descriptor, _read_attributes(reader, pool)))
+    return members
+
+
+def _rewrite_element_value(reader, pool, out):
+    tag = reader.u1()
+    out.append(struct.pack('>B', tag))
+    if tag in b'BCDFIJSZsc':
+        out.append(struct.pack('>H', pool.ref(reader.u2())))
+    elif tag == ord('e'):
+        out.append(struct.pack('>HH', pool.ref(reader.u2()), pool.ref(reader.u2())))
+    elif tag == ord('@'):
+        _rewrite_annotation(reader, pool, out)
+    elif tag == ord('['):
+        count = reader.u2()
+        out.append(struct.pack('>H', count))
+        for _ in range(count):
+            _rewrite_element_value(reader, pool, out)
+    else:
+        raise ClassFormatError('unknown annotation element tag %d' % tag)
+
+
+def _rewrite_annotation(reader, pool, out):
+    type_index, count = reader.u2(), reader.u2()
+    out.append(struct.pack('>HH', pool.ref(type_index), count))
+    for _ in range(count):
+        out.append(struct.pack('>H', pool.ref(reader.u2())))
+        _rewrite_element_value(reader, pool, out)
+
+
+def _rewrite_annotations(reader, pool, out):
+    count = reader.u2()
+    out.append(struct.pack('>H', count))
+    for _ in range(count):
+        _rewrite_annotation(reader, pool, out)
+
+
+def _rewrite_u2_list(reader, pool, out):
+    count = reader.u2()
+    out.append(struct.pack('>H', count))
+    for _ in range(count):
+        out.append(struct.pack('>H', pool.ref(reader.u2())))
+
+
+def _rewrite_attribute_info(name, info, pool):
+    """Return the rewritten attribute body, or None to drop it."""
+    reader = _Reader(info)
+    out = []
+    if name in ('ConstantValue', 'Signature', 'EnclosingMethod'):
+        for _ in range(len(info) // 2):
+            out.append(struct.pack('>H', pool.ref(reader.u2())))
+    elif name in ('Deprecated', 'Synthetic'):
+        pass
+    elif name in ('Exceptions', 'PermittedSubclasses'):
+        _rewrite_u2_list(reader, pool, out)
+    elif name == 'InnerClasses':
+        entries = []
+        for _ in range(reader.u2()):
+            entries.append((reader.u2(), reader.u2(), reader.u2(), reader.u2()))
+        # Local and anonymous classes (no outer class) are invisible to
+        # dependents, and get renumbered by unrelated edits.
+        entries = [e for e in entries if e[1] != 0]
+        if not entries:
+            return None
+        out.append(struct.pack('>H', len(entries)))
+        for inner, outer, inner_name, flags in entries:
+            out.append(struct.pack('>HHHH', pool.ref(inner), pool.ref(outer),
+                                   pool.ref(inner_name), flags))
+    elif name in ('RuntimeVisibleAnnotations', 'RuntimeInvisibleAnnotations'):
+        _rewrite_annotations(reader, pool, out)
+    elif name in ('RuntimeVisibleParameterAnnotations', 'RuntimeInvisibleParameterAnnotations'):
+        count = reader.u1()
+        out.append(struct.pack('>B', count))
+        for _ in range(count):
+            _rewrite_annotations(reader, pool, out)
+    elif name == 'AnnotationDefault':
+        _rewrite_element_value(reader, pool, out)
+    elif name == 'MethodParameters':
+        count = reader.u1()
+        out.append(struct.pack('>B', count))
+        for _ in range(count):
+            out.append(struct.pack('>HH', pool.ref(reader.u2()), reader.u2()))
+    elif name == 'Record':
+        count = reader.u2()
+        out.append(struct.pack('>H', count))
+        for _ in range(count):
+            out.append(struct.pack('>HH', pool.ref(reader.u2()), pool.ref(reader.u2())))
+            attributes = _read_attributes(reader, pool)
+            out.append(_rewrite_attributes(attributes, _RECORD_COMPONENT_ATTRIBUTES,
+                                           pool))
+    else:
+        return None
+    return b''.join(out)
+
+
+def _rewrite_attributes(attributes, kept, pool):
+    out = []
+    for name, info in attributes:
+        if name not in kept:
+            continue
+        body = _rewrite_attribute_info(name, info, pool)
+        if body is None:
+            continue
+        out.append(struct.pack('>HI', pool.ref(pool.utf8_indexes[name]), len(body)) + body)
+    return struct.pack('>H', len(out)) + b''.join(out)
+
+
+def _is_local_or_anonymous(this_class, attributes):
+    for name, info in attributes:
+        if name != 'InnerClasses':
+            continue
+        reader = _Reader(info)
+        for _ in range(reader.u2()):
+            inner, outer, _, _ = reader.u2(), reader.u2(), reader.u2(), reader.u2()
+            if inner == this_class:
+                return outer == 0
+    return False
+
+
+def _rewrite_members(members, kept, pool, keep):
+    out = []
+    for access, name, descriptor, attributes in members:
+        if not keep(access, pool.utf8(name)):
+            continue
+        out.append(struct.pack('>HHH', access, pool.ref(name), pool.ref(descriptor)) +
+                   _rewrite_attributes(attributes, kept, pool))
+    return struct.pack('>H', len(out)) + b''.join(out)
+
+
+def _keep_field(access, name):
+    return not access & _ACC_PRIVATE
+
+
+def _keep_method(access, name):
+    return not access & _ACC_PRIVATE and name != '<clinit>'
+
+
+def class_abi(data):
+    """Return the interface-only form of a class file.
+
+    Returns None for a local or anonymous class, which dependents can never
+    reference. Raises ClassFormatError if `data` can't be parsed.
+    """
+    reader = _Reader(data)
+    try:
+        if reader.u4() != 0xCAFEBABE:
+            raise ClassFormatError('bad magic')
+        minor, major = reader.u2(), reader.u2()
+        pool = _ConstantPool(_read_constant_pool(reader))
+        access, this_class, super_class = reader.u2(), reader.u2(), reader.u2()
+        interfaces = [reader.u2() for _ in range(reader.u2())]
+        fields = _read_members(reader, pool)
+        methods = _read_members(reader, pool)
+        attributes = _read_attributes(reader, pool)
+        if _is_local_or_anonymous(this_class, attributes):
+            return None
+
+        body = [struct.pack('>HHH', access, pool.ref(this_class), pool.ref(super_class)),
+                struct.pack('>H', len(interfaces))]
+        body += [struct.pack('>H', pool.ref(i)) for i in interfaces]
+        body.append(_rewrite_members(fields, _FIELD_ATTRIBUTES, pool, _keep_field))
+        body.append(_rewrite_members(methods, _METHOD_ATTRIBUTES, pool, _keep_method))
+        body.append(_rewrite_attributes(attributes, _CLASS_ATTRIBUTES, pool))
+    except (struct.error, IndexError) as e:
+        raise ClassFormatError(str(e)) from e
+    return struct.pack('>IHH', 0xCAFEBABE, minor, major) + pool.encode() + b''.join(body)
@@ -29,7 +29,7 @@ from blade import rule_registry
 from blade.blade_types import StrOrListOpt
 from blade.ninja_rule import NinjaRule
 from blade.target import Target, LOCATION_RE  # lgtm[py/cyclic-import]
-from blade.util import var_to_list, var_to_list_or_none
+from blade.util import cpu_count, var_to_list, var_to_list_or_none
 from blade.version import LooseVersion
 
 
@@ -239,14 +239,15 @@ class JavaTargetMixIn:
         """Return path of sources dir."""
         return self._target_file_path(self.name + '.sources')
 
-    def __collect_dep_jars(self, dkey, dep_jars, maven_jars):
+    def __collect_dep_jars(self, dkey, dep_jars, maven_jars, abi=False):
         """Extract jar file built by the target with the specified dkey.
 
         dep_jars: a list of jars built by blade targets. Each item is a file path.
         maven_jars: a list of jars managed by maven repository.
+        abi: prefer the interface-only jar of the dep, which is enough to compile against.
         """
         dep = self.target_database[dkey]
-        jar = dep._get_target_file('jar')
+        jar = (abi and dep._get_target_file('abi_jar')) or dep._get_target_file('jar')
         if jar:
             dep_jars.append(jar)
         else:
@@ -255,16 +256,18 @@ class JavaTargetMixIn:
                 assert dep.type == 'maven_jar'
                 maven_jars.append(jar)
 
-    def __get_dep_jars(self, deps):
+    def __get_dep_jars(self, deps, abi=False):
         """Return a tuple of (target jars, maven jars)."""
         dep_jars, maven_jars = [], []
         for d in deps:
-            self.__collect_dep_jars(d, dep_jars, maven_jars)
+            self.__collect_dep_jars(d, dep_jars, maven_jars, abi)
         return dep_jars, maven_jars
 
     def __get_exported_deps(self):
         """
         Recursively get exported dependencies and return a tuple of (target jars, maven jars)
+
+        Only used for compiling, so the interface-only jars are returned.
         """
         dep_jars, maven_jars = [], []
         queue = collections.deque(self.deps)
@@ -276,7 +279,7 @@ class JavaTargetMixIn:
                 dep = self.target_database[key]
                 exported_deps = dep.attr.get('exported_deps', [])
                 for edkey in exported_deps:
-                    self.__collect_dep_jars(edkey, dep_jars, maven_jars)
+                    self.__collect_dep_jars(edkey, dep_jars, maven_jars, abi=True)
                 queue.extend(exported_deps)
 
         return list(set(dep_jars)), list(set(maven_jars))
@@ -344,7 +347,7 @@ class JavaTargetMixIn:
         return sorted(jars)
 
     def _get_compile_deps(self):
-        dep_jars, maven_jars = self.__get_dep_jars(self.deps)
+        dep_jars, maven_jars = self.__get_dep_jars(self.deps, abi=True)
         exported_dep_jars, exported_maven_jars = self.__get_exported_deps()
         maven_jars += self.__get_maven_transitive_deps(self.deps)
         dep_jars = sorted(set(dep_jars + exported_dep_jars))
@@ -759,6 +762,16 @@ class JavaLibrary(JavaTarget):
             self._add_tags('type:prebuilt')
         self.attr['jacoco_coverage'] = coverage and bool(srcs)
 
+    def _generate_abi_jar(self, jar):
+        """Derive the interface-only jar that dependents compile against.
+
+        Its edge is restat, so edits that leave the interface unchanged don't
+        recompile the dependents.
+        """
+        abi_jar = self._target_file_path(self.name + '.abi.jar')
+        self.generate_build('javaabi', abi_jar, inputs=jar)
+        self._add_target_file('abi_jar', abi_jar)
+
     def generate(self):
         if self.type == 'prebuilt_java_library':
             jar = self.attr['binary_jar']
@@ -766,6 +779,9 @@ class JavaLibrary(JavaTarget):
             jar = self._generate_jar()
         if jar:
             self._add_default_target_file('jar', jar)
+            if (self.type == 'java_library' and self.srcs and
+                    config.get_item('java_config', 'abi_jar')):
+                self._generate_abi_jar(jar)
 
 
 class JavaBinary(JavaTarget):
@@ -880,6 +896,9 @@ class JavaTest(JavaBinary):
             exclusions: StrOrListOpt,
             testdata: StrOrListOpt,
             target_under_test: str | None,
+            test_cpu: int,
+            test_memory: int | str,
+            test_lock: str,
             kwargs: dict[str, object]):
         super().__init__(
                 name=name,
@@ -897,6 +916,7 @@ class JavaTest(JavaBinary):
             self.warning('"target_under_test" is deprecated, you can remove it safely')
         self.type = 'java_test'  # lgtm[py/overwritten-inherited-attribute]
         self.attr['testdata'] = var_to_list(testdata)
+        self._set_test_resources(test_cpu, test_memory, test_lock)
         self._add_tags('type:test')
         self._apply_junit_libs_from_config()
 
@@ -1040,6 +1060,9 @@ def java_test(name: str,
               exclusions: StrOrListOpt = None,
               testdata: StrOrListOpt = None,
               target_under_test: str | None = None,
+              test_cpu: int = 1,
+              test_memory: int | str = 0,
+              test_lock: str = '',
               **kwargs: object):
     """Build a java test target"""
     target = JavaTest(
@@ -1055,6 +1078,9 @@ def java_test(name: str,
             exclusions=exclusions,
             testdata=testdata,
             target_under_test=target_under_test,
+            test_cpu=test_cpu,
+            test_memory=test_memory,
+            test_lock=test_lock,
             kwargs=kwargs)
     build_manager.instance.register_target(target)
 
@@ -1113,44 +1139,35 @@ def _get_jacocoagent():
 
 def _generate_javac_rules(ctx, java_config):
     javac = _get_java_command(java_config, 'javac')
-    jar = _get_java_command(java_config, 'jar')
-    cmd = [javac]
+    level = config.get_item('java_config', 'jar_compression_level')
     version = java_config['version']
     source_version = java_config.get('source_version', version)
     target_version = java_config.get('target_version', version)
+    javac_opts = ''
     if source_version:
-        cmd.append('-source %s' % source_version)
+        javac_opts += f'-source {source_version} '
     if target_version:
-        cmd.append('-target %s' % target_version)
-    cmd += [
-        '-encoding ${source_encoding}',
-        '-d ${classes_dir}',
-        '-classpath ${classpath}',
-        '${javacflags}',
-        '${in}',
-    ]
+        javac_opts += f'-target {target_version} '
     ctx.add_line(textwrap.dedent('''\
             source_encoding = UTF-8
             classpath = .
             javacflags =
             '''))
-    jarflags = 'cf' + config.get_item('java_config', 'jar_compression_level')
-    if os.name == 'nt':
-        javac_opts = ''
-        if source_version:
-            javac_opts += f'-source {source_version} '
-        if target_version:
-            javac_opts += f'-target {target_version} '
-        command = ctx.builtin_command('javac_compile',
-                                      f'${{classes_dir}} ${{out}} ${{source_encoding}} '
-                                      f'${{classpath}} {javac_opts}${{javacflags}} -- ${{in}}')
-    else:
-        command = ('rm -fr ${classes_dir} && mkdir -p ${classes_dir} && '
-                   '%s && sleep 0.01 && '
-                   '%s %s ${out} -C ${classes_dir} .' % (
-                       ' '.join(cmd), jar, jarflags))
+    server_opts = ''
+    if java_config['javac_server'] and os.name != 'nt':
+        max_concurrency = java_config['javac_server_max_concurrency'] or cpu_count()
+        server_opts = (f'--javac_server={ctx.build_dir} '
+                       f'--javac_server_max_concurrency={max_concurrency} '
+                       f'--javac_server_idle_timeout={java_config["javac_server_idle_timeout"]} ')
+    # The builtin tool runs javac and then packs the classes in-process,
+    # instead of paying a second JVM startup for `jar cf`.
+    command = ctx.builtin_command('javac_compile',
+                                  f'--javac={javac} --compression_level={level} {server_opts}'
+                                  f'${{classes_dir}} ${{out}} ${{source_encoding}} '
+                                  f'${{classpath}} -- {javac_opts}${{javacflags}} -- ${{in}}')
     ctx.emit_rule(NinjaRule(name='javac', command=command,
-                            description='JAVAC ${out}', restat=True))
+                            description='JAVAC ${out}',
+                            pool=ctx.memory_pool('javac_pool', 'javac'), restat=True))
 
 
 def _generate_java_resource_rules(ctx):
@@ -1160,16 +1177,22 @@ def _generate_java_resource_rules(ctx):
         description='JAVA RESOURCE ${resources_dir}'))
 
 
-def _generate_java_jar_rules(ctx, java_config):
-    jar = _get_java_command(java_config, 'jar')
+def _generate_java_jar_rules(ctx):
     level = config.get_item('java_config', 'jar_compression_level')
-    args = f'{jar} --compression_level={level} ${{out}} ${{in}}'
+    args = f'--compression_level={level} ${{out}} ${{in}}'
     ctx.emit_rule(NinjaRule(
         name='javajar',
         command=ctx.builtin_command('java_jar', args),
         description='JAVA JAR ${out}', restat=True))
 
 
+def _generate_java_abi_rules(ctx):
+    ctx.emit_rule(NinjaRule(
+        name='javaabi',
+        command=ctx.builtin_command('java_abi'),
+        description='JAVA ABI ${out}', restat=True))
+
+
 def _generate_java_test_rules(ctx):
     jacocoagent = _get_jacocoagent()
     args = ('--script=${out} --main_class=${mainclass} --jacocoagent=%s '
@@ -1246,7 +1269,8 @@ def _generate_java_scala_rules(ctx):
     java_config = ctx.config_section('java_config')
     _generate_javac_rules(ctx, java_config)
     _generate_java_resource_rules(ctx)
-    _generate_java_jar_rules(ctx, java_config)
+    _generate_java_jar_rules(ctx)
+    _generate_java_abi_rules(ctx)
     _generate_java_test_rules(ctx)
     _generate_fatjar_rules(ctx, java_config)
     _generate_java_binary_rules(ctx)
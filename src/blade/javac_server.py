@@ -0,0 +1,264 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Persistent javac compile server.
+
+Starting a fresh `javac` JVM for every `java_library` edge costs far more
+than the compilation itself on small libraries: JVM startup plus JIT
+warm-up of the compiler. When `java_config.javac_server` is enabled, the
+`javac_compile` builtin tool becomes a thin client of a long-lived server
+instead:
+
+* The server is a small Java program (`_SERVER_SOURCE`) that compiles each
+  request through `javax.tools.JavaCompiler.run` in a warm JVM. Every
+  request is an independent compiler invocation with its own arguments, so
+  classpaths never leak between requests. A fixed thread pool bounds the
+  number of concurrent compiles.
+* It listens on a Unix domain socket under `<build_dir>/.javac_server/`, is
+  started on demand by the first client that can't connect (serialized by a
+  lock file), and exits by itself after being idle for a while.
+* Each JDK gets its own server: the directory of the socket is keyed by the
+  resolved path of `javac`, so after switching `java_config.java_home` the
+  new JDK compiles and the old server just idles out.
+* The server is started in the workspace root and rejects requests from any
+  other working directory, so relative paths in the arguments resolve the
+  same way they do for a local `javac`.
+
+Any failure to reach or start the server (no JDK 16+ for Unix domain socket
+channels, a platform without `AF_UNIX`, ...) makes `run` return None and the
+caller falls back to a local `javac` process. So do `-J<flag>` options, which
+are passed to the JVM by the `javac` launcher and can't be applied to a
+running compiler.
+
+Protocol, all text in UTF-8:
+
+    request:  'blade-javac 1\\n' <cwd> '\\n' <argc> '\\n' (<arg> '\\n') * argc
+    response: <exit code> '\\n' <javac diagnostics>
+
+An exit code of `_REJECTED` means the server refused the request.
+"""
+
+
+import os
+import shutil
+import socket
+import subprocess
+import time
+
+from blade import util
+
+
+_SERVER_CLASS = 'BladeJavacServer'
+_PROTOCOL = 'blade-javac 1'
+_REJECTED = -1
+
+# Seconds to wait for a freshly started server to accept connections.
+_START_TIMEOUT = 20
+
+_SERVER_SOURCE = '''\
+// This file was automatically generated by blade
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.net.StandardProtocolFamily;
+import java.net.UnixDomainSocketAddress;
+import java.nio.channels.Channels;
+import java.nio.channels.ServerSocketChannel;
+import java.nio.channels.SocketChannel;
+import java.nio.charset.StandardCharsets;
+import java.nio.file.Files;
+import java.nio.file.Path;
+import java.nio.file.Paths;
+import java.util.concurrent.ExecutorService;
+import java.util.concurrent.Executors;
+import java.util.concurrent.atomic.AtomicInteger;
+import java.util.concurrent.atomic.AtomicLong;
+import javax.tools.JavaCompiler;
+import javax.tools.ToolProvider;
+
+public final class BladeJavacServer {
+    private static final String PROTOCOL = "%(protocol)s";
+    private static final int REJECTED = %(rejected)d;
+
+    private static final AtomicInteger running = new AtomicInteger();
+    private static final AtomicLong lastActive = new AtomicLong(System.currentTimeMillis());
+
+    public static void main(String[] args) throws Exception {
+        Path socketPath = Paths.get(args[0]);
+        int maxConcurrency = Integer.parseInt(args[1]);
+        long idleTimeoutMillis = Long.parseLong(args[2]) * 1000;
+        String cwd = Paths.get("").toAbsolutePath().toString();
+        JavaCompiler compiler = ToolProvider.getSystemJavaCompiler();
+
+        Files.deleteIfExists(socketPath);
+        ServerSocketChannel server = ServerSocketChannel.open(StandardProtocolFamily.UNIX);
+        server.bind(UnixDomainSocketAddress.of(socketPath));
+        ExecutorService pool = Executors.newFixedThreadPool(maxConcurrency);
+
+        Thread watchdog = new Thread(() -> {
+            while (true) {
+                try {
+                    Thread.sleep(1000);
+                } catch (InterruptedException e) {
+                    return;
+                }
+                if (running.get() == 0 &&
+                        System.currentTimeMillis() - lastActive.get() > idleTimeoutMillis) {
+                    try {
+                        Files.deleteIfExists(socketPath);
+                    } catch (Exception e) {
+                        // Exiting anyway.
+                    }
+                    System.exit(0);
+                }
+            }
+        });
+        watchdog.setDaemon(true);
+        watchdog.start();
+
+        while (true) {
+            SocketChannel client = server.accept();
+            running.incrementAndGet();
+            pool.execute(() -> {
+                try {
+                    serve(compiler, cwd, client);
+                } finally {
+                    lastActive.set(System.currentTimeMillis());
+                    running.decrementAndGet();
+                }
+            });
+        }
+    }
+
+    private static void serve(JavaCompiler compiler, String cwd, SocketChannel client) {
+        try (SocketChannel channel = client) {
+            BufferedReader reader = new BufferedReader(new InputStreamReader(
+                    Channels.newInputStream(channel), StandardCharsets.UTF_8));
+            OutputStream out = Channels.newOutputStream(channel);
+            int exitCode = REJECTED;
+            ByteArrayOutputStream diagnostics = new ByteArrayOutputStream();
+            if (PROTOCOL.equals(reader.readLine()) && cwd.equals(reader.readLine())) {
+                int argc = Integer.parseInt(reader.readLine());
+                String[] arguments = new String[argc];
+                for (int i = 0; i < argc; ++i) {
+                    arguments[i] = reader.readLine();
+                }
+                exitCode = compiler.run(null, diagnostics, diagnostics, arguments);
+            }
+            out.write((exitCode + "\\n").getBytes(StandardCharsets.UTF_8));
+            diagnostics.writeTo(out);
+            out.flush();
+        } catch (Exception e) {
+            e.printStackTrace();
+        }
+    }
+}
+''' % {'protocol': _PROTOCOL, 'rejected': _REJECTED}
+
+
+def server_dir(build_dir, javac):
+    """Return the directory holding the server's class file, socket and log."""
+    resolved = os.path.realpath(shutil.which(javac) or javac)
+    return os.path.join(build_dir, '.javac_server', util.md5sum_str(resolved)[:8])
+
+
+def socket_path(build_dir, javac):
+    # Keep the path relative: `sun_path` is limited to ~100 bytes, and both
+    # ends run in the workspace root.
+    return os.path.join(server_dir(build_dir, javac), 'javac.sock')
+
+
+def _request(sock_path, args):
+    """Send one compile request, return (exit code, diagnostics bytes)."""
+    payload = [_PROTOCOL, os.getcwd(), str(len(args))] + args
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.connect(sock_path)
+        s.sendall(('\n'.join(payload) + '\n').encode('utf-8'))
+        chunks = []
+        while True:
+            chunk = s.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    head, _, diagnostics = b''.join(chunks).partition(b'\n')
+    return int(head), diagnostics
+
+
+def _java_of(javac):
+    """Return the `java` launcher next to `javac`."""
+    dirname = os.path.dirname(javac)
+    return os.path.join(dirname, 'java') if dirname else 'java'
+
+
+def _compile_server(dir, javac):
+    """Compile the server class if it is missing or stale."""
+    source = os.path.join(dir, _SERVER_CLASS + '.java')
+    util.write_if_changed(source, _SERVER_SOURCE)
+    class_file = os.path.join(dir, _SERVER_CLASS + '.class')
+    if (os.path.exists(class_file) and
+            os.path.getmtime(class_file) >= os.path.getmtime(source)):
+        return
+    subprocess.check_call([javac, '-nowarn', '-d', dir, source])
+
+
+def _start_server(build_dir, javac, max_concurrency, idle_timeout):
+    """Start the server unless another client already did it."""
+    import fcntl  # pylint: disable=import-outside-toplevel
+    dir = server_dir(build_dir, javac)
+    sock_path = socket_path(build_dir, javac)
+    os.makedirs(dir, exist_ok=True)
+    with open(os.path.join(dir, 'lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        if _is_alive(sock_path):
+            return
+        _compile_server(dir, javac)
+        with open(os.path.join(dir, 'server.log'), 'a') as log:
+            subprocess.Popen([_java_of(javac), '-cp', dir, _SERVER_CLASS,
+                              sock_path, str(max_concurrency), str(idle_timeout)],
+                             stdin=subprocess.DEVNULL, stdout=log, stderr=log,
+                             start_new_session=True)
+        deadline = time.time() + _START_TIMEOUT
+        while time.time() < deadline:
+            if _is_alive(sock_path):
+                return
+            time.sleep(0.05)
+
+
+def _is_alive(sock_path):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        try:
+            s.connect(sock_path)
+            return True
+        except OSError:
+            return False
+
+
+def run(build_dir, javac, max_concurrency, idle_timeout, args):
+    """Compile with the server, starting it on demand.
+
+    Returns:
+        (exit code, diagnostics bytes), or None if the server is unusable and
+        the caller should run `javac` locally.
+    """
+    if not hasattr(socket, 'AF_UNIX'):
+        return None
+    if any(arg.startswith('-J') for arg in args):
+        return None
+    sock_path = socket_path(build_dir, javac)
+    for attempt in range(2):
+        try:
+            result = _request(sock_path, args)
+        except (OSError, ValueError):
+            if attempt:
+                return None
+            try:
+                _start_server(build_dir, javac, max_concurrency, idle_timeout)
+            except (OSError, subprocess.CalledProcessError):
+                return None
+            continue
+        if result[0] == _REJECTED:
+            return None
+        return result
+    return None
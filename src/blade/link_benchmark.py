@@ -0,0 +1,125 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Benchmark of the linkers, the "benchmark" subcommand.
+
+After building the targets, each cc binary and test of them is linked again
+with each linker, by its link command in the ninja file plus the
+`-fuse-ld=` flag of the linker, and the best time of `--runs` links is
+reported. The default linker of the compiler is compared with the linkers
+of `--linkers`, or the usable fast linkers by default.
+
+The binaries are removed after the benchmark, so the next build links them
+again with the configured linker.
+"""
+
+import os
+import re
+import subprocess
+import time
+
+from blade import action_cache
+from blade import cc_rule_support
+from blade import console
+
+
+DEFAULT_LINKER = 'default'
+
+
+def _link_command(build_script, output):
+    """Return the command which links `output`, with its response file written.
+
+    Ninja removes the response file after a successful command, so it is
+    linked once more keeping it. A link which runs through the action cache
+    has its command and response file content in the action file.
+    """
+    if os.path.exists(output):
+        os.remove(output)
+    returncode = subprocess.call(['ninja', '-f', build_script, '-d', 'keeprsp', output],
+                                 stdout=subprocess.DEVNULL)
+    if returncode != 0:
+        return None
+    commands = subprocess.check_output(['ninja', '-f', build_script, '-t', 'commands', '-s', output],
+                                       universal_newlines=True).splitlines()
+    if not commands:
+        return None
+    command = commands[-1]
+    m = re.search(r'--action=(\S+)', command)
+    if m:
+        rspfile = re.search(r'--rspfile=(\S+)', command)
+        rsp_content, command = action_cache.read_action_file(m.group(1))
+        if rspfile and rsp_content is not None:
+            with open(rspfile.group(1), 'w') as f:
+                f.write(rsp_content)
+    return command
+
+
+def _time_link(command, linker, runs):
+    """Return the best time of `runs` links by the command with the linker, or None if it fails."""
+    command = re.sub(r' -fuse-ld=\S+', '', command)  # Of cc_config.linker
+    if linker != DEFAULT_LINKER:
+        command += ' -fuse-ld=' + linker
+    best = None
+    for _ in range(runs):
+        start_time = time.time()
+        if subprocess.call(command, shell=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) != 0:
+            return None
+        cost = time.time() - start_time
+        best = cost if best is None else min(best, cost)
+    return best
+
+
+def _linkers(toolchain, linkers):
+    if linkers:
+        linkers = [linker.strip() for linker in linkers.split(',') if linker.strip()]
+        usable = cc_rule_support.usable_linkers(
+                toolchain, [linker for linker in linkers if linker != DEFAULT_LINKER])
+        for linker in linkers:
+            if linker != DEFAULT_LINKER and linker not in usable:
+                console.warning('Linker %s is not usable, ignored' % linker)
+        return [DEFAULT_LINKER] + usable
+    return [DEFAULT_LINKER] + cc_rule_support.usable_linkers(toolchain)
+
+
+def _format_time(cost):
+    return '%.2fs' % cost if cost is not None else 'failed'
+
+
+def run(build_script, toolchain, targets, linkers=None, runs=3):
+    """Benchmark linking the binaries of the targets, return the exit code.
+
+    Args:
+        targets: list of (key, output) of the binaries.
+        linkers: the comma separated linkers to compare with the default one.
+    """
+    linkers = _linkers(toolchain, linkers)
+    if not targets:
+        console.warning('No cc binary or test to benchmark')
+        return 0
+    if len(linkers) == 1:
+        console.warning('No other linker than the default one is usable')
+    results = []
+    for key, output in targets:
+        command = _link_command(build_script, output)
+        if not command:
+            console.error('Failed to get the link command of %s' % key)
+            return 1
+        console.info('Linking %s' % key)
+        results.append((key, [_time_link(command, linker, runs) for linker in linkers]))
+        if os.path.exists(output):
+            os.remove(output)
+
+    width = max(len(key) for key, _ in results) + 2
+    lines = ['Link time, the best of %d runs:' % runs,
+             '  %s%s' % ('target'.ljust(width), ''.join(linker.rjust(10) for linker in linkers))]
+    for key, costs in results:
+        lines.append('  %s%s' % (key.ljust(width), ''.join(_format_time(c).rjust(10) for c in costs)))
+    totals = []
+    for i in range(len(linkers)):
+        costs = [c[i] for _, c in results]
+        totals.append(None if None in costs else sum(costs))
+    lines.append('  %s%s' % ('total'.ljust(width), ''.join(_format_time(c).rjust(10) for c in totals)))
+    console.output('\n'.join(lines))
+    return 0
@@ -48,7 +48,7 @@ def adjust_config_by_options(config, options):
     shared_options = {
         'global_config': ['debug_info_level', 'backend_builder', 'build_jobs', 'test_jobs', 'run_unrepaired_tests'],
         'java_config': ['jar_compression_level', 'fat_jar_compression_level'],
-        'cc_config': ['fission', 'dwp'],
+        'cc_config': ['fission', 'dwp', 'unity'],
     }
     for section, names in shared_options.items():
         for name in names:
@@ -115,11 +115,13 @@ def run_subcommand(blade_path, command, options, ws, toolchain, targets):
     # VcpkgLibrary resolves its lib filenames -- a port may add a debug postfix
     # (e.g. fmt's debug lib is fmtd.lib) that can't be predicted at parse time.
     # Only for building commands; query/clean/dump never install.
-    if command in ('build', 'run', 'test'):
+    if command in ('build', 'run', 'test', 'benchmark'):
         stages.append(('vcpkg', builder.setup_vcpkg))
     stages.append(('generate', builder.generate))
     for stage, action in stages:
+        start_time = time.time()
         action()
+        builder.record_stage_time(stage, start_time, time.time())
         if _check_error_log(stage):
             return 1
         if options.stop_after == stage:
@@ -12,14 +12,32 @@ The ninja runner module.
 import collections
 import os
 import re
+import selectors
 import subprocess
 import time
 
 from blade import console
 
 
-def build(build_dir, build_script, jobs_num, targets, options):
-    """Execute the ninja executable with proper arguments."""
+_PROGRESS_RE = re.compile(r'^\[(\d+)/(\d+)\]\((\d+)\)\s+(.*)$')
+
+# The build panel is redrawn at most once a frame, and less often when
+# drawing it takes more than this share of a core.
+_PANEL_FRAME_INTERVAL = console._PROGRESS_REFRESH_INTERVAL
+_MAX_PANEL_CPU_SHARE = 0.02
+
+# How long to wait for the output of ninja before calling `on_progress` anyway.
+_IDLE_INTERVAL = 0.05
+
+_READ_SIZE = 65536
+
+
+def build(build_dir, build_script, jobs_num, targets, options, on_progress=None):
+    """Execute the ninja executable with proper arguments.
+
+    `on_progress()` is called repeatedly while ninja runs, unless ninja owns
+    the terminal in the verbose mode.
+    """
     cmd = ['ninja', '-f', build_script]
     cmd += _build_options(options)
     cmd.append('-j%s' % jobs_num)
@@ -30,7 +48,7 @@ def build(build_dir, build_script, jobs_num, targets, options):
     if targets:
         cmd.append(targets)
     build_start_time = time.time()
-    ret = _run_ninja_build(cmd, options)
+    ret = _run_ninja_build(cmd, options, on_progress)
     if options.show_builds_slower_than is not None:
         _show_slow_builds(build_dir, build_start_time, options.show_builds_slower_than)
     return ret
@@ -56,20 +74,23 @@ def _build_options(options):
     return build_options
 
 
-def _run_ninja_build(cmd, options):
+def _run_ninja_build(cmd, options, on_progress):
     """Run the "ninja" program with interactive."""
     cmdstr = ' '.join(cmd)
     if options.verbosity >= console.Verbosity.VERBOSE:
         # Verbose: let ninja own the terminal and print every command in full.
         return _run_ninja_command(cmdstr)
     # Otherwise capture ninja's output and render our own build panel: ninja,
-    # writing to a pipe/file (not a smart terminal), emits one line per finished
-    # edge as '[finished/total](running) <desc>' -- easy to parse.
+    # writing to a pipe (not a smart terminal), emits one line per finished
+    # edge as '[finished/total](running) <desc>' -- easy to parse. The output
+    # is also kept in blade-bin/ninja_output.log.
     ninja_output = 'blade-bin/ninja_output.log'
     os.environ['NINJA_STATUS'] = '[%f/%t](%r) '  # the panel parser depends on this
-    with open(ninja_output, 'w', buffering=1) as wf, open(ninja_output, buffering=1) as rf:
-        p = subprocess.Popen(cmdstr, shell=True, stdout=wf, stderr=subprocess.STDOUT)
-        _show_progress(p, rf)
+    with open(ninja_output, 'wb') as log_file:
+        p = subprocess.Popen(cmdstr, shell=True, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        assert p.stdout is not None
+        with p.stdout:
+            _show_progress(p, log_file, on_progress)
     return p.returncode
 
 
@@ -84,63 +105,192 @@ def _run_ninja_command(cmdstr):
         return 1
 
 
-def _show_progress(process, file_reader):
-    """Render ninja's '[finished/total](running) <desc>' status stream as a live
+def _read_output(stream, idle_timeout):
+    """Yield the output of a pipe in chunks as it comes, until its end.
+
+    An empty chunk is yielded after `idle_timeout` seconds without output,
+    except on Windows, where pipes can't be waited for by a selector.
+    """
+    fd = stream.fileno()
+    if os.name == 'nt':
+        while True:
+            data = os.read(fd, _READ_SIZE)
+            if not data:
+                return
+            yield data
+    with selectors.DefaultSelector() as selector:
+        selector.register(fd, selectors.EVENT_READ)
+        while True:
+            if not selector.select(idle_timeout):
+                yield b''
+                continue
+            data = os.read(fd, _READ_SIZE)
+            if not data:
+                return
+            yield data
+
+
+class _BuildPanel:
+    """Render ninja's '[finished/total](running) <desc>' status lines as a live
     build panel: a tri-state grayscale bar + a sliding window of recent steps.
 
-    Each parsed line drives the panel; anything else (compiler warnings/errors,
-    'ninja: ...') is printed permanently -- console.output auto-clears the panel
-    first, so those messages scroll above it and are never overwritten. On clean
-    success a one-line summary replaces the panel.
+    Anything else (compiler warnings/errors, 'ninja: ...') is printed
+    permanently -- console.output auto-clears the panel first, so those
+    messages scroll above it and are never overwritten.
+
+    The panel is redrawn at most once a frame, and less often when drawing
+    it takes more than `_MAX_PANEL_CPU_SHARE` of a core, so the CPU it takes
+    is bounded whatever the rate of the edges is.
     """
-    progress_re = re.compile(r'^\[(\d+)/(\d+)\]\((\d+)\)\s+(.*)$')
-    recent = collections.deque(maxlen=console._PANEL_MAX_RECENT)
-    # In quiet mode show only the aggregate bar, not the per-step descriptions.
-    quiet = console.is_quiet()
-    # A live panel needs cursor control (\r, clear-line). Without it (CI, a pipe,
-    # a dumb terminal) we fall back to printing the status lines as they arrive.
-    # Invariant for the whole build, so resolve it once.
-    cursor_control = console.support_cursor_control()
-    total = finished = 0
-    start = time.time()
+
+    def __init__(self):
+        self.recent = collections.deque(maxlen=console._PANEL_MAX_RECENT)
+        # In quiet mode show only the aggregate bar, not the per-step descriptions.
+        self.quiet = console.is_quiet()
+        # A live panel needs cursor control (\r, clear-line). Without it (CI, a pipe,
+        # a dumb terminal) we fall back to printing the status lines as they arrive.
+        # Invariant for the whole build, so resolve it once.
+        self.cursor_control = console.support_cursor_control()
+        self.total = self.finished = self.running = 0
+        self.start = time.time()
+        self.changed = False
+        self.next_frame_time = 0.0
+        self.cpu_time = 0.0  # Spent in showing the progress, by this thread
+
+    def feed(self, lines):
+        """Process the complete output lines of ninja."""
+        batch, batch_printer = [], console.output  # The printer of the lines in batch
+        for line in lines:
+            m = _PROGRESS_RE.match(line)
+            printer = None
+            if m:
+                # Track totals unconditionally so the final "N build steps
+                # completed" summary is correct even without a live panel.
+                self.finished, self.total = int(m.group(1)), int(m.group(2))
+                if self.cursor_control:
+                    self.running = max(0, int(m.group(3)) - 1)  # %r counts the finishing edge
+                    self.recent.append(m.group(4))
+                    self.changed = True
+                elif not self.quiet:
+                    # No cursor control: print the status line so the build
+                    # stays observable. print_line (not console.output): the
+                    # full ninja stream is already persisted to
+                    # ninja_output.log, so re-logging each line is redundant.
+                    printer = console.print_line
+            elif line and line != 'ninja: no work to do.':
+                printer = console.output
+            if printer is None:
+                continue
+            # Print the consecutive lines of the same kind at once
+            if printer is not batch_printer and batch:
+                batch_printer('\n'.join(batch))
+                batch = []
+            batch_printer = printer
+            batch.append(line)
+        if batch:
+            batch_printer('\n'.join(batch))
+
+    def render(self):
+        """Redraw the panel if it changed and a frame is due."""
+        now = time.time()
+        if not self.changed or now < self.next_frame_time:
+            return
+        cpu_start = time.thread_time()
+        elapsed = now - self.start
+        eta = (self.total - self.finished) * elapsed / self.finished if self.finished else None
+        window = () if self.quiet else self.recent
+        console.render_build_panel(self.finished, self.running, self.total, window, eta)
+        self.changed = False
+        cost = time.thread_time() - cpu_start
+        self.next_frame_time = now + max(_PANEL_FRAME_INTERVAL, cost / _MAX_PANEL_CPU_SHARE)
+
+
+def _show_progress(process, log_file, on_progress=None):
+    """Show the progress of ninja by its output, see `_BuildPanel`.
+
+    The output is read from the pipe as it comes, and written to the log file
+    in the same chunks. On clean success a one-line summary replaces the panel.
+
+    `on_progress()` is called after each chunk of output, and when ninja is quiet.
+    """
+    panel = _BuildPanel()
+    pending = b''  # Partial last line
     try:
-        while True:
-            process.poll()
-            line = file_reader.readline()
-            if line:
-                line = line.rstrip('\r\n')  # keep leading indent of error output
-                m = progress_re.match(line)
-                if m:
-                    # Track totals unconditionally so the final "N build steps
-                    # completed" summary is correct even without a live panel.
-                    finished, total = int(m.group(1)), int(m.group(2))
-                    if cursor_control:
-                        running = max(0, int(m.group(3)) - 1)  # %r counts the finishing edge
-                        recent.append(m.group(4))
-                        elapsed = time.time() - start
-                        eta = (total - finished) * elapsed / finished if finished else None
-                        window = () if quiet else recent
-                        console.render_build_panel(finished, running, total, window, eta)
-                    elif not quiet:
-                        # No cursor control: print the status line so the build
-                        # stays observable. print_line (not console.output): the
-                        # full ninja stream is already persisted to
-                        # ninja_output.log, so re-logging each line is redundant.
-                        # Honors quiet like the panel path above.
-                        console.print_line(line)
-                elif line == 'ninja: no work to do.':
-                    pass
-                elif line:
-                    console.output(line)
-            elif process.returncode is not None:
-                break
-            else:
-                # Avoid cost too much cpu
-                time.sleep(0.05)
+        for data in _read_output(process.stdout, _IDLE_INTERVAL):
+            cpu_start = time.thread_time()
+            if data:
+                log_file.write(data)
+                lines = (pending + data).split(b'\n')
+                pending = lines.pop()
+                # keep leading indent of error output
+                panel.feed([line.decode('utf-8', 'replace').rstrip('\r') for line in lines])
+            panel.render()
+            panel.cpu_time += time.thread_time() - cpu_start
+            if on_progress:
+                on_progress()
+        if pending:
+            panel.feed([pending.decode('utf-8', 'replace').rstrip('\r')])
+        process.wait()
     finally:
         console.clear_progress_bar()  # wipe the panel
-        if process.returncode == 0 and total:
-            console.info('%d build steps completed' % total)
+        console.debug('Showing the build progress took %.2fs CPU in %.2fs' % (
+                      panel.cpu_time, time.time() - panel.start))
+        if process.returncode == 0 and panel.total:
+            console.info('%d build steps completed' % panel.total)
+
+
+class NinjaLogWatcher:
+    """Tell the outputs ninja builds from now on, by following its `.ninja_log`.
+
+    Ninja appends a line to the log as each edge finishes, for each of its
+    outputs:
+
+        <start ms>\t<end ms>\t<mtime>\t<output>\t<command hash>
+
+    Ninja may recompact the log when it starts. The log is then read again
+    from the start, and only the outputs modified since the watcher was
+    created are told.
+    """
+
+    def __init__(self, build_dir):
+        self.path = os.path.join(build_dir, '.ninja_log')
+        self.start_time = time.time()
+        self.offset = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        self.recompacted = False
+        self.pending = b''  # Partial last line
+
+    def _modified_since_start(self, output):
+        try:
+            return os.path.getmtime(output) >= self.start_time - 1
+        except OSError:
+            return False
+
+    def new_outputs(self):
+        """Return the normalized paths of the outputs built since the last call."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self.offset:
+            self.offset, self.recompacted, self.pending = 0, True, b''
+        if size == self.offset:
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            data = f.read()
+            self.offset = f.tell()
+        lines = (self.pending + data).split(b'\n')
+        self.pending = lines.pop()
+        outputs = []
+        for line in lines:
+            line = line.decode('utf-8', 'replace')
+            fields = line.split('\t')
+            if len(fields) != 5 or line.startswith('#'):
+                continue
+            output = os.path.normpath(fields[3])
+            if not self.recompacted or self._modified_since_start(output):
+                outputs.append(output)
+        return outputs
 
 
 def _show_slow_builds(build_dir, build_start_time, show_builds_slower_than):
@@ -152,6 +152,12 @@ class PackageTarget(Target):
                 continue
             if not dst:
                 dst = os.path.basename(path)
+            if path == targets[key].data.get('thin_archive'):
+                # Its members are not packaged with it, package a real archive
+                archive = os.path.join(self._target_file_path(self.name + '.archives'),
+                                       key.replace(':', '/'), os.path.basename(path))
+                self.generate_build('arfull', archive, inputs=path)
+                path = archive
             inputs.append(path)
             entries.append(dst)
 
@@ -298,6 +298,11 @@ class PythonTest(PythonBinary):
                  main: str | None,
                  base: str | None,
                  testdata: StrOrListOpt,
+                 shard_count: int,
+                 readonly_testdata: bool,
+                 test_cpu: int,
+                 test_memory: int | str,
+                 test_lock: str,
                  kwargs: dict[str, object]):
         """Init method."""
         super().__init__(
@@ -312,6 +317,9 @@ class PythonTest(PythonBinary):
                 kwargs=kwargs)
         self.type = 'py_test'  # lgtm[py/overwritten-inherited-attribute]
         self.attr['testdata'] = var_to_list(testdata)
+        self._set_shard_count(shard_count)
+        self.attr['readonly_testdata'] = readonly_testdata
+        self._set_test_resources(test_cpu, test_memory, test_lock)
         self._add_tags('type:test')
 
 
@@ -323,6 +331,11 @@ def py_test(name: str,
             main: str | None = None,
             base: str | None = None,
             testdata: StrOrListOpt = None,
+            shard_count: int = 0,
+            readonly_testdata: bool = False,
+            test_cpu: int = 1,
+            test_memory: int | str = 0,
+            test_lock: str = '',
             **kwargs: object):
     """python test."""
     target = PythonTest(
@@ -334,6 +347,11 @@ def py_test(name: str,
             main=main,
             base=base,
             testdata=testdata,
+            shard_count=shard_count,
+            readonly_testdata=readonly_testdata,
+            test_cpu=test_cpu,
+            test_memory=test_memory,
+            test_lock=test_lock,
             kwargs=kwargs)
     build_manager.instance.register_target(target)
 
@@ -347,12 +365,13 @@ def _generate_python_rules(ctx):
         name='pythonlibrary',
         command=ctx.builtin_command('python_library', '--basedir=${basedir} --pylib=${out} ${in}'),
         description='PYTHON LIBRARY ${out}'))
+    precompile = '--precompile=1 ' if ctx.config_section('python_config')['precompile'] else ''
     ctx.emit_rule(NinjaRule(
         name='pythonbinary',
         command=ctx.builtin_command(
             'python_binary',
             '--basedir=${basedir} --exclusions=${exclusions} --mainentry=${mainentry} '
-            '--pybin=${out} ${in}'),
+            f'{precompile}--pybin=${{out}} ${{in}}'),
         description='PYTHON BINARY ${out}'))
 
 
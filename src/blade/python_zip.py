@@ -0,0 +1,186 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Incremental assembly of the py_binary zip.
+
+Rebuilding the zip from scratch re-deflates every member of every `.pylib`,
+egg and wheel on each change. `PythonBinaryZip` avoids almost all of that:
+
+* members of eggs and wheels are copied as raw compressed bytes;
+* a source file whose CRC and size match the member of the same name in the
+  previous zip is copied raw from it instead of being deflated again;
+* optionally, each `.py` gets a `.pyc` next to it, which `zipimport` loads
+  instead of compiling the source on every launch. The pycs are unchecked
+  hash-based ones, so they are reproducible; they are only ever stale if the
+  zip is, since any source change rebuilds it. The archive comment records
+  the bytecode magic, so the pycs of the previous zip are only reused when it
+  was built by the same Python version. A pyc of a different version is
+  ignored by `zipimport`, which then falls back to the source.
+
+Raw copying uses the `zipfile` internals (`fp`, `filelist`, `NameToInfo`,
+`start_dir`), which have been stable across CPython 3 releases.
+"""
+
+
+import importlib.util
+import marshal
+import os
+import struct
+import time
+import zipfile
+import zlib
+
+from blade import console
+
+
+_LOCAL_HEADER_SIZE = 30
+_PYC_TAG = b'blade-pyc:' + importlib.util.MAGIC_NUMBER.hex().encode()
+# Flags of the pyc header: hash-based, don't check the source.
+_PYC_UNCHECKED_HASH = 0b01
+
+
+def _read_raw(zip, info):
+    """Return the compressed bytes of a member."""
+    zip.fp.seek(info.header_offset)
+    header = zip.fp.read(_LOCAL_HEADER_SIZE)
+    name_len, extra_len = struct.unpack('<HH', header[26:30])
+    zip.fp.seek(info.header_offset + _LOCAL_HEADER_SIZE + name_len + extra_len)
+    return zip.fp.read(info.compress_size)
+
+
+def python_bytecode(source, arcname):
+    """Compile `source` to the content of an unchecked hash-based pyc."""
+    code = compile(source, arcname, 'exec', dont_inherit=True)
+    return (importlib.util.MAGIC_NUMBER +
+            struct.pack('<I', _PYC_UNCHECKED_HASH) +
+            importlib.util.source_hash(source) +
+            marshal.dumps(code))
+
+
+class PythonBinaryZip:
+    """Write the zip of a py_binary, reusing what it can from the last build."""
+
+    def __init__(self, path, precompile):
+        self.path = path
+        self.precompile = precompile
+        self.tmp_path = path + '.tmp'
+        self.zip = zipfile.ZipFile(self.tmp_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True)
+        self.old = None
+        self.old_has_pyc = False
+        if os.path.exists(path):
+            try:
+                self.old = zipfile.ZipFile(path)
+                self.old_has_pyc = self.old.comment == _PYC_TAG
+            except (OSError, zipfile.BadZipFile):
+                self.old = None
+        self.reused = self.compressed = 0
+
+    def _old_info(self, arcname, crc, size):
+        """Return the member of the previous zip holding the same content."""
+        if self.old is None:
+            return None
+        info = self.old.NameToInfo.get(arcname)
+        if info and info.CRC == crc and info.file_size == size and not info.flag_bits & 0x1:
+            return info
+        return None
+
+    def _copy_raw(self, src, info, arcname):
+        raw = _read_raw(src, info)
+        zinfo = zipfile.ZipInfo(arcname, info.date_time)
+        zinfo.compress_type = info.compress_type
+        zinfo.external_attr = info.external_attr
+        zinfo.CRC = info.CRC
+        zinfo.compress_size = info.compress_size
+        zinfo.file_size = info.file_size
+        # Keep the compression option bits only: sizes and CRC are known up
+        # front, so no data descriptor follows the data.
+        zinfo.flag_bits = info.flag_bits & 0x6
+        zinfo.header_offset = self.zip.fp.tell()
+        self.zip.fp.write(zinfo.FileHeader())
+        self.zip.fp.write(raw)
+        self.zip.filelist.append(zinfo)
+        self.zip.NameToInfo[arcname] = zinfo
+        self.zip.start_dir = self.zip.fp.tell()
+        self.zip._didModify = True  # pylint: disable=protected-access
+
+    def _add(self, arcname, data, st=None):
+        info = self._old_info(arcname, zlib.crc32(data), len(data))
+        if info:
+            self._copy_raw(self.old, info, arcname)
+            self.reused += 1
+        elif st:
+            date_time = time.localtime(st.st_mtime)[:6]
+            if date_time[0] < 1980:  # Earliest date a zip can hold
+                date_time = (1980, 1, 1, 0, 0, 0)
+            zinfo = zipfile.ZipInfo(arcname, date_time)
+            zinfo.external_attr = (st.st_mode & 0xFFFF) << 16
+            self.zip.writestr(zinfo, data, compress_type=zipfile.ZIP_DEFLATED)
+            self.compressed += 1
+        else:
+            self.zip.writestr(arcname, data)
+            self.compressed += 1
+        if self.precompile and arcname.endswith('.py'):
+            if not (info and self._reuse_pyc(arcname)):
+                self._compile_pyc(arcname, data)
+
+    def _reuse_pyc(self, arcname):
+        """Copy the pyc of an unchanged source from the previous zip."""
+        pyc_arcname = arcname + 'c'
+        if not self.old_has_pyc or pyc_arcname not in self.old.NameToInfo:
+            return False
+        self._copy_raw(self.old, self.old.NameToInfo[pyc_arcname], pyc_arcname)
+        return True
+
+    def _compile_pyc(self, arcname, source):
+        try:
+            bytecode = python_bytecode(source, arcname)
+        except (SyntaxError, ValueError) as e:
+            # Leave it to zipimport to report at import time, as without pycs.
+            console.debug(f'Not precompiling {arcname}: {e}')
+            return
+        self.zip.writestr(arcname + 'c', bytecode)
+
+    def write(self, path, arcname):
+        """Add a source file."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        self._add(arcname, data, os.stat(path))
+
+    def writestr(self, arcname, data):
+        """Add a generated member."""
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        self._add(arcname, data)
+
+    def copy_member(self, lib, name):
+        """Add a member of another zip (egg, wheel), without recompressing it."""
+        info = lib.getinfo(name)
+        if info.flag_bits & 0x1:  # Encrypted
+            self.writestr(name, lib.read(name))
+            return
+        self._copy_raw(lib, info, name)
+        if self.precompile and name.endswith('.py'):
+            unchanged = self._old_info(name, info.CRC, info.file_size) is not None
+            if not (unchanged and self._reuse_pyc(name)):
+                self._compile_pyc(name, lib.read(name))
+
+    def close(self):
+        if self.precompile:
+            self.zip.comment = _PYC_TAG
+        self.zip.close()
+        if self.old is not None:
+            self.old.close()
+        os.replace(self.tmp_path, self.path)
+        console.debug(f'{self.path}: {self.reused} members reused, '
+                      f'{self.compressed} compressed')
+
+    def discard(self):
+        """Abandon the zip on error."""
+        self.zip.close()
+        if self.old is not None:
+            self.old.close()
+        try:
+            os.remove(self.tmp_path)
+        except OSError:
+            pass
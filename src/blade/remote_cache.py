@@ -0,0 +1,198 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Client of a remote build cache over HTTP.
+
+It extends the action cache (see `action_cache`) to the machines which build
+the same commits. The protocol is the simple HTTP one of bazel-remote:
+
+    GET|PUT <url>/ac/<action key>   The outputs of an action, a JSON list of
+                                    {"path", "mode", "digest"}
+    GET|PUT|HEAD <url>/cas/<sha256> The content of an output
+
+A server may check the digests of the contents it is given. Any HTTP server
+which implements this for arbitrary content works, such as bazel-remote or
+`blade.remote_cache_server`, the one bundled for local use and tests.
+
+`global_config.remote_cache_policy` decides whether the cache is read,
+written, or both. Errors of the remote cache are not errors of the build,
+the action is just run locally.
+
+Each action runs in its own `action` builtin tool process, so its pool of
+keep-alive connections is shared by the requests and the concurrent
+transfers of the action, not across the actions. A server which can't be
+connected to writes the down stamp in the build dir, and the remote cache is
+not used again by the rest of the build, rather than every action waiting
+for the connect timeout.
+"""
+
+
+import base64
+import concurrent.futures
+import http.client
+import json
+import os
+import queue
+import urllib.parse
+
+from blade import console
+from blade.action_cache import file_digest
+
+
+# The maximum number of connections, and of concurrent transfers
+_MAX_CONNECTIONS = 4
+
+_CHUNK_SIZE = 1 << 20
+
+
+class RemoteCache:
+    """A remote cache server, with a pool of keep-alive connections to it."""
+
+    def __init__(self, url, policy='readwrite', timeout: float = 10.0, down_stamp=''):
+        parts = urllib.parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError('Invalid remote cache url "%s"' % url)
+        self._connection_class = (http.client.HTTPSConnection if parts.scheme == 'https'
+                                  else http.client.HTTPConnection)
+        self._host = parts.hostname
+        self._port = parts.port
+        self._prefix = parts.path.rstrip('/')
+        self._headers = {}
+        if parts.username:
+            credentials = '%s:%s' % (urllib.parse.unquote(parts.username),
+                                     urllib.parse.unquote(parts.password or ''))
+            self._headers['Authorization'] = 'Basic ' + base64.b64encode(credentials.encode()).decode()
+        self._timeout = timeout
+        self._connections = queue.LifoQueue()
+        self._down_stamp = down_stamp
+        down = bool(down_stamp) and os.path.exists(down_stamp)
+        self.readable = not down and policy in ('readwrite', 'readonly')
+        self.writable = not down and policy in ('readwrite', 'writeonly')
+
+    def _connect(self):
+        """Return a new connection, or None if the server can't be connected to."""
+        if not self.readable and not self.writable:
+            return None
+        connection = self._connection_class(self._host, self._port, timeout=self._timeout)
+        try:
+            connection.connect()
+        except OSError as e:
+            console.debug('Remote cache is down: %s' % e)
+            connection.close()
+            self._set_down()
+            return None
+        return connection
+
+    def _set_down(self):
+        """Don't use the remote cache any more, nor the other actions of the build."""
+        self.readable = self.writable = False
+        if self._down_stamp:
+            try:
+                with open(self._down_stamp, 'w'):
+                    pass
+            except OSError:
+                pass
+
+    def _request(self, method, path, body=None, headers=None, output=None):
+        """Send a request, return its status, and the body unless written to `output`.
+
+        A request on a kept alive connection which the server closed is sent
+        again on a new one. The status is 0 on a connection error, or when
+        the remote cache is down.
+        """
+        for retry in (False, True):
+            try:
+                connection = self._connections.get_nowait()
+            except queue.Empty:
+                connection = self._connect()
+                if connection is None:
+                    return 0, b''
+                retry = True  # A new connection is not stale
+            try:
+                if hasattr(body, 'seek'):
+                    body.seek(0)
+                connection.request(method, self._prefix + path, body=body,
+                                   headers=dict(self._headers, **(headers or {})))
+                response = connection.getresponse()
+                if output and response.status == 200:
+                    for chunk in iter(lambda: response.read(_CHUNK_SIZE), b''):
+                        output.write(chunk)
+                    data = b''
+                else:
+                    data = response.read()
+            except (OSError, http.client.HTTPException) as e:
+                connection.close()
+                if retry:
+                    console.debug('Remote cache %s %s failed: %s' % (method, path, e))
+                    return 0, b''
+                continue
+            if response.will_close:
+                connection.close()
+            else:
+                self._connections.put(connection)
+            return response.status, data
+        return 0, b''
+
+    def close(self):
+        while not self._connections.empty():
+            self._connections.get_nowait().close()
+
+    def get_action(self, key):
+        """Return the outputs of an action, or None."""
+        status, data = self._request('GET', '/ac/' + key)
+        if status != 200:
+            return None
+        try:
+            entries = json.loads(data)
+            return [{'path': e['path'], 'mode': int(e['mode']), 'digest': e['digest']}
+                    for e in entries]
+        except (ValueError, TypeError, KeyError):
+            return None
+
+    def put_action(self, key, entries):
+        status, _ = self._request('PUT', '/ac/' + key, body=json.dumps(entries).encode(),
+                                  headers={'Content-Type': 'application/json'})
+        return status in (200, 201, 204)
+
+    def get_blob(self, digest, path):
+        """Download a content to a file, return whether it is found and intact."""
+        with open(path, 'wb') as f:
+            status, _ = self._request('GET', '/cas/' + digest, output=f)
+        return status == 200 and file_digest(path) == digest
+
+    def has_blob(self, digest):
+        status, _ = self._request('HEAD', '/cas/' + digest)
+        return status == 200
+
+    def put_blob(self, digest, path):
+        if self.has_blob(digest):
+            return True
+        with open(path, 'rb') as f:
+            status, _ = self._request('PUT', '/cas/' + digest, body=f,
+                                      headers={'Content-Length': str(os.fstat(f.fileno()).st_size),
+                                               'Content-Type': 'application/octet-stream'})
+        return status in (200, 201, 204)
+
+    def download(self, entries, tmp_dir):
+        """Download the contents of the outputs of an action concurrently.
+
+        Return the paths of them in `tmp_dir`, or None if any is missing.
+        """
+        paths = [os.path.join(tmp_dir, str(i)) for i in range(len(entries))]
+        with concurrent.futures.ThreadPoolExecutor(_MAX_CONNECTIONS) as executor:
+            found = executor.map(self.get_blob, [e['digest'] for e in entries], paths)
+            if not all(found):
+                return None
+        return paths
+
+    def upload(self, key, outputs):
+        """Upload the outputs of an action concurrently, and then the action."""
+        entries = [{'path': output, 'mode': os.stat(output).st_mode & 0o777,
+                    'digest': file_digest(output)} for output in outputs]
+        with concurrent.futures.ThreadPoolExecutor(_MAX_CONNECTIONS) as executor:
+            uploaded = executor.map(self.put_blob, [e['digest'] for e in entries], outputs)
+            if not all(uploaded):
+                return False
+        # The action is put last, so it is never found without its outputs.
+        return self.put_action(key, entries)
@@ -0,0 +1,182 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+A small remote build cache server, for local use and tests.
+
+It serves the HTTP protocol of `remote_cache` from a directory:
+
+    <dir>/ac/<key[:2]>/<key>
+    <dir>/cas/<digest[:2]>/<digest>
+
+The digests of the contents put into `/cas/` are checked. Beyond the size
+limit, the least recently used files are removed. Run it as:
+
+    python -m blade.remote_cache_server --dir=<dir> [--host=127.0.0.1] [--port=8080] [--max_size=<MiB>]
+
+For a fleet, a production server such as bazel-remote is a better choice.
+"""
+
+
+import argparse
+import hashlib
+import http.server
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+
+
+_KEY_RE = re.compile(r'^/(ac|cas)/([0-9a-f]{64})$')
+
+_CHUNK_SIZE = 1 << 20
+
+# Evict down to this share of the size limit, not to evict on every put
+_EVICT_TO = 0.9
+
+
+class _Storage:
+    """The files of the server, with their total size."""
+
+    def __init__(self, root, max_size):
+        self.root = root
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._size = sum(size for _, size, _ in self._files())
+
+    def path(self, kind, key):
+        return os.path.join(self.root, kind, key[:2], key)
+
+    def _files(self):
+        """Return [(mtime, size, path)] of all files."""
+        files = []
+        for kind in ('ac', 'cas'):
+            for root, _, names in os.walk(os.path.join(self.root, kind)):
+                for name in names:
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((st.st_mtime, st.st_size, path))
+        return files
+
+    def added(self, size):
+        with self._lock:
+            self._size += size
+            if not self.max_size or self._size <= self.max_size:
+                return
+            for _, file_size, path in sorted(self._files()):
+                if self._size <= self.max_size * _EVICT_TO:
+                    break
+                try:
+                    os.remove(path)
+                    self._size -= file_size
+                except OSError:
+                    pass
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    """Serve GET, HEAD and PUT of /ac/ and /cas/."""
+
+    protocol_version = 'HTTP/1.1'  # Keep alive
+    storage = None  # _Storage
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def _path(self):
+        m = _KEY_RE.match(self.path)
+        if not m:
+            self._reply(400)
+            return None, None
+        return m.group(2), self.storage.path(m.group(1), m.group(2))
+
+    def _reply(self, status, length=0):
+        self.send_response(status)
+        self.send_header('Content-Length', str(length))
+        self.end_headers()
+
+    def do_HEAD(self):  # pylint: disable=invalid-name
+        _, path = self._path()
+        if path:
+            try:
+                self._reply(200, os.path.getsize(path))
+            except OSError:
+                self._reply(404)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        _, path = self._path()
+        if not path:
+            return
+        try:
+            f = open(path, 'rb')
+        except OSError:
+            self._reply(404)
+            return
+        with f:
+            self._reply(200, os.fstat(f.fileno()).st_size)
+            shutil.copyfileobj(f, self.wfile, _CHUNK_SIZE)
+        try:
+            os.utime(path)  # For LRU
+        except OSError:
+            pass
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        key, path = self._path()
+        if not path:
+            return
+        length = int(self.headers.get('Content-Length', 0))
+        dirname = os.path.dirname(path)
+        os.makedirs(dirname, exist_ok=True)
+        h = hashlib.sha256()
+        fd, tmp = tempfile.mkstemp(dir=dirname)
+        with os.fdopen(fd, 'wb') as f:
+            remaining = length
+            while remaining > 0:
+                chunk = self.rfile.read(min(remaining, _CHUNK_SIZE))
+                if not chunk:
+                    break
+                h.update(chunk)
+                f.write(chunk)
+                remaining -= len(chunk)
+        if remaining or ('/cas/' in self.path and h.hexdigest() != key):
+            os.remove(tmp)
+            self.close_connection = remaining > 0
+            self._reply(400)
+            return
+        os.replace(tmp, path)
+        self.storage.added(length)
+        self._reply(200)
+
+
+def make_server(cache_dir, host='127.0.0.1', port=0, max_size=0):
+    """Return the server of a dir, `max_size` is in bytes, 0 means unlimited."""
+    handler = type('Handler', (_Handler,), {'storage': _Storage(cache_dir, max_size)})
+    server = http.server.ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description='A small remote build cache server of blade')
+    parser.add_argument('--dir', required=True, help='The directory of the cache')
+    parser.add_argument('--host', default='127.0.0.1', help='The address to listen on')
+    parser.add_argument('--port', type=int, default=8080, help='The port to listen on')
+    parser.add_argument('--max_size', type=int, default=0,
+                        help='The size limit of the cache in MiB, 0 means unlimited')
+    options = parser.parse_args()
+    server = make_server(options.dir, options.host, options.port, options.max_size << 20)
+    print('Serving the remote build cache in %s on http://%s:%d' % (
+          options.dir, options.host, server.server_address[1]), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == '__main__':
+    main()
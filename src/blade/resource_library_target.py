@@ -12,6 +12,7 @@ Define resource_library target.
 from blade import build_manager
 from blade import build_rules
 from blade import cc_targets
+from blade import config
 from blade import rule_registry
 from blade.blade_types import StrOrListOpt
 from blade.ninja_rule import NinjaRule
@@ -66,6 +67,18 @@ class ResourceLibrary(cc_targets.CcTarget):
         self._add_tags('lang:lexyacc', 'type:library')
         self._set_hdrs([hdr])
 
+    def _use_incbin(self):
+        """Whether to embed the resources with the assembler's `.incbin`.
+
+        The generated stub is GNU assembler syntax for ELF and Mach-O, so
+        `auto` falls back to C arrays for MSVC and Windows targets.
+        """
+        embedding = config.get_item('cc_library_config', 'resource_embedding')
+        if embedding != 'auto':
+            return embedding == 'incbin'
+        tc = self.blade.get_build_toolchain()
+        return not tc.cc_is('msvc') and not tc.is_clang_cl() and tc.target_os != 'windows'
+
     def generate(self):
         if not self.srcs:
             return
@@ -79,9 +92,16 @@ class ResourceLibrary(cc_targets.CcTarget):
                                 'path': self.path
                             })
         sources = ['%s.c' % self.name]
+        incbin = self._use_incbin()
         for resource in self.srcs:
-            generated_source = '%s.c' % resource
-            self.generate_build('resource', self._target_file_path(generated_source),
+            if incbin:
+                # Preprocessed, so it is compiled by the `cc` rule like any `.S`.
+                generated_source = '%s.S' % resource
+                rule = 'resource_incbin'
+            else:
+                generated_source = '%s.c' % resource
+                rule = 'resource'
+            self.generate_build(rule, self._target_file_path(generated_source),
                                 inputs=self._source_file_path(resource))
             sources.append(generated_source)
         objs = self._generated_cc_objects(sources)
@@ -122,6 +142,10 @@ def _generate_resource_rules(ctx):
         name='resource',
         command=ctx.builtin_command('resource', '${out} ${in}'),
         description='RESOURCE ${in}'))
+    ctx.emit_rule(NinjaRule(
+        name='resource_incbin',
+        command=ctx.builtin_command('resource', '--incbin=1 ${out} ${in}'),
+        description='RESOURCE ${in}'))
 
 
 rule_registry.register_rule_provider(
@@ -51,8 +51,12 @@ class RuleContext:
         """Emit one raw line into the ninja header buffer."""
         self.generator._add_line(line)
 
+    def memory_pool(self, name, kind, depth=0):
+        """Declare a ninja pool sized by the memory estimate of `kind`, see the generator."""
+        return self.generator.memory_pool(name, kind, depth)
+
     def emit_rule(self, rule: NinjaRule):
         """Emit a NinjaRule into the ninja header buffer."""
         self.generator._record_rule_name(rule.name)
-        for line in rule.emit():
+        for line in self.generator.cacheable_rule(rule).emit():
             self.generator._add_line(line)
@@ -0,0 +1,262 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Staging of the runfiles dir of a binary or a test.
+
+The runfiles dir used to be removed and the testdata copied into it again on
+every run, which dominates the run time of tests with big fixtures. Instead,
+the wanted entries are described as a dict of
+
+    {path relative to the runfiles dir: (kind, source path)}
+
+where the kind is one of:
+
+* `LINK`: a symlink to the source, or a copy where symlinks don't work.
+* `FILE`: a writable file with the content and the mode of the source, a
+  reflink (copy on write clone) of the source where the file system can,
+  or a copy.
+* `READONLY_FILE`: a read-only file with the content of the source, staged
+  as cheaply as the file system allows: a hardlink to a read-only object
+  with the same content and executable bit in a content addressed store in
+  the build dir, or else a reflink or a copy.
+* `DIR`: an empty dir, the source is not used.
+
+Staging an existing runfiles dir only touches what differs: entries which
+already match are kept, and anything else in the dir, such as the files the
+last run of the test wrote, is removed.
+
+A test which writes a read-only file in place anyway, such as one running as
+root, would change the shared store object through a hardlink, so the store
+objects are checked against their digests before being linked again. The
+`copy` staging mode always copies, for tests which can't live with that.
+"""
+
+
+import errno
+import os
+import shutil
+import sys
+import threading
+
+from blade import console
+
+
+LINK = 'link'
+FILE = 'file'
+READONLY_FILE = 'readonly_file'
+DIR = 'dir'
+
+# From linux/fs.h
+_FICLONE = 0x40049409
+
+# Errors of the file systems which can't reflink or hardlink the file
+_UNSUPPORTED_ERRORS = frozenset([errno.EOPNOTSUPP, errno.ENOTTY, errno.EXDEV, errno.EINVAL,
+                                 errno.EPERM, errno.EMLINK, errno.ENOSYS, errno.EBADF])
+
+
+def _same_file_stat(st, src_st):
+    return st.st_size == src_st.st_size and st.st_mtime_ns == src_st.st_mtime_ns
+
+
+def _executable(st):
+    return bool(st.st_mode & 0o111)
+
+
+def _make_readonly(path, executable):
+    os.chmod(path, 0o555 if executable else 0o444)
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    else:
+        os.remove(path)
+
+
+class RunfilesStager:
+    """Stage runfiles dirs incrementally, see the module docstring."""
+
+    def __init__(self, store_dir, file_digests, mode='auto'):
+        """`mode` is `auto` to reflink or hardlink files when possible, or `copy`."""
+        self.store_dir = store_dir
+        self.file_digests = file_digests
+        self.mode = mode
+        self.reflink_unsupported_devices = set()
+
+    def stage(self, runfiles_dir, entries):
+        """Make the runfiles dir hold exactly the entries, return the number staged."""
+        if not os.path.isdir(runfiles_dir) or os.path.islink(runfiles_dir):
+            if os.path.lexists(runfiles_dir):
+                _remove(runfiles_dir)
+            os.makedirs(runfiles_dir)
+        self._remove_stale(runfiles_dir, entries)
+        staged = 0
+        for dest, (kind, src) in sorted(entries.items()):
+            path = os.path.join(runfiles_dir, dest)
+            if self._matches(path, kind, src):
+                continue
+            if os.path.lexists(path):
+                _remove(path)
+            parent = os.path.dirname(path)
+            if not os.path.isdir(parent):
+                os.makedirs(parent)
+            if kind == LINK:
+                self._link(src, path)
+            elif kind == FILE:
+                self._stage_file(src, path)
+            elif kind == READONLY_FILE:
+                self._stage_readonly_file(src, path)
+            else:
+                os.mkdir(path)
+            staged += 1
+        return staged
+
+    @staticmethod
+    def _remove_stale(runfiles_dir, entries):
+        """Remove everything in the runfiles dir which is not an entry or a parent of one."""
+        parents = set()
+        for dest, (kind, _) in entries.items():
+            if kind == DIR:
+                parents.add(dest)
+            dest = os.path.dirname(dest)
+            while dest and dest not in parents:
+                parents.add(dest)
+                dest = os.path.dirname(dest)
+        for root, dirs, files in os.walk(runfiles_dir):
+            rel_root = os.path.relpath(root, runfiles_dir)
+            for name in list(dirs):
+                rel_path = os.path.normpath(os.path.join(rel_root, name))
+                path = os.path.join(root, name)
+                if rel_path in parents and not os.path.islink(path):
+                    continue
+                # Symlinks to dirs are listed here, and are never descended into
+                dirs.remove(name)
+                if rel_path not in entries:
+                    _remove(path)
+            for name in files:
+                if os.path.normpath(os.path.join(rel_root, name)) not in entries:
+                    os.remove(os.path.join(root, name))
+
+    def _matches(self, path, kind, src):
+        """Whether the existing path is already the staged entry."""
+        try:
+            st = os.lstat(path)
+        except OSError:
+            return False
+        if kind == DIR:
+            return os.path.isdir(path) and not os.path.islink(path)
+        if os.path.islink(path):
+            return kind == LINK and os.readlink(path) == src
+        if not os.path.isfile(path):
+            return False
+        src_st = os.stat(src)
+        if kind == LINK:
+            return _same_file_stat(st, src_st)  # Copied where symlinks don't work
+        if kind == FILE:
+            return _same_file_stat(st, src_st) and (st.st_mode & 0o777) == (src_st.st_mode & 0o777)
+        if _executable(st) != _executable(src_st) or st.st_mode & 0o222:
+            return False
+        if _same_file_stat(st, src_st):
+            return True
+        if self.mode != 'copy':
+            # A hardlink to a store object copied from another source with the same content
+            object_path = self._store_path(self.file_digests.digest(src), _executable(src_st))
+            try:
+                object_st = os.stat(object_path)
+            except OSError:
+                return False
+            return (st.st_ino, st.st_dev) == (object_st.st_ino, object_st.st_dev) and (
+                   self._valid_store_object(object_path))
+        return False
+
+    @staticmethod
+    def _link(src, dst):
+        try:
+            os.symlink(src, dst, target_is_directory=os.path.isdir(src))
+        except OSError:
+            if os.path.isdir(src):
+                shutil.copytree(src, dst)
+            else:
+                shutil.copy2(src, dst)
+
+    def _stage_file(self, src, dst):
+        if self.mode != 'copy' and self._reflink(src, dst):
+            return
+        shutil.copy2(src, dst)
+
+    def _stage_readonly_file(self, src, dst):
+        if self.mode != 'copy' and self._hardlink_from_store(src, dst):
+            return
+        self._stage_file(src, dst)
+        _make_readonly(dst, _executable(os.stat(src)))
+
+    def _reflink(self, src, dst):
+        """Clone the file by copy on write, if the file system can."""
+        if not sys.platform.startswith('linux'):
+            return False
+        device = os.stat(src).st_dev
+        if device in self.reflink_unsupported_devices:
+            return False
+        import fcntl  # pylint: disable=import-outside-toplevel
+        try:
+            with open(src, 'rb') as src_file, open(dst, 'wb') as dst_file:
+                fcntl.ioctl(dst_file.fileno(), _FICLONE, src_file.fileno())
+        except OSError as e:
+            if os.path.lexists(dst):
+                os.remove(dst)
+            if e.errno not in _UNSUPPORTED_ERRORS:
+                raise
+            self.reflink_unsupported_devices.add(device)
+            return False
+        shutil.copystat(src, dst)
+        return True
+
+    def _store_path(self, digest, executable):
+        """The store object of the content, the executable ones are apart as a hardlink shares the mode."""
+        return os.path.join(self.store_dir, digest[:2], digest + ('.x' if executable else ''))
+
+    def _valid_store_object(self, path):
+        """Whether a store object still has the content its name says."""
+        try:
+            return self.file_digests.digest(path) == os.path.basename(path).split('.')[0]
+        except OSError:
+            return False
+
+    def _hardlink_from_store(self, src, dst):
+        """Hardlink the file to the store object with the same content and executable bit."""
+        digest = self.file_digests.digest(src)
+        executable = _executable(os.stat(src))
+        object_path = self._store_path(digest, executable)
+        if not os.path.isfile(object_path) or not self._valid_store_object(object_path):
+            self._add_store_object(src, digest, executable, object_path)
+        try:
+            os.link(object_path, dst)
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_ERRORS:
+                raise
+            console.debug('Failed to hardlink %s: %s' % (object_path, e))
+            return False
+        return True
+
+    def prune(self):
+        """Remove the store objects which no runfiles dir links to any more."""
+        if not os.path.isdir(self.store_dir):
+            return
+        for root, _, files in os.walk(self.store_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if os.stat(path).st_nlink == 1:
+                        os.remove(path)
+                except OSError:
+                    pass
+
+    def _add_store_object(self, src, digest, executable, object_path):
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        # Unique for the concurrent staging threads
+        tmp_path = '%s.%d.%d.tmp' % (object_path, os.getpid(), threading.get_ident())
+        shutil.copy2(src, tmp_path)
+        _make_readonly(tmp_path, executable)
+        os.replace(tmp_path, object_path)
+        self.file_digests.remember(object_path, digest)
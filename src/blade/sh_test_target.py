@@ -42,6 +42,11 @@ class ShellTest(Target):
                  visibility: StrOrListOpt,
                  tags: StrOrListOpt,
                  testdata: StrOrListOpt,
+                 shard_count: int,
+                 readonly_testdata: bool,
+                 test_cpu: int,
+                 test_memory: int | str,
+                 test_lock: str,
                  kwargs: dict[str, object]):
         srcs = var_to_list(srcs)
         deps = var_to_list(deps)
@@ -61,6 +66,9 @@ class ShellTest(Target):
 
         self._add_tags('lang:sh', 'type:test')
         self._process_test_data(testdata)
+        self._set_shard_count(shard_count)
+        self.attr['readonly_testdata'] = readonly_testdata
+        self._set_test_resources(test_cpu, test_memory, test_lock)
 
     def _process_test_data(self, testdata):
         """
@@ -112,6 +120,11 @@ def sh_test(name: str,
             visibility: StrOrListOpt = None,
             tags: StrOrListOpt = None,
             testdata: StrOrListOpt = None,
+            shard_count: int = 0,
+            readonly_testdata: bool = False,
+            test_cpu: int = 1,
+            test_memory: int | str = 0,
+            test_lock: str = '',
             **kwargs: object):
     build_manager.instance.register_target(ShellTest(
             name=name,
@@ -120,6 +133,11 @@ def sh_test(name: str,
             visibility=visibility,
             tags=[],
             testdata=testdata,
+            shard_count=shard_count,
+            readonly_testdata=readonly_testdata,
+            test_cpu=test_cpu,
+            test_memory=test_memory,
+            test_lock=test_lock,
             kwargs=kwargs))
 
 
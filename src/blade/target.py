@@ -10,9 +10,11 @@ This is the target module which is the super class of all of the targets.
 """
 
 
+import math
 import os
 import re
 
+from blade import action_cache
 from blade import config
 from blade import console
 from blade import target_pattern
@@ -122,6 +124,24 @@ def _parse_target(dep):
 _parse_target_cache: dict[str, tuple] = {}
 
 
+_MEMORY_SIZE_UNITS = {'K': 1.0 / 1024, 'M': 1, 'G': 1024, 'T': 1024 * 1024}
+
+
+def _parse_memory_size(size):
+    """Parse a memory size, a number of MiB or a string such as "512M", into MiB.
+
+    Return None if it is invalid.
+    """
+    if isinstance(size, int) and not isinstance(size, bool):
+        return size if size >= 0 else None
+    if not isinstance(size, str):
+        return None
+    match = re.match(r'^\s*(\d+(?:\.\d+)?)\s*([KMGT])i?B?\s*$', size, re.IGNORECASE)
+    if not match:
+        return None
+    return int(math.ceil(float(match.group(1)) * _MEMORY_SIZE_UNITS[match.group(2).upper()]))
+
+
 class Target:
     """Abstract target class.
 
@@ -338,6 +358,30 @@ class Target:
         if kwargs:
             self.error('Unrecognized options %s' % kwargs)
 
+    def _set_shard_count(self, shard_count):
+        """Set the number of shards a test is split into, 0 to decide automatically."""
+        if not isinstance(shard_count, int) or isinstance(shard_count, bool) or shard_count < 0:
+            self.error('"shard_count" must be a non-negative integer, got %r' % (shard_count,))
+            shard_count = 0
+        self.attr['shard_count'] = shard_count
+
+    def _set_test_resources(self, test_cpu, test_memory, test_lock):
+        """Set the cores, memory (in MiB) and the named lock a test holds while running."""
+        if not isinstance(test_cpu, int) or isinstance(test_cpu, bool) or test_cpu < 1:
+            self.error('"test_cpu" must be a positive integer, got %r' % (test_cpu,))
+            test_cpu = 1
+        memory = _parse_memory_size(test_memory)
+        if memory is None:
+            self.error('"test_memory" must be a number of MiB or a size such as "512M" or "4G", '
+                       'got %r' % (test_memory,))
+            memory = 0
+        if not isinstance(test_lock, str):
+            self.error('"test_lock" must be a string, got %r' % (test_lock,))
+            test_lock = ''
+        self.attr['test_cpu'] = test_cpu
+        self.attr['test_memory'] = memory
+        self.attr['test_lock'] = test_lock
+
     def _allow_duplicate_source(self):
         """Whether the target allows duplicate source file with other targets"""
         return False
@@ -858,6 +902,10 @@ class Target:
         if clean:
             self._remove_on_clean(*clean)
 
+        if action_cache.cached_rule(rule):
+            variables = dict(variables or {})
+            variables.update(action_cache.edge_variables(
+                    outputs, implicit_outputs, var_to_list(implicit_deps)))
         if variables:
             assert isinstance(variables, dict)
             for name, v in variables.items():
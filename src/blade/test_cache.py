@@ -0,0 +1,154 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+Content addressed cache of test results.
+
+Incremental testing decides whether to run a test from the mtimes of its
+files, so a clean build or another checkout runs every test again. The cache
+is keyed by the content of what a test runs instead: its binary and dynamic
+libraries, its testdata, the related environments and the arguments. A test
+whose key is found in the cache is reported with the cached result without
+running it.
+
+The cache is a directory which several workspaces on the host can share:
+
+    <cache_dir>/<key[:2]>/<key>/result.json
+    <cache_dir>/<key[:2]>/<key>/blade-test.log
+
+Entries are written to a temporary directory and renamed into place, so a
+reader never sees a partial one. A hit touches the entry, and when the cache
+grows over its size limit, the least recently used entries are removed.
+"""
+
+
+import hashlib
+import json
+import os
+import shutil
+import time
+
+from blade import console
+from blade.test_scheduler import TestRunResult
+
+
+_RESULT_FILE = 'result.json'
+_LOG_FILE = 'blade-test.log'
+_TMP_DIR = 'tmp'
+
+
+class TestResultCache:
+    """A test result cache directory."""
+
+    def __init__(self, cache_dir, max_size, file_digests):
+        """`max_size` is in bytes, `file_digests` is a `FileDigests`."""
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.file_digests = file_digests
+        self.hits = self.puts = 0
+
+    def _update_path(self, h, path):
+        """Hash a file, or every file under a dir, with their relative paths."""
+        if not os.path.isdir(path):
+            h.update(b'f %s\n' % self.file_digests.digest(path).encode())
+            return
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                full_path = os.path.join(root, name)
+                if os.path.isfile(full_path):
+                    rel_path = os.path.relpath(full_path, path)
+                    h.update(b'f %s %s\n' % (rel_path.encode(),
+                                             self.file_digests.digest(full_path).encode()))
+
+    def key(self, name, files, data_files, extra):
+        """Return the cache key of a test.
+
+        `files` and `data_files` are the paths of its binaries and testdata,
+        `extra` is any json serializable data which also affects the result.
+        """
+        h = hashlib.sha256()
+        h.update(json.dumps([name, extra], sort_keys=True).encode())
+        for path in sorted(files) + [None] + sorted(data_files):
+            if path is None:
+                h.update(b'--\n')
+            elif os.path.exists(path):
+                h.update(b'p %s\n' % os.path.basename(path).encode())
+                self._update_path(h, path)
+        return h.hexdigest()
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        """Return (TestRunResult, log path) of a passed test, or None."""
+        entry_dir = self._entry_dir(key)
+        try:
+            with open(os.path.join(entry_dir, _RESULT_FILE)) as f:
+                result = json.load(f)
+            if result['exit_code'] != 0:
+                return None
+            os.utime(entry_dir)  # For LRU
+        except (OSError, ValueError, KeyError):
+            return None
+        self.hits += 1
+        run_result = TestRunResult(exit_code=0, start_time=time.time(),
+                                   cost_time=result['cost_time'])
+        return run_result, os.path.join(entry_dir, _LOG_FILE)
+
+    def put(self, key, run_result, logs):
+        """Store the result of a test and the concatenation of its logs."""
+        entry_dir = self._entry_dir(key)
+        if os.path.exists(entry_dir):
+            return
+        tmp_dir = os.path.join(self.cache_dir, _TMP_DIR, '%s.%d' % (key, os.getpid()))
+        try:
+            os.makedirs(tmp_dir)
+            with open(os.path.join(tmp_dir, _RESULT_FILE), 'w') as f:
+                # The resource usage is of no use for a result which is not run
+                json.dump({'exit_code': run_result.exit_code, 'start_time': run_result.start_time,
+                           'cost_time': run_result.cost_time}, f)
+            with open(os.path.join(tmp_dir, _LOG_FILE), 'wb') as f:
+                for log in logs:
+                    with open(log, 'rb') as log_file:
+                        shutil.copyfileobj(log_file, f)
+            os.makedirs(os.path.dirname(entry_dir), exist_ok=True)
+            os.rename(tmp_dir, entry_dir)
+            self.puts += 1
+        except OSError as e:
+            # Also when another workspace stored the same entry meanwhile.
+            console.debug('Failed to store test result %s: %s' % (key, e))
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def _entries(self):
+        """Return [(atime, size, path)] of all entries."""
+        entries = []
+        for prefix in os.listdir(self.cache_dir):
+            prefix_dir = os.path.join(self.cache_dir, prefix)
+            if prefix == _TMP_DIR or not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                entry_dir = os.path.join(prefix_dir, key)
+                try:
+                    size = sum(os.path.getsize(os.path.join(entry_dir, name))
+                               for name in os.listdir(entry_dir))
+                    entries.append((os.path.getmtime(entry_dir), size, entry_dir))
+                except OSError:
+                    continue
+        return entries
+
+    def evict(self):
+        """Remove the least recently used entries over the size limit."""
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = sorted(self._entries(), reverse=True)
+        total = 0
+        for _, size, entry_dir in entries:
+            total += size
+            if total > self.max_size:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+
+    def close(self):
+        """Evict if anything was stored."""
+        if self.puts:
+            self.evict()
@@ -0,0 +1,228 @@
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+
+"""
+The test history, which incremental testing is based on.
+
+It is kept in a SQLite database in the build dir, one row per test, so that
+loading it is a single query, saving it only writes the rows of the tests
+which ran, and the slowest or flakiest tests can be queried directly.
+
+Besides the last result and its resource usage, each row counts the runs
+of the test and the flips between passing and failing, which is what makes
+a test flaky.
+
+The history used to be a `repr` of a dict evaluated back on load. Such a
+file is migrated on first use, then removed.
+"""
+
+
+import json
+import os
+import sqlite3
+from collections import namedtuple
+from typing import Optional
+
+from blade import console
+from blade.test_scheduler import TestRunResult
+
+
+TestJob = namedtuple('TestJob',
+                     ['reason', 'binary_md5', 'testdata_md5', 'env_md5', 'args'])
+TestHistoryItem = namedtuple('TestHistoryItem', [
+    'job',  # TestJob
+    'first_fail_time',
+    'fail_count',
+    'result',  # TestRunResult
+])
+
+# Bump it when the schema changes, and add the new columns to
+# `_ADDED_COLUMNS` to upgrade an older history in place.
+_SCHEMA_VERSION = 2
+
+# {schema version: [the column definitions it added]}
+_ADDED_COLUMNS = {
+    2: [
+        'max_rss INTEGER NOT NULL DEFAULT 0',
+        'user_time REAL NOT NULL DEFAULT 0',
+        'system_time REAL NOT NULL DEFAULT 0',
+        'read_blocks INTEGER NOT NULL DEFAULT 0',
+        'write_blocks INTEGER NOT NULL DEFAULT 0',
+    ],
+}
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tests (
+    key TEXT PRIMARY KEY,
+    reason TEXT,
+    binary_md5 TEXT,
+    testdata_md5 TEXT,
+    env_md5 TEXT,
+    args TEXT,
+    first_fail_time REAL,
+    fail_count INTEGER,
+    exit_code INTEGER,
+    start_time REAL,
+    cost_time REAL,
+    run_count INTEGER NOT NULL DEFAULT 0,
+    flip_count INTEGER NOT NULL DEFAULT 0,
+    max_rss INTEGER NOT NULL DEFAULT 0,
+    user_time REAL NOT NULL DEFAULT 0,
+    system_time REAL NOT NULL DEFAULT 0,
+    read_blocks INTEGER NOT NULL DEFAULT 0,
+    write_blocks INTEGER NOT NULL DEFAULT 0
+);
+'''
+
+_COLUMNS = ('key, reason, binary_md5, testdata_md5, env_md5, args, '
+            'first_fail_time, fail_count, exit_code, start_time, cost_time, '
+            'max_rss, user_time, system_time, read_blocks, write_blocks')
+
+# A test flips when it passes after failing, or the other way around.
+_UPSERT = f'''
+INSERT INTO tests ({_COLUMNS}, run_count)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1)
+ON CONFLICT(key) DO UPDATE SET
+    reason = excluded.reason,
+    binary_md5 = excluded.binary_md5,
+    testdata_md5 = excluded.testdata_md5,
+    env_md5 = excluded.env_md5,
+    args = excluded.args,
+    first_fail_time = excluded.first_fail_time,
+    fail_count = excluded.fail_count,
+    exit_code = excluded.exit_code,
+    start_time = excluded.start_time,
+    cost_time = excluded.cost_time,
+    max_rss = excluded.max_rss,
+    user_time = excluded.user_time,
+    system_time = excluded.system_time,
+    read_blocks = excluded.read_blocks,
+    write_blocks = excluded.write_blocks,
+    run_count = run_count + 1,
+    flip_count = flip_count + ((exit_code = 0) != (excluded.exit_code = 0))
+'''
+
+
+class TestHistory:
+    """The test history database of a build dir."""
+
+    def __init__(self, path, legacy_path: Optional[str] = None):
+        self.path = path
+        self.legacy_path = legacy_path
+        self.db: Optional[sqlite3.Connection] = None
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=60)
+        version = db.execute('PRAGMA user_version').fetchone()[0]
+        if version > _SCHEMA_VERSION:
+            db.close()
+            raise sqlite3.DatabaseError('Unsupported test history version %d' % version)
+        db.executescript(_SCHEMA)
+        if version:
+            for added_version in range(version + 1, _SCHEMA_VERSION + 1):
+                for column in _ADDED_COLUMNS[added_version]:
+                    db.execute('ALTER TABLE tests ADD COLUMN ' + column)
+        db.execute('PRAGMA user_version = %d' % _SCHEMA_VERSION)
+        db.commit()
+        return db
+
+    def load(self):
+        """Return (items, env) of the history, empty ones if there is none."""
+        is_new = not os.path.exists(self.path)
+        try:
+            self.db = self._connect()
+            items, env = self._load()
+        except sqlite3.DatabaseError as e:
+            console.debug('Exception when loading test history: %s' % e)
+            console.warning('Error loading incremental test history, will run full test')
+            self._recreate()
+            return {}, {}
+        if is_new and self.legacy_path and os.path.exists(self.legacy_path):
+            items, env = self._migrate_legacy(self.legacy_path)
+        return items, env
+
+    def _recreate(self):
+        if self.db is not None:
+            self.db.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        self.db = self._connect()
+
+    def _load(self):
+        assert self.db is not None
+        items = {}
+        for row in self.db.execute(f'SELECT {_COLUMNS} FROM tests'):
+            key = row[0]
+            items[key] = TestHistoryItem(
+                job=TestJob(reason=row[1], binary_md5=row[2], testdata_md5=row[3],
+                            env_md5=row[4], args=json.loads(row[5])),
+                first_fail_time=row[6],
+                fail_count=row[7],
+                result=TestRunResult(*row[8:]))
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'env'").fetchone()
+        env = json.loads(row[0]) if row else {}
+        return items, env
+
+    def _migrate_legacy(self, legacy_path):
+        """Import the history of the old `repr` format."""
+        items, env = {}, {}
+        with open(legacy_path) as f:
+            try:
+                # pylint: disable=eval-used
+                history = eval(f.read(), {'TestRunResult': TestRunResult, 'TestJob': TestJob,
+                                          'TestHistoryItem': TestHistoryItem})
+                items, env = history.get('items', {}), history.get('env', {})
+            except (SyntaxError, NameError, TypeError, AttributeError) as e:
+                console.debug('Exception when migrating test history: %s' % e)
+        self.save(env, items)
+        os.remove(legacy_path)
+        return items, env
+
+    def save(self, env, items):
+        """Save the environments and the history items of the tests which ran."""
+        rows = [(key, item.job.reason, item.job.binary_md5, item.job.testdata_md5,
+                 item.job.env_md5, json.dumps(list(item.job.args)),
+                 item.first_fail_time, item.fail_count, item.result.exit_code,
+                 *item.result[1:])
+                for key, item in items.items()]
+        assert self.db is not None
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('env', ?)",
+                            (json.dumps(env, sort_keys=True),))
+            self.db.executemany(_UPSERT, rows)
+
+    def slower_than(self, seconds, since: float = 0.0):
+        """Return [(cost_time, key)] of the tests run since `since`, slower than `seconds`."""
+        return self.db.execute(
+            'SELECT cost_time, key FROM tests WHERE cost_time > ? AND start_time >= ? '
+            'ORDER BY cost_time DESC, key', (seconds, since)).fetchall()
+
+    def slowest(self, limit):
+        """Return [(cost_time, key)] of the `limit` slowest tests."""
+        return self.db.execute(
+            'SELECT cost_time, key FROM tests ORDER BY cost_time DESC, key LIMIT ?',
+            (limit,)).fetchall()
+
+    def most_memory(self, limit):
+        """Return [(max_rss, key)] of the `limit` tests with the highest peak RSS in KiB."""
+        return self.db.execute(
+            'SELECT max_rss, key FROM tests WHERE max_rss > 0 ORDER BY max_rss DESC, key LIMIT ?',
+            (limit,)).fetchall()
+
+    def flakiest(self, limit):
+        """Return [(flip_count, run_count, key)] of the `limit` tests which flipped most."""
+        return self.db.execute(
+            'SELECT flip_count, run_count, key FROM tests WHERE flip_count > 0 '
+            'ORDER BY flip_count * 1.0 / run_count DESC, flip_count DESC, key LIMIT ?',
+            (limit,)).fetchall()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
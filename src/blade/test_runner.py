@@ -13,39 +13,42 @@ This module executes the test programs.
 """
 
 
+import concurrent.futures
 import datetime
 import json
+import math
 import os
 import re
+import shutil
 import time
-from collections import namedtuple
 
 from blade import binary_runner
 from blade import config
 from blade import console
 from blade import coverage
+from blade import ninja_runner
 from blade import sanitizer
 from blade import target_pattern
+from blade.test_cache import TestResultCache
+from blade.test_history import TestHistory, TestHistoryItem, TestJob
 from blade.test_scheduler import TestScheduler  # lgtm[py/cyclic-import]
-# pylint: disable=unused-import
-from blade.test_scheduler import TestRunResult  # Used by eval
 from blade.util import environ_add_path
 from blade.util import md5sum
 
 
-# Used by eval when loading test history
-_TEST_HISTORY_FILE = '.blade.test.stamp'
+_TEST_HISTORY_FILE = '.blade.test.db'
+_LEGACY_TEST_HISTORY_FILE = '.blade.test.stamp'
 _TEST_EXPIRE_TIME = 86400  # 1 day
+# Number of tests shown in the flakiest tests list
+_FLAKY_TESTS_SHOWN = 10
+# Number of tests shown in the most memory using tests list
+_MEMORY_HUNGRY_TESTS_SHOWN = 10
 
-
-TestJob = namedtuple('TestJob',
-                     ['reason', 'binary_md5', 'testdata_md5', 'env_md5', 'args'])
-TestHistoryItem = namedtuple('TestHistoryItem', [
-    'job',  # TestJob
-    'first_fail_time',
-    'fail_count',
-    'result',  # TestRunResult
-])
+# Tests whose executable, or the files it wraps, and testdata is all they run, see `_lookup_test_cache`
+_CACHEABLE_TEST_TYPES = frozenset(['cc_test', 'go_test', 'py_test', 'sh_test'])
+# Reasons to run a test for which a cached result is good enough
+_CACHEABLE_RUN_REASONS = frozenset(['NO_HISTORY', 'STALE', 'BINARY', 'TESTDATA',
+                                    'ENVIRONMENT', 'ARGUMENT'])
 
 
 def _filter_envs(names):
@@ -65,6 +68,13 @@ def _diff_env(a, b):
     return dict(seta - setb), dict(setb - seta)
 
 
+def _format_usage(result):
+    """Format the resource usage of a TestRunResult."""
+    return (f'{result.max_rss / 1024:.1f} MiB peak RSS, {result.user_time:.4g}s user, '
+            f'{result.system_time:.4g}s sys, {result.read_blocks} blocks in, '
+            f'{result.write_blocks} blocks out')
+
+
 class TestRunner(binary_runner.BinaryRunner):
     """Run specified tests and collect the results"""
     def __init__(
@@ -99,24 +109,28 @@ class TestRunner(binary_runner.BinaryRunner):
         # Test history is the key to implement incremental test.
         # It will be loaded from file before test, compared with test jobs,
         # and be updated and saved to file back after test.
-        self.test_history_file = os.path.join(self.build_dir, _TEST_HISTORY_FILE)
+        self.test_history_db = TestHistory(
+                os.path.join(self.build_dir, _TEST_HISTORY_FILE),
+                os.path.join(self.build_dir, _LEGACY_TEST_HISTORY_FILE))
         self.test_history = {}  # {key, dict{}}
+        self.start_time = time.time()
 
         self._load_test_history()
         self._update_test_history()
 
+        self.test_cache = None
+        cache_dir = config.get_item('global_config', 'test_result_cache_dir')
+        if cache_dir and not options.coverage:
+            self.test_cache = TestResultCache(
+                    os.path.expanduser(cache_dir),
+                    config.get_item('global_config', 'test_result_cache_max_size') << 20,
+                    self.file_digests)
+        self.test_cache_keys = {}  # {key: cache key}
+        self.cached_run_results = {}  # {key: TestRunResult}
+
     def _load_test_history(self):
-        if os.path.exists(self.test_history_file):
-            with open(self.test_history_file) as f:
-                try:
-                    # pylint: disable=eval-used
-                    self.test_history = eval(f.read())
-                except (SyntaxError, NameError, TypeError) as e:
-                    console.debug('Exception when loading test history: %s' % e)
-                    console.warning('Error loading incremental test history, will run full test')
-
-        if 'items' not in self.test_history:
-            self.test_history['items'] = {}
+        items, env = self.test_history_db.load()
+        self.test_history = {'items': items, 'env': env}
 
     def _update_test_history(self):
         old_env = self.test_history.get('env', {})
@@ -134,11 +148,13 @@ class TestRunner(binary_runner.BinaryRunner):
         self.env_md5 = md5sum(str(sorted(new_env.items())))
 
     def _save_test_history(self, passed_run_results, failed_run_results):
-        """update test history and save it to file."""
+        """update test history and save the tests which ran."""
         self._merge_passed_run_results_to_history(passed_run_results)
         self._merge_failed_run_results_to_history(failed_run_results)
-        with open(self.test_history_file, 'w') as f:
-            print(str(self.test_history), file=f)
+        history_items = self.test_history['items']
+        ran_items = {key: history_items[key]
+                     for key in list(passed_run_results) + list(failed_run_results)}
+        self.test_history_db.save(self.test_history['env'], ran_items)
 
     def _save_test_summary(self, passed_run_results, failed_run_results):
         with open('blade-bin/.blade-test-summary.json', 'w') as f:
@@ -199,14 +215,25 @@ class TestRunner(binary_runner.BinaryRunner):
                     fail_count=fail_count,
                     result=run_result)
 
-    def _get_test_target_md5sum(self, target):
-        """Get test target md5sum."""
-        # pylint: disable=too-many-locals
+    def _get_test_related_files(self, target):
+        """Return the files a test runs, and its testdata."""
         related_file_list = []
         related_file_data_list = []
         test_file_name = os.path.abspath(self._executable(target))
         if os.path.exists(test_file_name):
             related_file_list.append(test_file_name)
+        # The executable of a py_test or a sh_test is a wrapper, which doesn't
+        # change with the code it runs
+        if target.type == 'py_test':
+            wrapped = [os.path.join(self.build_dir, target.path, target.name + '.zip')]
+        elif target.type == 'sh_test':
+            wrapped = [os.path.join(target.path, src) for src in target.srcs]
+        else:
+            wrapped = []
+        for path in wrapped:
+            path = os.path.abspath(path)
+            if os.path.exists(path):
+                related_file_list.append(path)
 
         if target.attr.get('dynamic_link'):
             for dep in self._build_targets[target.key].expanded_deps:
@@ -239,6 +266,11 @@ class TestRunner(binary_runner.BinaryRunner):
 
         related_file_list.sort()
         related_file_data_list.sort()
+        return related_file_list, related_file_data_list
+
+    def _get_test_target_md5sum(self, target):
+        """Get test target md5sum."""
+        related_file_list, related_file_data_list = self._get_test_related_files(target)
 
         test_target = []
         test_target_data = []
@@ -260,8 +292,56 @@ class TestRunner(binary_runner.BinaryRunner):
                 return True
         return False
 
+    def _extra_test_data_files(self, target):
+        """Return the sources listed in the `.testdata` file of a test."""
+        testdata = os.path.join(self.build_dir, target.path, '%s.testdata' % target.name)
+        if not os.path.isfile(testdata):
+            return []
+        with open(testdata) as f:
+            return [line.split()[0] for line in f if line.strip()]
+
+    def _test_cache_key(self, target):
+        """Return the key of a test in the test result cache, None if it can't be cached."""
+        if self.test_cache is None or target.type not in _CACHEABLE_TEST_TYPES:
+            return None
+        if target.key not in self.test_cache_keys:
+            files, data_files = self._get_test_related_files(target)
+            extra = {
+                'type': target.type,
+                'testdata': target.attr['testdata'],
+                'env': self.test_history['env'],
+                'args': self.options.args,
+            }
+            self.test_cache_keys[target.key] = self.test_cache.key(
+                    target.key, files, data_files + self._extra_test_data_files(target), extra)
+        return self.test_cache_keys[target.key]
+
+    def _lookup_test_cache(self, target):
+        """Whether a passed result of the test is in the test result cache.
+
+        Only tests whose executable, dynamic libraries and testdata are all
+        they run are cached, the zip of a py_test and the scripts of a sh_test
+        are counted in. A java_test, for example, runs a script which only
+        refers to the jars it needs.
+        """
+        key = self._test_cache_key(target)
+        cached = self.test_cache.get(key) if key else None
+        if not cached:
+            return False
+        run_result, log = cached
+        self.cached_run_results[target.key] = run_result
+        target.info('passed in the test result cache, see %s' % log)
+        return True
+
     def _run_reason(self, target, history, binary_md5, testdata_md5):
         """Return run reason for a given test"""
+        reason = self._changed_reason(target, history, binary_md5, testdata_md5)
+        if reason in _CACHEABLE_RUN_REASONS and self._lookup_test_cache(target):
+            return 'CACHED'
+        return reason
+
+    def _changed_reason(self, target, history, binary_md5, testdata_md5):
+        """Return the reason to run a test by incremental testing"""
 
         if self.options.full_test:
             return 'FULL_TEST'
@@ -296,8 +376,9 @@ class TestRunner(binary_runner.BinaryRunner):
 
         return None
 
-    def _collect_test_jobs(self):
-        """Get incremental test run list."""
+    def _test_targets(self):
+        """Return the tests to consider, the excluded ones are skipped."""
+        targets = []
         for target in self._build_targets.values():
             if not target.type.endswith('_test'):
                 continue
@@ -305,7 +386,12 @@ class TestRunner(binary_runner.BinaryRunner):
                 target.info('is skipped due to --exclude-test')
                 self.excluded_tests.append(target.key)
                 continue
+            targets.append(target)
+        return targets
 
+    def _collect_test_jobs(self, targets):
+        """Get incremental test run list."""
+        for target in targets:
             binary_md5, testdata_md5 = self._get_test_target_md5sum(target)
             history = self.test_history['items'].get(target.key)
             reason = self._run_reason(target, history, binary_md5, testdata_md5)
@@ -323,6 +409,60 @@ class TestRunner(binary_runner.BinaryRunner):
         self.unrepaired_tests.sort(key=lambda x: self.test_history['items'][x].first_fail_time,
                                    reverse=True)
 
+    def _shard_count(self, target):
+        """Return how many shards to split a test into.
+
+        An explicit `shard_count` wins. Otherwise a `cc_test`, whose gtest
+        main is known to honor the sharding protocol, is split when its last
+        run took longer than `global_config.test_shard_time`, into shards of
+        about that time, at most one per test job.
+        """
+        if target.attr.get('exclusive') or self.options.coverage:
+            # Exclusive tests run one at a time anyway, and coverage data
+            # files are per test.
+            return 1
+        count = target.attr.get('shard_count')
+        if count:
+            return count
+        shard_time = config.get_item('global_config', 'test_shard_time')
+        history = self.test_history['items'].get(target.key)
+        if target.type != 'cc_test' or shard_time <= 0 or not history:
+            return 1
+        count = math.ceil(history.result.cost_time / shard_time)
+        return max(1, min(count, self.__test_jobs_num))
+
+    def _shard_jobs(self, target, run_dir, test_env, cmd):
+        """Split a test into jobs running a shard each.
+
+        The shard is passed in both the gtest (``GTEST_*``) and the generic
+        (``TEST_*``) environment variables. Each shard runs in a directory of
+        its own, populated with links to the entries of the runfiles dir, so
+        the logs and files written by the shards don't clash.
+        """
+        total = self._shard_count(target)
+        if total <= 1:
+            return [(target, run_dir, test_env, cmd, None)]
+        jobs = []
+        for index in range(total):
+            shard_dir = '%s.shard%d' % (run_dir, index)
+            shutil.rmtree(shard_dir, ignore_errors=True)
+            os.mkdir(shard_dir)
+            for name in os.listdir(run_dir):
+                src = os.path.abspath(os.path.join(run_dir, name))
+                dst = os.path.join(shard_dir, name)
+                if os.path.isdir(src) and not os.path.islink(src):
+                    try:
+                        os.symlink(src, dst, target_is_directory=True)
+                    except OSError:
+                        shutil.copytree(src, dst, symlinks=True)
+                else:
+                    self._symlink_or_copy_file(src, dst)
+            env = dict(test_env)
+            env['GTEST_TOTAL_SHARDS'] = env['TEST_TOTAL_SHARDS'] = str(total)
+            env['GTEST_SHARD_INDEX'] = env['TEST_SHARD_INDEX'] = str(index)
+            jobs.append((target, shard_dir, env, cmd, (index, total)))
+        return jobs
+
     def _generate_coverage_report(self):
         coverage.JacocoReporter(self.build_dir,
                                 self.target_database,
@@ -398,22 +538,43 @@ class TestRunner(binary_runner.BinaryRunner):
                 prefix=False)
         console.error('You can specify --run-unrepaired-tests to run them', prefix=False)
 
-    def _collect_slow_tests(self, run_results):
-        return [(result.cost_time, key) for key, result in run_results.items()
-                if result.cost_time > self.options.show_tests_slower_than]
-
-    def _show_slow_tests(self, passed_run_results, failed_run_results):
-        slow_tests = (self._collect_slow_tests(passed_run_results) +
-                      self._collect_slow_tests(failed_run_results))
+    def _show_slow_tests(self):
+        """Show the tests of this run which are slower than the threshold, slowest first."""
+        slow_tests = self.test_history_db.slower_than(self.options.show_tests_slower_than,
+                                                      since=self.start_time)
         if slow_tests:
             console.warning('Found %d slow tests:' % len(slow_tests))
-            for cost_time, key in sorted(slow_tests):
-                console.warning(f'  {cost_time:.4g}s\t//{key}', prefix=False)
+            items = self.test_history['items']
+            for cost_time, key in slow_tests:
+                usage = ''
+                if key in items and items[key].result.max_rss:
+                    usage = '\t' + _format_usage(items[key].result)
+                console.warning(f'  {cost_time:.4g}s\t//{key}{usage}', prefix=False)
+
+    def _show_memory_hungry_tests(self):
+        """Show the tests with the highest peak memory in the test history."""
+        tests = self.test_history_db.most_memory(_MEMORY_HUNGRY_TESTS_SHOWN)
+        if tests:
+            console.info('Tests using the most memory in the test history:')
+            for max_rss, key in tests:
+                console.info(f'  //{key}: {max_rss / 1024:.1f} MiB peak RSS', prefix=False)
+
+    def _show_flaky_tests(self):
+        """Show the tests which flipped between passing and failing most often."""
+        flaky_tests = self.test_history_db.flakiest(_FLAKY_TESTS_SHOWN)
+        if flaky_tests:
+            console.info('Flakiest tests in the test history:')
+            for flip_count, run_count, key in flaky_tests:
+                console.info(f'  //{key}: flipped {flip_count} times in {run_count} runs',
+                             prefix=False)
 
     def _show_tests_summary(self, passed_run_results, failed_run_results):
         """Show tests summary."""
         self._show_banner('Testing Summary')
         console.info('%d tests scheduled to run by scheduler.' % (len(self.test_jobs)))
+        if self.cached_run_results:
+            console.info('%d of them passed in the test result cache.' %
+                         len(self.cached_run_results))
         if self.unchanged_tests:
             console.info('Skip %d unchanged tests when doing incremental test.' %
                          len(self.unchanged_tests))
@@ -456,8 +617,10 @@ class TestRunner(binary_runner.BinaryRunner):
             if passed_run_results:
                 console.info('Passed tests:')
                 self._show_run_results(passed_run_results)
+            self._show_flaky_tests()
+            self._show_memory_hungry_tests()
         if self.options.show_tests_slower_than is not None:
-            self._show_slow_tests(passed_run_results, failed_run_results)
+            self._show_slow_tests()
         if failed_run_results:  # Always show details of failed tests
             console.error('Failed tests:')
             self._show_run_results(failed_run_results, is_error=True)
@@ -467,13 +630,33 @@ class TestRunner(binary_runner.BinaryRunner):
 
         self._show_tests_summary(passed_run_results, failed_run_results)
 
-    def run(self):
-        """Run all the test target programs."""
-        self._collect_test_jobs()
+    def _prepare_envs(self, targets):
+        """Prepare the running environments of the tests, staging their runfiles in parallel."""
+        with concurrent.futures.ThreadPoolExecutor(max(1, self.__test_jobs_num)) as executor:
+            return dict(zip([target.key for target in targets],
+                            executor.map(self._prepare_env, targets)))
+
+    def _update_test_cache(self, tests_run_list, passed_run_results):
+        """Store the results of the tests which passed in this run."""
+        run_dirs = {}  # {key: [run dir of each shard]}
+        for target, run_dir, _, _, _ in tests_run_list:
+            run_dirs.setdefault(target.key, []).append(run_dir)
+        for key, run_result in passed_run_results.items():
+            cache_key = self.test_cache_keys.get(key)
+            if not cache_key or key not in run_dirs:
+                continue
+            logs = [os.path.join(run_dir, 'blade-test.log') for run_dir in run_dirs[key]]
+            self.test_cache.put(cache_key, run_result, [log for log in logs if os.path.isfile(log)])
+        self.test_cache.close()
+
+    def _make_test_run_jobs(self, targets):
+        """Return the jobs to run the tests by the scheduler."""
         tests_run_list = []
-        for target_key in self.test_jobs:
-            target = self.target_database[target_key]
-            test_env = self._prepare_env(target)
+        test_envs = self._prepare_envs(targets)
+        for target in targets:
+            # Hash what the test runs before it runs, to store its result
+            self._test_cache_key(target)
+            test_env = test_envs[target.key]
             cmd = [os.path.abspath(self._executable(target))]
             cmd += self.options.args
             if self.options.coverage and target.type == 'go_test':
@@ -545,26 +728,122 @@ class TestRunner(binary_runner.BinaryRunner):
                     cc = tc.tool('cc') if tc.cc_is('msvc') else ''
                     if cc:
                         environ_add_path(test_env, 'PATH', os.path.dirname(cc))
-            tests_run_list.append((target, self._runfiles_dir(target), test_env, cmd))
+            tests_run_list += self._shard_jobs(target, self._runfiles_dir(target), test_env, cmd)
+        return tests_run_list
 
-        console.notice('%d tests to run' % len(tests_run_list))
-        console.flush()
-        scheduler = TestScheduler(
+    def _new_scheduler(self, tests_run_list):
+        return TestScheduler(
             tests_run_list,
             self.__test_jobs_num,
             test_timeout_multiplier=self.options.test_timeout_multiplier,
+            test_costs={key: item.result.cost_time
+                        for key, item in self.test_history['items'].items()},
         )
+
+    def _jobs_to_run(self, targets):
+        """Decide which of the tests to run, return the jobs to run them."""
+        self._collect_test_jobs(targets)
+        return self._make_test_run_jobs([
+                target for target in targets
+                if target.key in self.test_jobs and target.key not in self.cached_run_results])
+
+    def _pipeline_outputs(self, target):
+        """Return the build outputs which a test waits for in the pipelined mode.
+
+        They are built after everything the test links, and the testdata
+        referred to by locations.
+        """
+        outputs = [self._executable(target)]
+        if target.attr.get('locations'):
+            outputs.append(os.path.join(self.build_dir, target.path, '%s.testdata' % target.name))
+        return set(os.path.normpath(output) for output in outputs)
+
+    def _run_with_build(self, build, scheduler, tests_run_list):
+        """Build, and run each test as soon as the files it runs are rebuilt.
+
+        Tests whose files are not rebuilt, are run when the build succeeds.
+        If it fails, the tests which didn't start are cancelled. Return the
+        exit code of the build.
+        """
+        waiting = {}  # {key: set(outputs)}
+        targets = {}  # {output: [target]}
+        for target in self._test_targets():
+            waiting[target.key] = self._pipeline_outputs(target)
+            for output in waiting[target.key]:
+                targets.setdefault(output, []).append(target)
+        watcher = ninja_runner.NinjaLogWatcher(self.build_dir)
+
+        def run_tests(ready):
+            if ready:
+                jobs = self._jobs_to_run(ready)
+                tests_run_list.extend(jobs)
+                scheduler.add_jobs(jobs)
+
+        def on_progress():
+            ready = []
+            for output in watcher.new_outputs():
+                for target in targets.pop(output, ()):
+                    outputs = waiting.get(target.key)
+                    outputs.discard(output)
+                    if not outputs:
+                        del waiting[target.key]
+                        ready.append(target)
+            run_tests(ready)
+
+        console.notice('Run tests as they are built')
+        scheduler.start()
+        returncode = 1
         try:
-            scheduler.schedule_jobs()
+            returncode = build(on_progress)
+            if returncode == 0:
+                on_progress()
+                run_tests([self.target_database[key] for key in waiting])
+            else:
+                console.error('Build failure, tests which are not started are cancelled')
+            scheduler.finish(cancel=returncode != 0)
+        except KeyboardInterrupt:
+            scheduler.terminate()
+            raise
+        return returncode
+
+    def run(self, build=None):
+        """Run all the test target programs.
+
+        With `build`, the function to build the tests, they run while being built.
+        """
+        tests_run_list = []
+        build_returncode = 0
+        if build is None:
+            tests_run_list = self._jobs_to_run(self._test_targets())
+            console.notice('%d tests to run' % len(tests_run_list))
+            console.flush()
+            scheduler = self._new_scheduler(tests_run_list)
+        else:
+            scheduler = self._new_scheduler([])
+        try:
+            if build is None:
+                scheduler.schedule_jobs()
+            else:
+                build_returncode = self._run_with_build(build, scheduler, tests_run_list)
         except KeyboardInterrupt:
             console.clear_progress_bar()
             console.error('KeyboardInterrupt, all tests stopped')
             console.flush()
+            build_returncode = build_returncode or 1
 
         passed_run_results, failed_run_results = scheduler.get_results()
+        if self.test_cache is not None:
+            self._update_test_cache(tests_run_list, passed_run_results)
+            passed_run_results.update(self.cached_run_results)
         self._save_test_history(passed_run_results, failed_run_results)
         self._save_test_summary(passed_run_results, failed_run_results)
         self._show_tests_result(passed_run_results, failed_run_results)
+        self.test_history_db.close()
+        self.runfiles_stager.prune()
+        self.file_digests.save()
+
+        if build_returncode != 0:
+            return build_returncode
 
         if self.options.coverage:
             self._clean_for_coverage()
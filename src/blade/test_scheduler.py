@@ -7,12 +7,21 @@
 
 """
 This module use threads to run tests concurrently.
+
+Each worker thread blocks on the test process it runs, and picks the next
+job as soon as it exits. Before starting a test, it waits until the cores,
+the memory and the named lock the test declares are free, so the number of
+workers (`-j`) is only a cap on the concurrency. The main thread sleeps until a worker starts a job
+with a timeout or exits, or until the earliest timeout expires, which it
+keeps in a heap, so there is no polling.
 """
 
 
+import heapq
 import os
 import signal
 import subprocess
+import sys
 import threading
 import time
 import traceback
@@ -20,10 +29,58 @@ from collections import namedtuple
 
 import queue
 
-from blade import config
 from blade import console
+from blade.util import available_memory, cpu_count
+
+# The resource usage of a run is from the rusage of the test process and the
+# children it waited for: the peak RSS in KiB, the user and system CPU time
+# in seconds, and the numbers of blocks read and written by the file system.
+TestRunResult = namedtuple(
+        'TestRunResult',
+        ['exit_code', 'start_time', 'cost_time',
+         'max_rss', 'user_time', 'system_time', 'read_blocks', 'write_blocks'],
+        defaults=(0, 0.0, 0.0, 0, 0))
+
+# Predicted run time of a test when there is no history to go by at all.
+_DEFAULT_TEST_COST = 1.0
+
+# Waiting on a lock can't be interrupted by Ctrl-C on Windows, so wake up
+# periodically there to let KeyboardInterrupt through.
+_MAX_WAIT_TIME = 1.0 if os.name == 'nt' else None
 
-TestRunResult = namedtuple('TestRunResult', ['exit_code', 'start_time', 'cost_time'])
+
+def _wait_process(p):
+    """Wait for the process like `p.wait()`, return its rusage, or None if unknown."""
+    if not hasattr(os, 'wait4'):
+        p.wait()
+        return None
+    while True:
+        try:
+            _, status, rusage = os.wait4(p.pid, 0)
+        except InterruptedError:
+            continue
+        except ChildProcessError:
+            # Already reaped by `Popen.poll`, e.g. when being terminated
+            p.wait()
+            return None
+        p.returncode = os.waitstatus_to_exitcode(status)
+        return rusage
+
+
+def _usage_fields(rusage):
+    """Return the TestRunResult fields of the resource usage."""
+    if rusage is None:
+        return {}
+    max_rss = rusage.ru_maxrss
+    if sys.platform == 'darwin':
+        max_rss //= 1024  # In bytes
+    return {
+        'max_rss': max_rss,
+        'user_time': rusage.ru_utime,
+        'system_time': rusage.ru_stime,
+        'read_blocks': rusage.ru_inblock,
+        'write_blocks': rusage.ru_oublock,
+    }
 
 
 def _signal_map():
@@ -47,15 +104,125 @@ def _signal_map():
 _SIGNAL_MAP = _signal_map()
 
 
+class ResourcePool:
+    """The cores, the memory and the named locks shared by concurrent tests.
+
+    A test declares them by its `test_cpu`, `test_memory` (in MiB) and
+    `test_lock` attributes. A test declaring more than the host has is
+    clamped to the host, so that it runs alone rather than never.
+
+    A job taken from the queue whose resources are not free is deferred, and
+    the workers go on with the following jobs meanwhile. A worker runs the
+    first deferred job which fits before taking another from the queue.
+    """
+
+    def __init__(self, cpu, memory):
+        """`memory` is in MiB, 0 if unknown, which doesn't limit it then."""
+        self.cpu = cpu
+        self.memory = memory
+        self.used_cpu = 0
+        self.used_memory = 0
+        self.locks = set()
+        self.cancelled = False
+        self.condition = threading.Condition()
+        self.deferred = []  # The jobs which didn't fit when taken from the queue
+
+    def _demand(self, target):
+        return (min(target.attr.get('test_cpu', 1), self.cpu),
+                min(target.attr.get('test_memory', 0), self.memory),
+                target.attr.get('test_lock'))
+
+    def _available(self, cpu, memory, lock):
+        return (self.used_cpu + cpu <= self.cpu and self.used_memory + memory <= self.memory and
+                not (lock and lock in self.locks))
+
+    def _take(self, target):
+        """Take the resources of the test if they are free, return whether taken."""
+        cpu, memory, lock = self._demand(target)
+        if self.cancelled or not self._available(cpu, memory, lock):
+            return False
+        self.used_cpu += cpu
+        self.used_memory += memory
+        if lock:
+            self.locks.add(lock)
+        return True
+
+    def acquire(self, target):
+        """Wait until the resources of the test are free and take them.
+
+        Return False if the pool is cancelled meanwhile.
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.cancelled or self._take(target))
+            return not self.cancelled
+
+    def try_acquire(self, job):
+        """Take the resources of the job if they are free, or else defer it.
+
+        Return whether they are taken.
+        """
+        with self.condition:
+            if self._take(job[0]):
+                return True
+            if not self.cancelled:
+                self.deferred.append(job)
+            return False
+
+    def take_deferred(self, wait):
+        """Return the first deferred job whose resources are free, having taken them.
+
+        With `wait`, wait for one to fit while any is deferred. Return None if
+        none is, or the pool is cancelled.
+        """
+        with self.condition:
+            while not self.cancelled:
+                for i, job in enumerate(self.deferred):
+                    if self._take(job[0]):
+                        return self.deferred.pop(i)
+                if not wait or not self.deferred:
+                    break
+                self.condition.wait()
+            return None
+
+    def release(self, target):
+        cpu, memory, lock = self._demand(target)
+        with self.condition:
+            self.used_cpu -= cpu
+            self.used_memory -= memory
+            self.locks.discard(lock)
+            self.condition.notify_all()
+
+    def cancel(self):
+        """Wake up and fail the waiting `acquire`s, drop the deferred jobs."""
+        with self.condition:
+            self.cancelled = True
+            self.deferred = []
+            self.condition.notify_all()
+
+
 class WorkerThread(threading.Thread):
-    def __init__(self, index, job_queue, job_handler, redirect):
-        """Init methods for this thread."""
+    def __init__(self, index, job_queue, job_handler, redirect, notify=None, resources=None,
+                 wait_for_jobs=False):
+        """Init methods for this thread.
+
+        `notify(thread)` is called when a job with a timeout starts, and
+        when the thread is about to exit. The resources of each job are
+        taken from the `resources` pool, if any, while it runs.
+
+        The thread exits when the job queue is empty, or with `wait_for_jobs`,
+        when it gets a None job.
+        """
         super().__init__()
         self.index = index
         self.running = True
         self.job_queue = job_queue
         self.job_handler = job_handler
         self.redirect = redirect
+        self.notify = notify
+        self.resources = resources
+        self.wait_for_jobs = wait_for_jobs
+        self.queue_done = False  # No more jobs to take from the queue
+        self.finished = False
         self.job_start_time, self.job_timeout = 0, 0
         self.job_process = None
         self.job_name = ''
@@ -82,19 +249,19 @@ class WorkerThread(threading.Thread):
     def set_job_data(self, p, name, timeout):
         """Set the popen object and name if the job is run in a subprocess."""
         self.job_process, self.job_name, self.job_timeout = p, name, timeout
+        if self.notify and timeout is not None and timeout > 0:
+            self.notify(self)
 
     def check_job_timeout(self, now):
         """Check whether the job is timeout or not.
 
         This method simply checks job timeout and returns immediately.
-        The caller should invoke this method repeatedly so that a job
-        which takes a very long time would be timeout sooner or later.
+        The scheduler invokes it when the timeout of the job expires.
 
         A `job_timeout` of 0 (or any non-positive value) means *unlimited*,
         matching the documented semantics of `global_config.test_timeout`.
-        Without this guard the expression `start_time + 0 < now` is true on
-        every tick after the first second, which would SIGTERM every running
-        test as soon as the scheduler's 1s polling loop wakes up.
+        Without this guard the expression `start_time + 0 < now` is true as
+        soon as the test starts, which would SIGTERM every running test.
         """
         try:
             self.job_lock.acquire()
@@ -108,17 +275,47 @@ class WorkerThread(threading.Thread):
         finally:
             self.job_lock.release()
 
+    def _next_job(self):
+        """Return the next job to run, with its resources taken, or None to exit.
+
+        A job whose resources are not free is deferred to the pool, see
+        `ResourcePool`. When the queue has no more jobs, the deferred ones are
+        waited for.
+        """
+        resources = self.resources
+        while True:
+            if resources is not None:
+                job = resources.take_deferred(wait=False)
+                if job is not None or resources.cancelled:
+                    return job
+            if self.queue_done:
+                job = None
+            elif self.wait_for_jobs:
+                job = self.job_queue.get()
+            else:
+                try:
+                    job = self.job_queue.get_nowait()
+                except queue.Empty:
+                    job = None
+            if job is None:
+                self.queue_done = True
+                return resources.take_deferred(wait=True) if resources is not None else None
+            if resources is None or resources.try_acquire(job):
+                return job
+
     def run(self):
         """executes and runs here."""
         try:
-            job_queue = self.job_queue
-            while not job_queue.empty() and self.running:
+            while self.running:
+                job = self._next_job()
+                if job is None:
+                    break
                 try:
-                    job = job_queue.get_nowait()
-                except queue.Empty:
-                    continue
-                self.job_start_time = time.time()
-                self.job_handler(job, self.redirect, self)
+                    self.job_start_time = time.time()
+                    self.job_handler(job, self.redirect, self)
+                finally:
+                    if self.resources is not None:
+                        self.resources.release(job[0])
                 try:
                     self.job_lock.acquire()
                     self.cleanup_job()
@@ -126,12 +323,17 @@ class WorkerThread(threading.Thread):
                     self.job_lock.release()
         except Exception:
             traceback.print_exc()
+        finally:
+            self.finished = True
+            if self.notify:
+                self.notify(self)
 
 
 class TestScheduler:
     """Schedule specified tests to be ran in multiple test threads"""
 
-    def __init__(self, tests_list, num_jobs, test_timeout_multiplier=1.0):
+    def __init__(self, tests_list, num_jobs, test_timeout_multiplier=1.0, test_costs=None,
+                 resource_pool=None):
         """init method.
 
         ``test_timeout_multiplier`` scales every per-test wall timeout for
@@ -139,10 +341,22 @@ class TestScheduler:
         for adapting to slow CI machines without committing the slowdown
         into config. A multiplier of 0 or non-positive ``test_timeout``
         (the documented "unlimited" sentinel) stays unlimited.
+
+        ``test_costs`` maps test keys to their last run time (the
+        ``cost_time`` of the test history), used to start the slowest tests
+        first.
+
+        The concurrent tests share the ``resource_pool``, which is by default
+        the cores and the available memory of the host. ``num_jobs`` caps
+        the number of tests running at once.
         """
         self.tests_list = tests_list
         self.num_jobs = num_jobs
+        self.resource_pool = resource_pool or ResourcePool(cpu_count(), available_memory())
         self.test_timeout_multiplier = test_timeout_multiplier
+        self.test_costs = test_costs or {}
+        self.predicted_makespan = 0.0
+        self.actual_makespan = 0.0
 
         self.job_queue = queue.Queue(0)
         self.exclusive_job_queue = queue.Queue(0)
@@ -152,9 +366,65 @@ class TestScheduler:
         self.passed_run_results = {}
         self.failed_run_results = {}
 
+        # dict{key, [TestRunResult]}, results of the finished shards
+        self.shard_run_results = {}
+
+        # Set by the workers to wake up the main thread
+        self.worker_event = threading.Event()
+        self.timeout_lock = threading.Lock()
+        # heap[(deadline, sequence, thread, job_start_time)]
+        self.timeouts = []
+        self.timeout_sequence = 0
+
         self.num_of_finished_tests = 0
         self.num_of_running_tests = 0
 
+        # The workers and their waiting thread of `start`
+        self.start_time = 0.0
+        self.threads = []
+        self.waiting_thread = None
+
+    def _predict_costs(self, jobs):
+        """Predict the run time of each job from the test history.
+
+        A test without history is assumed to take the median time of the
+        known tests of the same type, or of all known tests, which is closer
+        than any fixed guess for a suite of mostly similar tests.
+        """
+        known = {}
+        for job in jobs:
+            target = job[0]
+            cost = self.test_costs.get(target.key)
+            if cost is not None:
+                known.setdefault(target.type, []).append(cost)
+        overall = sorted(c for costs in known.values() for c in costs)
+        overall_prior = overall[len(overall) // 2] if overall else _DEFAULT_TEST_COST
+        priors = {kind: sorted(costs)[len(costs) // 2] for kind, costs in known.items()}
+        predicted = {}
+        for job in jobs:
+            target = job[0]
+            cost = self.test_costs.get(target.key)
+            if cost is None:
+                cost = priors.get(target.type, overall_prior)
+            predicted[target.key] = cost
+        return predicted
+
+    @staticmethod
+    def _job_cost(predicted, job):
+        """Return the predicted run time of a job, a shard runs a part of its test."""
+        shard = job[4]
+        return predicted[job[0].key] / (shard[1] if shard else 1)
+
+    @staticmethod
+    def _makespan(costs, num_workers):
+        """Simulate workers pulling `costs` in order, return the wall time."""
+        if not costs or num_workers <= 0:
+            return 0.0
+        finish_times = [0.0] * min(num_workers, len(costs))
+        for cost in costs:
+            heapq.heapreplace(finish_times, finish_times[0] + cost)
+        return max(finish_times)
+
     def _get_workers_num(self):
         """get the number of thread workers."""
         return min(self.job_queue.qsize(), self.num_jobs)
@@ -186,6 +456,12 @@ class TestScheduler:
         if console.is_quiet():
             console.show_progress_bar(self.num_of_finished_tests, len(self.tests_list))
 
+    @staticmethod
+    def _job_name(target, shard):
+        if shard:
+            return '%s [shard %d/%d]' % (target.key, shard[0] + 1, shard[1])
+        return target.key
+
     def _run_job_redirect(self, job, job_thread):
         """run job, redirect output to ``<run_dir>/blade-test.log``, dump on exit.
 
@@ -196,8 +472,8 @@ class TestScheduler:
         are still echoed to the console once the test finishes so the
         scheduler's summary view is unchanged.
         """
-        target, run_dir, test_env, cmd = job
-        test_name = target.key
+        target, run_dir, test_env, cmd, shard = job
+        test_name = self._job_name(target, shard)
         shell = target.attr.get('run_in_shell', False)
         if shell:
             cmd = subprocess.list2cmdline(cmd)
@@ -215,7 +491,7 @@ class TestScheduler:
                                  shell=shell,
                                  universal_newlines=True)
             job_thread.set_job_data(p, test_name, timeout)
-            p.wait()
+            rusage = _wait_process(p)
         with open(log_path, 'r', encoding='utf-8', errors='replace') as log:
             stdout = log.read()
         result = self._get_result(p.returncode)
@@ -226,12 +502,12 @@ class TestScheduler:
             console.info(msg)
             console.flush()
 
-        return p.returncode
+        return p.returncode, rusage
 
     def _run_job(self, job, job_thread):
         """run job, do not redirect the output."""
-        target, run_dir, test_env, cmd = job
-        test_name = target.key
+        target, run_dir, test_env, cmd, shard = job
+        test_name = self._job_name(target, shard)
         shell = target.attr.get('run_in_shell', False)
         if shell:
             cmd = subprocess.list2cmdline(cmd)
@@ -239,29 +515,31 @@ class TestScheduler:
         self._show_progress(cmd)
         p = subprocess.Popen(cmd, env=test_env, cwd=run_dir, close_fds=True, shell=shell)
         job_thread.set_job_data(p, test_name, timeout)
-        p.wait()
+        rusage = _wait_process(p)
         result = self._get_result(p.returncode)
         console.info(f'{self._progress(done=1)} Test //{test_name} finished : {result}\n')
 
-        return p.returncode
+        return p.returncode, rusage
 
     def _process_job(self, job, redirect, job_thread):
         """process routine.
 
-        Each test is a tuple (target, run_dir, env, cmd)
+        Each test is a tuple (target, run_dir, env, cmd, shard), `shard` is
+        None or (index, total) for a shard of a sharded test.
 
         """
-        target = job[0]
+        target, shard = job[0], job[4]
         start_time = time.time()
 
         with self.run_result_lock:
             self.num_of_running_tests += 1
 
+        rusage = None
         try:
             if redirect:
-                returncode = self._run_job_redirect(job, job_thread)
+                returncode, rusage = self._run_job_redirect(job, job_thread)
             else:
-                returncode = self._run_job(job, job_thread)
+                returncode, rusage = self._run_job(job, job_thread)
         except OSError as e:
             target.error('Create test process error: %s' % str(e))
             returncode = 255
@@ -269,48 +547,88 @@ class TestScheduler:
         cost_time = time.time() - start_time
 
         run_result = TestRunResult(exit_code=returncode,
-                                   start_time=start_time, cost_time=cost_time)
+                                   start_time=start_time, cost_time=cost_time,
+                                   **_usage_fields(rusage))
 
         with self.run_result_lock:
-            if returncode == 0:
+            if shard:
+                run_result = self._merge_shard_result(target.key, shard[1], run_result)
+            if run_result is None:  # Other shards are still running
+                pass
+            elif run_result.exit_code == 0:
                 self.passed_run_results[target.key] = run_result
-            elif returncode != -signal.SIGINT:  # Treat Ctrl-C ended as cancelled
+            elif run_result.exit_code != -signal.SIGINT:  # Treat Ctrl-C ended as cancelled
                 self.failed_run_results[target.key] = run_result
             self.num_of_running_tests -= 1
             self.num_of_finished_tests += 1
 
-    def _join_thread(self, t):
-        """Join thread and keep signal awareable"""
-        # The Thread.join without timeout will block signals, which makes
-        # blade can't be terminated by Ctrl-C
-        while t.is_alive():
-            t.join(1)
+    def _merge_shard_result(self, key, total, run_result):
+        """Collect the result of a shard.
+
+        Return the result of the whole test once all of its shards finished,
+        otherwise None. The test fails with the exit code of the first failed
+        shard. Its cost is the sum of the costs of the shards, which is the
+        time it would take unsharded and what the number of shards is
+        computed from, so that it doesn't change from run to run. So are its
+        CPU time and I/O, and its peak RSS is the highest one of the shards.
+        """
+        results = self.shard_run_results.setdefault(key, [])
+        results.append(run_result)
+        if len(results) < total:
+            return None
+        exit_code = next((r.exit_code for r in results if r.exit_code != 0), 0)
+        return TestRunResult(exit_code=exit_code,
+                             start_time=min(r.start_time for r in results),
+                             cost_time=sum(r.cost_time for r in results),
+                             max_rss=max(r.max_rss for r in results),
+                             user_time=sum(r.user_time for r in results),
+                             system_time=sum(r.system_time for r in results),
+                             read_blocks=sum(r.read_blocks for r in results),
+                             write_blocks=sum(r.write_blocks for r in results))
+
+    def _notify(self, thread):
+        """Called by a worker thread when it starts a job with a timeout or exits."""
+        if not thread.finished and thread.job_timeout and thread.job_start_time:
+            with self.timeout_lock:
+                self.timeout_sequence += 1
+                heapq.heappush(self.timeouts, (thread.job_start_time + thread.job_timeout,
+                                               self.timeout_sequence, thread,
+                                               thread.job_start_time))
+        self.worker_event.set()
+
+    def _check_timeouts(self, now):
+        """Terminate the jobs whose timeout expired.
+
+        Return the time to wait until the next timeout expires, or None.
+        """
+        expired = []
+        with self.timeout_lock:
+            while self.timeouts and self.timeouts[0][0] < now:
+                expired.append(heapq.heappop(self.timeouts))
+            wait_time = self.timeouts[0][0] - now if self.timeouts else None
+        for _, _, thread, job_start_time in expired:
+            # Skip it if the thread has moved on to another job since.
+            if thread.job_start_time == job_start_time:
+                thread.check_job_timeout(now)
+        return wait_time
 
     def _wait_worker_threads(self, threads):
-        """Wait for worker threads to complete."""
-        test_timeout = config.get_item('global_config', 'test_timeout')
+        """Wait for worker threads to complete, terminating timed out jobs."""
         try:
-            while threads:
-                time.sleep(1)  # Check every second
-                now = time.time()
-                dead_threads = []
-                for t in threads:
-                    if t.is_alive():
-                        # 0 (or any non-positive value) means "unlimited",
-                        # matching the documented semantics of
-                        # global_config.test_timeout. The inner check in
-                        # check_job_timeout is also guarded, but skipping the
-                        # call here avoids touching the per-thread lock on
-                        # every tick when no timeout is configured.
-                        if test_timeout is not None and test_timeout > 0:
-                            t.check_job_timeout(now)
-                    else:
-                        dead_threads.append(t)
-
-                for dt in dead_threads:
-                    threads.remove(dt)
+            while True:
+                # Clear before checking, a worker exiting meanwhile sets it again.
+                self.worker_event.clear()
+                if all(t.finished for t in threads):
+                    break
+                wait_time = self._check_timeouts(time.time())
+                if _MAX_WAIT_TIME is not None:
+                    wait_time = min(wait_time or _MAX_WAIT_TIME, _MAX_WAIT_TIME)
+                self.worker_event.wait(wait_time)
+            for t in threads:
+                t.join()
         except KeyboardInterrupt:
             console.debug('KeyboardInterrupt: Terminate workers...')
+            self.resource_pool.cancel()
             for t in threads:
                 t.terminate()
             for t in threads:
@@ -318,41 +636,131 @@ class TestScheduler:
             raise
 
     def schedule_jobs(self):
-        """scheduler."""
+        """scheduler.
+
+        Concurrent tests are queued longest first by their predicted run
+        time, so that a slow test is not picked up last and leaves the other
+        workers idle until it finishes. Exclusive tests run alone, after
+        them.
+        """
         if not self.tests_list:
             return
 
+        start_time = time.time()
+        predicted = self._predict_costs(self.tests_list)
+        jobs, exclusive_jobs = [], []
         for i in self.tests_list:
             target = i[0]
             if target.attr.get('exclusive'):
-                self.exclusive_job_queue.put(i)
+                exclusive_jobs.append(i)
             else:
-                self.job_queue.put(i)
+                jobs.append(i)
+        # Sorting is stable, ties keep the original order.
+        jobs.sort(key=lambda job: self._job_cost(predicted, job), reverse=True)
+        for i in jobs:
+            self.job_queue.put(i)
+        for i in exclusive_jobs:
+            self.exclusive_job_queue.put(i)
 
         quiet = console.is_quiet()
 
         num_of_workers = self._get_workers_num()
+        self.predicted_makespan = (
+                self._makespan([self._job_cost(predicted, job) for job in jobs], num_of_workers) +
+                sum(self._job_cost(predicted, job) for job in exclusive_jobs))
         if not self.job_queue.empty():
             console.info('Spawn %d worker thread(s) to run concurrent tests' % num_of_workers)
+            console.debug('Concurrent tests share %d cores and %d MiB memory' % (
+                          self.resource_pool.cpu, self.resource_pool.memory))
 
             redirect = num_of_workers > 1 or quiet
             threads = []
             try:
                 for i in range(num_of_workers):
-                    t = WorkerThread(i, self.job_queue, self._process_job, redirect)
+                    t = WorkerThread(i, self.job_queue, self._process_job, redirect,
+                                     self._notify, self.resource_pool)
                     t.start()
                     threads.append(t)
             finally:
                 self._wait_worker_threads(threads)
 
+        self._run_exclusive_jobs(num_of_workers)
+
+        self.actual_makespan = time.time() - start_time
+        console.info('Tests ran in %.2fs, %.2fs predicted by the test history' % (
+                     self.actual_makespan, self.predicted_makespan))
+
+    def _run_exclusive_jobs(self, index):
         if not self.exclusive_job_queue.empty():
             console.info('Spawn 1 worker thread to run exclusive tests')
-            last_t = WorkerThread(num_of_workers, self.exclusive_job_queue,
-                                  self._process_job, quiet)
+            last_t = WorkerThread(index, self.exclusive_job_queue,
+                                  self._process_job, console.is_quiet(), self._notify)
             try:
                 last_t.start()
             finally:
                 self._wait_worker_threads([last_t])
 
+    def start(self):
+        """Start the workers to run the jobs added by `add_jobs`, until `finish`.
+
+        This is how tests run while they are still being built: the jobs are
+        run in the order they are added, the exclusive ones after all others.
+        The timeouts are checked by a thread waiting for the workers, as the
+        main thread is busy adding the jobs.
+        """
+        self.start_time = time.time()
+        console.info('Spawn %d worker thread(s) to run concurrent tests' % self.num_jobs)
+        redirect = self.num_jobs > 1 or console.is_quiet()
+        for i in range(self.num_jobs):
+            t = WorkerThread(i, self.job_queue, self._process_job, redirect,
+                             self._notify, self.resource_pool, wait_for_jobs=True)
+            t.start()
+            self.threads.append(t)
+        self.waiting_thread = threading.Thread(target=self._wait_worker_threads,
+                                               args=(self.threads,))
+        self.waiting_thread.start()
+
+    def add_jobs(self, jobs):
+        """Add jobs to run to the started workers."""
+        for job in jobs:
+            self.tests_list.append(job)
+            if job[0].attr.get('exclusive'):
+                self.exclusive_job_queue.put(job)
+            else:
+                self.job_queue.put(job)
+
+    def _drop_queued_jobs(self):
+        for job_queue in (self.job_queue, self.exclusive_job_queue):
+            try:
+                while True:
+                    job_queue.get_nowait()
+            except queue.Empty:
+                pass
+
+    def finish(self, cancel=False):
+        """Wait for the added jobs to finish, then run the exclusive ones.
+
+        With `cancel`, the jobs which have not started are dropped.
+        """
+        if cancel:
+            self._drop_queued_jobs()
+        for _ in self.threads:
+            self.job_queue.put(None)
+        while self.waiting_thread.is_alive():
+            self.waiting_thread.join(_MAX_WAIT_TIME)
+        self._run_exclusive_jobs(len(self.threads))
+        self.actual_makespan = time.time() - self.start_time
+        console.info('Tests ran in %.2fs' % self.actual_makespan)
+
+    def terminate(self):
+        """Stop the started workers and their running jobs."""
+        self._drop_queued_jobs()
+        self.resource_pool.cancel()
+        for t in self.threads:
+            t.terminate()
+            self.job_queue.put(None)
+        if self.waiting_thread is not None:
+            self.waiting_thread.join()
+
     def get_results(self):
         return self.passed_run_results, self.failed_run_results
@@ -294,6 +294,19 @@ def cpu_count():
         return int(os.sysconf('SC_NPROCESSORS_ONLN'))
 
 
+def available_memory():
+    """Return the memory available to start new processes in MiB, 0 if unknown."""
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                # MemAvailable:   12345678 kB
+                if line.startswith('MemAvailable:'):
+                    return int(line.split()[1]) // 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
 _TRANS_TABLE = str.maketrans(',-/:\\.+*', '________')
 
 def regular_variable_name(name):
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.action_cache.
+
+"""Pin the local action cache.
+
+* The key follows the command, the output paths and the content of the
+  inputs, not their mtimes.
+* A hit restores the outputs with their modes, and leaves the unchanged ones
+  alone for ``restat``; actions with dir outputs are not cached.
+* A missed action runs its command from the action file, with the original
+  response file written, and is stored on success only.
+* Over the size limit, the least recently used entries are removed, once
+  after something is stored.
+* gen_rule targets are only cached when ``action_cache_rules`` opts in.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import action_cache  # noqa: E402  (sys.path tweak above)
+
+
+class ActionCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = self._tmp.name
+        self.cache_dir = os.path.join(self.root, 'cache')
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        self.addCleanup(os.chdir, cwd)
+
+    def _write(self, path, data):
+        dirname = os.path.dirname(path)
+        if dirname:
+            os.makedirs(dirname, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(data)
+        return path
+
+    def _read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_wrap_command(self):
+        command, rspfile, content = action_cache.wrap_command('ar rcs ${out} ${in}')
+        self.assertEqual('${action_cache} --action=${action_file} ${out} ${action_outputs} '
+                         '-- ${in} ${action_deps}', command)
+        self.assertEqual(('${action_file}', 'ar rcs ${out} ${in}'), (rspfile, content))
+        command, rspfile, content = action_cache.wrap_command('ld @${out}.rsp', '${out}.rsp', '${in}')
+        self.assertIn('--rspfile=${out}.rsp ', command)
+        self.assertEqual('${in}' + action_cache._RSP_SEPARATOR + 'ld @${out}.rsp', content)
+        self.assertEqual({'action_file': 'a.o.action', 'action_deps': 'x y'},
+                         action_cache.edge_variables(['a.o', 'b.o'], [], ['x', 'y']))
+
+    def test_cached_rule(self):
+        with mock.patch.object(action_cache, 'cache_dir', return_value=self.cache_dir):
+            self.assertTrue(action_cache.cached_rule('link'))
+            self.assertFalse(action_cache.cached_rule('cxx'))
+            self.assertFalse(action_cache.cached_rule('foo__rule__'))
+            rules = ['link', action_cache.GEN_RULE]
+            with mock.patch.object(action_cache.config, 'get_item', return_value=rules):
+                self.assertTrue(action_cache.cached_rule('foo__rule__'))
+
+    def test_key_follows_content(self):
+        self._write('a.o', 'a')
+        key = action_cache.action_key('ar ${out}', ['lib.a'], ['a.o'])
+        os.utime('a.o', (0, 0))
+        self.assertEqual(key, action_cache.action_key('ar ${out}', ['lib.a'], ['a.o']))
+        self.assertNotEqual(key, action_cache.action_key('ar -D ${out}', ['lib.a'], ['a.o']))
+        self.assertNotEqual(key, action_cache.action_key('ar ${out}', ['lib2.a'], ['a.o']))
+        self._write('a.o', 'changed')
+        self.assertNotEqual(key, action_cache.action_key('ar ${out}', ['lib.a'], ['a.o']))
+
+    def test_put_and_get(self):
+        cache = action_cache.ActionCache(self.cache_dir)
+        self._write('out/bin', 'binary')
+        os.chmod('out/bin', 0o755)
+        self._write('out/bin.map', 'map')
+        cache.put('ab' * 32, ['out/bin', 'out/bin.map'])
+        os.remove('out/bin')
+        os.utime('out/bin.map', (0, 0))
+        self.assertFalse(cache.get('cd' * 32, ['out/bin', 'out/bin.map']))
+        self.assertFalse(cache.get('ab' * 32, ['out/bin']))
+        self.assertTrue(cache.get('ab' * 32, ['out/bin', 'out/bin.map']))
+        self.assertEqual('binary', self._read('out/bin'))
+        self.assertEqual(0o755, os.stat('out/bin').st_mode & 0o777)
+        self.assertEqual(0, os.path.getmtime('out/bin.map'))  # Unchanged, not touched
+
+    def test_dir_output_is_not_cached(self):
+        cache = action_cache.ActionCache(self.cache_dir)
+        os.makedirs('out/classes')
+        cache.put('ab' * 32, ['out/classes'])
+        self.assertFalse(cache.get('ab' * 32, ['out/classes']))
+
+    def _run(self, rspfile=''):
+        return action_cache.run('lib.a.action', rspfile, ['lib.a'], ['a.o'], cache_dir=self.cache_dir)
+
+    def test_run(self):
+        self._write('a.o', 'a')
+        self._write('lib.a.action', 'a.o' + action_cache._RSP_SEPARATOR + 'ar rcs lib.a @lib.a.rsp')
+
+        def command(cmd, shell):
+            self.assertEqual(('ar rcs lib.a @lib.a.rsp', True), (cmd, shell))
+            self.assertEqual('a.o', self._read('lib.a.rsp'))
+            self._write('lib.a', 'archive')
+            return 0
+
+        with mock.patch.object(action_cache.subprocess, 'call', side_effect=command) as call:
+            self.assertEqual(0, self._run('lib.a.rsp'))
+            self.assertFalse(os.path.exists('lib.a.rsp'))
+            os.remove('lib.a')
+            self.assertEqual(0, self._run('lib.a.rsp'))
+            self.assertEqual(1, call.call_count)
+        self.assertEqual('archive', self._read('lib.a'))
+
+    def test_failed_run_is_not_stored(self):
+        self._write('a.o', 'a')
+        self._write('lib.a.action', 'false')
+        with mock.patch.object(action_cache.subprocess, 'call', return_value=1) as call:
+            self.assertEqual(1, self._run())
+            self.assertEqual(1, self._run())
+            self.assertEqual(2, call.call_count)
+
+    def test_evict(self):
+        cache = action_cache.ActionCache(self.cache_dir, max_size=1000)
+        self._write('out', 'x' * 400)
+        keys = ('aa' * 32, 'bb' * 32, 'cc' * 32)
+        for index, key in enumerate(keys):
+            cache.put(key, ['out'])
+            os.utime(cache._entry_dir(key), (index, index))
+        cache.get('aa' * 32, ['out'])  # The oldest one is used again
+        cache.evict()
+        self.assertEqual([True, False, True], [os.path.exists(cache._entry_dir(k)) for k in keys])
+
+        # Nothing is stored since the last eviction
+        os.utime(cache._entry_dir('cc' * 32), (0, 0))
+        cache.max_size = 500
+        with mock.patch.object(cache, '_entries') as entries:
+            cache.evict()
+            entries.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
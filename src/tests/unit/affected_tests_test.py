@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.affected_tests.
+
+"""Pin the selection of the tests affected by changed files.
+
+* A changed source, header or testdata file affects its owners and all
+  their dependents; a changed BUILD file affects every target in its dir.
+* Only the command line tests among the affected targets are selected.
+* Files owned by no target affect nothing, a changed BLADE_ROOT affects all.
+* The files changed since a git revision include the untracked ones.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import affected_tests  # noqa: E402  (sys.path tweak above)
+
+
+class _Target:
+    def __init__(self, key, type='cc_library', srcs=(), dependents=(), **attr):
+        self.key = key
+        self.path = key.split(':')[0]
+        self.type = type
+        self.srcs = list(srcs)
+        self.attr = attr
+        self.expanded_dependents = set(dependents)
+
+
+def _targets():
+    targets = [
+        _Target('base:str', srcs=['str.cc'], expanded_hdrs=[('str.h', 'base/str.h')],
+                dependents=['base:str_test', 'net:http', 'net:http_test']),
+        _Target('base:str_test', 'cc_test', srcs=['str_test.cc']),
+        _Target('net:http', srcs=['http.cc'], textual_hdrs=['http.inc'],
+                dependents=['net:http_test']),
+        _Target('net:http_test', 'cc_test', srcs=['http_test.cc'],
+                testdata=['data', ('//conf/http.conf', 'http.conf')]),
+        _Target('tools:gen_test', 'py_test', srcs=['gen_test.py']),
+    ]
+    return {t.key: t for t in targets}
+
+
+class AffectedTestsTest(unittest.TestCase):
+
+    def _select(self, changed_files, command_targets=None):
+        targets = _targets()
+        if command_targets is None:
+            command_targets = list(targets)
+        return sorted(affected_tests.select_affected_tests(targets, command_targets, changed_files))
+
+    def test_dependents_are_affected(self):
+        self.assertEqual(['base:str_test', 'net:http_test'], self._select(['base/str.h']))
+        self.assertEqual(['net:http_test'], self._select(['net/http.inc']))
+        self.assertEqual(['tools:gen_test'], self._select(['tools/gen_test.py']))
+
+    def test_testdata(self):
+        self.assertEqual(['net:http_test'], self._select(['net/data/input.txt']))
+        self.assertEqual(['net:http_test'], self._select(['conf/http.conf']))
+
+    def test_build_file(self):
+        self.assertEqual(['base:str_test', 'net:http_test'], self._select(['base/BUILD']))
+
+    def test_only_command_targets(self):
+        self.assertEqual(['net:http_test'], self._select(['base/str.cc'], ['net:http_test']))
+
+    def test_unowned_and_root(self):
+        self.assertEqual([], self._select(['README.md', 'base/other.cc']))
+        self.assertEqual(['base:str_test', 'net:http_test', 'tools:gen_test'],
+                         self._select(['BLADE_ROOT']))
+
+    def test_parse_changed_files(self):
+        self.assertEqual(['net/a.cc', 'base/b.h'],
+                         affected_tests.parse_changed_files('a.cc, //base/b.h,', 'net'))
+
+    def test_changed_files_since(self):
+        outputs = {'diff': 'base/str.cc\n', 'ls-files': 'base/new.cc\n'}
+        with mock.patch.object(affected_tests.util, 'run_command',
+                               side_effect=lambda cmd: (0, outputs[cmd[1]], '')) as run:
+            self.assertEqual(['base/str.cc', 'base/new.cc'],
+                             affected_tests.changed_files_since('HEAD~1'))
+        self.assertIn('HEAD~1', run.call_args_list[0][0][0])
+        with mock.patch.object(affected_tests.util, 'run_command',
+                               return_value=(128, '', 'bad revision')), \
+                mock.patch.object(affected_tests.console, 'error') as error:
+            self.assertIsNone(affected_tests.changed_files_since('nope'))
+            error.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.build_accelerator.
+
+"""Pin the detection and the use of ccache, sccache and distcc.
+
+* 'auto' prefixes the compile commands, not the linker, with the compiler
+  cache installed; distcc is only used if it has hosts, through ccache.
+* A compiler which already runs through an accelerator, MSVC and 'none'
+  get none; a configured one which is not installed is warned about.
+* ccache gets the workspace root as its base dir, unless set by the user,
+  and the sloppiness of precompiled headers added to the user's one.
+* The jobs number is scaled to the job slots of the remote distcc hosts.
+* The hit rate of the build is reported from the counters before and after.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import build_accelerator  # noqa: E402  (sys.path tweak above)
+
+
+def _toolchain(cc='gcc', cxx='g++', msvc=False):
+    toolchain = mock.Mock()
+    toolchain.get_cc_commands.return_value = (cc, cxx, cxx)
+    toolchain.cc_is.side_effect = lambda vendor: msvc and vendor == 'msvc'
+    return toolchain
+
+
+class BuildAcceleratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.setting = 'auto'
+        self.installed = set()
+        self.environ = {'DISTCC_HOSTS': ''}
+        patchers = [
+            mock.patch.object(build_accelerator.config, 'get_item',
+                              side_effect=lambda section, name: self.setting),
+            mock.patch.object(build_accelerator.shutil, 'which',
+                              side_effect=lambda name: name in self.installed and '/usr/bin/' + name),
+            mock.patch.dict(build_accelerator.os.environ, self.environ, clear=True),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _accelerator(self, **kwargs):
+        return build_accelerator.BuildAccelerator(_toolchain(**kwargs))
+
+    def test_auto(self):
+        self.assertEqual(('gcc', 'g++', 'g++'), self._accelerator().get_cc_commands())
+        self.installed = {'sccache', 'ccache', 'distcc'}
+        accelerator = self._accelerator()
+        self.assertEqual(('ccache', False), (accelerator.compiler_cache, accelerator.distcc))
+        self.assertEqual(('ccache gcc', 'ccache g++', 'g++'), accelerator.get_cc_commands())
+
+        os.environ['DISTCC_HOSTS'] = 'localhost/2 build1/8 build2 --randomize'
+        accelerator = self._accelerator()
+        self.assertTrue(accelerator.distcc)
+        self.assertEqual('ccache gcc', accelerator.get_cc_commands()[0])
+        self.installed = {'sccache', 'distcc'}
+        accelerator = self._accelerator()
+        self.assertEqual(('sccache', False), (accelerator.compiler_cache, accelerator.distcc))
+        self.installed = {'distcc'}
+        self.assertEqual('distcc gcc', self._accelerator().get_cc_commands()[0])
+
+    def test_none(self):
+        self.installed = {'ccache'}
+        self.assertEqual('ccache gcc', self._accelerator(cc='ccache gcc').get_cc_commands()[0])
+        self.assertIsNone(self._accelerator(cc='cl.exe', msvc=True).compiler_cache)
+        self.setting = 'none'
+        self.assertIsNone(self._accelerator().compiler_cache)
+        self.setting = 'sccache'
+        with mock.patch.object(build_accelerator.console, 'warning') as warning:
+            self.assertIsNone(self._accelerator().compiler_cache)
+            warning.assert_called_once()
+
+    def test_setup_environ(self):
+        self.installed = {'ccache', 'distcc'}
+        os.environ['DISTCC_HOSTS'] = 'build1'
+        self._accelerator().setup_environ('/home/me/workspace')
+        self.assertEqual('/home/me/workspace', os.environ['CCACHE_BASEDIR'])
+        self.assertEqual('distcc', os.environ['CCACHE_PREFIX'])
+        os.environ['CCACHE_BASEDIR'] = '/home'
+        self._accelerator().setup_environ('/home/me/workspace')
+        self.assertEqual('/home', os.environ['CCACHE_BASEDIR'])
+        self.assertNotIn('CCACHE_SLOPPINESS', os.environ)
+
+    def test_pch_sloppiness(self):
+        self.installed = {'ccache'}
+        with mock.patch.object(build_accelerator.util, 'run_command',
+                               return_value=(0, 'include_file_mtime\n', '')):
+            self._accelerator().setup_environ('/home/me/workspace', pch=True)
+        self.assertEqual('include_file_mtime,pch_defines,time_macros', os.environ['CCACHE_SLOPPINESS'])
+        os.environ['CCACHE_SLOPPINESS'] = 'time_macros, locale'
+        self._accelerator().setup_environ('/home/me/workspace', pch=True)
+        self.assertEqual('time_macros,locale,pch_defines', os.environ['CCACHE_SLOPPINESS'])
+
+    def test_distcc_hosts(self):
+        self.assertEqual(14, build_accelerator.distcc_remote_slots(
+            ['localhost/4', 'user@build1:3632/6', 'build2,lzo', '10.0.0.3/4']))
+        with tempfile.TemporaryDirectory() as distcc_dir:
+            with open(os.path.join(distcc_dir, 'hosts'), 'w') as f:
+                f.write('# The build farm\nbuild1/8 build2/8\n')
+            del os.environ['DISTCC_HOSTS']
+            os.environ['DISTCC_DIR'] = distcc_dir
+            self.assertEqual(['build1/8', 'build2/8'], build_accelerator._distcc_hosts())
+            self.installed = {'distcc'}
+            accelerator = self._accelerator()
+        with mock.patch.object(build_accelerator.os, 'getloadavg', return_value=(0, 0, 0)), \
+                mock.patch.object(build_accelerator.util, 'available_memory', return_value=0):
+            self.assertEqual(8 + 16, accelerator.adjust_jobs_num(8))
+
+    def test_cache_stats(self):
+        self.installed = {'ccache'}
+        accelerator = self._accelerator()
+        outputs = iter(['direct_cache_hit\t10\npreprocessed_cache_hit\t2\ncache_miss\t5\n',
+                        'direct_cache_hit\t40\npreprocessed_cache_hit\t2\ncache_miss\t15\n'])
+        with mock.patch.object(build_accelerator.util, 'run_command',
+                               side_effect=lambda args: (0, next(outputs), '')), \
+                mock.patch.object(build_accelerator.console, 'info') as info:
+            accelerator.report_cache_stats(accelerator.cache_stats())
+        info.assert_called_once_with('ccache: 30 hits, 10 misses, 75.0% hit rate')
+
+        self.installed = {'sccache'}
+        stats = {'stats': {'cache_hits': {'counts': {'C/C++': 3, 'CUDA': 1}},
+                           'cache_misses': {'counts': {'C/C++': 2}}}}
+        with mock.patch.object(build_accelerator.util, 'run_command',
+                               return_value=(0, json.dumps(stats), '')):
+            self.assertEqual((4, 2), self._accelerator().cache_stats())
+        self.assertIsNone(self._accelerator(cc='cl.exe', msvc=True).cache_stats())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.build_memory and the build jobs adjustment.
+
+"""Pin the memory awareness of the build.
+
+* The processes are classified by their argv, links as LTO links under LTO.
+* The configured estimates override the defaults, and the learned peaks
+  override them with some headroom when learning.
+* The sampled peaks are merged into the learned ones, which decay slowly.
+* The build jobs number gives away some cores to the load of the host, and
+  is capped by the available memory.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import build_accelerator  # noqa: E402  (sys.path tweak above)
+from blade import build_memory  # noqa: E402
+
+
+class ProcessKindTest(unittest.TestCase):
+
+    def test_kinds(self):
+        self.assertEqual('compile', build_memory.process_kind(
+            ['/usr/libexec/gcc/x86_64-linux-gnu/12/cc1plus', '-quiet', 'a.cc'], False))
+        self.assertEqual('compile', build_memory.process_kind(['/usr/bin/clang-17', '-cc1', 'a.cc'], False))
+        self.assertIsNone(build_memory.process_kind(['/usr/bin/clang++', '-c', 'a.cc'], False))
+        self.assertEqual('link', build_memory.process_kind(['/usr/bin/ld', '-o', 'a'], False))
+        self.assertEqual('lto_link', build_memory.process_kind(['/usr/bin/ld.lld', '-o', 'a'], True))
+        self.assertEqual('lto_link', build_memory.process_kind(['lto1', '-fltrans'], False))
+        self.assertEqual('javac', build_memory.process_kind(['javac', '-d', 'classes'], False))
+        self.assertIsNone(build_memory.process_kind(['sh', 'cc_wrapper.sh'], False))
+        self.assertIsNone(build_memory.process_kind([], False))
+
+
+class BuildMemoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.config = {'build_memory_estimates': {'link': 4096}, 'learn_build_memory': True}
+        patcher = mock.patch.object(build_memory.config, 'get_item',
+                                    side_effect=lambda section, name: self.config[name])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _sample(self, memory, processes):
+        """Sample `processes`, {pid: (argv, peak RSS)}."""
+        with mock.patch.object(build_memory, '_descendant_pids', return_value=list(processes)), \
+                mock.patch.object(build_memory, '_read_argv', side_effect=lambda p: processes[p][0]), \
+                mock.patch.object(build_memory, '_read_peak_rss', side_effect=lambda p: processes[p][1]):
+            memory.sample(lto=False)
+
+    def test_estimates(self):
+        memory = build_memory.BuildMemory(self._tmp.name)
+        self.assertEqual(4096, memory.estimate('link'))
+        self.assertEqual(build_memory.DEFAULT_ESTIMATES['javac'], memory.estimate('javac'))
+        with mock.patch.object(build_memory.util, 'available_memory', return_value=10000):
+            self.assertEqual(2, memory.jobs_by_memory('link', 8))
+            self.assertEqual(8, memory.jobs_by_memory('compile', 8))
+        with mock.patch.object(build_memory.util, 'available_memory', return_value=100):
+            self.assertEqual(1, memory.jobs_by_memory('link', 8))
+        with mock.patch.object(build_memory.util, 'available_memory', return_value=0):
+            self.assertEqual(8, memory.jobs_by_memory('link', 8))
+
+    def test_learned_peaks(self):
+        memory = build_memory.BuildMemory(self._tmp.name)
+        self._sample(memory, {10: (['cc1plus'], 1000), 11: (['cc1plus'], 3000), 12: (['ld'], 500)})
+        memory.save()
+        memory = build_memory.BuildMemory(self._tmp.name)
+        self.assertEqual(int(3000 * 1.25) + 1, memory.estimate('compile'))
+        self.assertEqual(int(500 * 1.25) + 1, memory.estimate('link'))
+        self.assertEqual(build_memory.DEFAULT_ESTIMATES['javac'], memory.estimate('javac'))
+
+        # A lower peak is taken slowly, the kinds not run are kept
+        self._sample(memory, {20: (['cc1plus'], 1000)})
+        memory.save()
+        memory = build_memory.BuildMemory(self._tmp.name)
+        self.assertEqual(int(2700 * 1.25) + 1, memory.estimate('compile'))
+        self.assertEqual(int(500 * 1.25) + 1, memory.estimate('link'))
+
+        self.config['learn_build_memory'] = False
+        self.assertEqual(build_memory.DEFAULT_ESTIMATES['compile'], memory.estimate('compile'))
+
+
+class AdjustJobsNumTest(unittest.TestCase):
+
+    def _adjust(self, load, memory, memory_per_job=1024):
+        accelerator = build_accelerator.BuildAccelerator(mock.Mock())
+        with mock.patch.object(build_accelerator.os, 'getloadavg', return_value=(load, 0, 0)), \
+                mock.patch.object(build_accelerator.util, 'available_memory', return_value=memory):
+            return accelerator.adjust_jobs_num(64, memory_per_job)
+
+    def test_load(self):
+        self.assertEqual(64, self._adjust(0.5, 0))
+        self.assertEqual(54, self._adjust(10.2, 0))
+        self.assertEqual(32, self._adjust(100, 0))
+
+    def test_memory(self):
+        self.assertEqual(64, self._adjust(0, 128 * 1024))
+        self.assertEqual(30, self._adjust(0, 30 * 1024 + 100))
+        self.assertEqual(1, self._adjust(0, 100))
+        self.assertEqual(64, self._adjust(0, 100, memory_per_job=0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.build_trace.
+
+"""Pin the build trace and its critical path.
+
+* Only the edges logged after the offset are read, the outputs of an edge
+  are merged, and after a recompaction the recently built ones are taken.
+* Edges are owned by the targets of the ninja files, and depend on the
+  edges building their inputs, also through phony edges.
+* The critical path is the longest chain of dependent edges, and is marked
+  in the trace events with the per-target times.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import build_trace  # noqa: E402  (sys.path tweak above)
+
+
+class BuildTraceTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.build_dir = self._tmp.name
+        self._write('.ninja_log', '# ninja log v5\n0\t9000\t1\tbuild/old.o\taaaa\n')
+        self.offset = build_trace.log_offset(self.build_dir)
+        self._write('.ninja_log', ''.join('%d\t%d\t2\t%s\t%s\n' % line for line in (
+            (0, 1000, 'build/a/a.o', 'h1'),
+            (1500, 3000, 'build/b/b.o', 'h2'),
+            (0, 2000, 'build/c.o', 'h5'),
+            (1000, 1500, 'build/a/liba.a', 'h3'),
+            (3000, 4000, 'build/b/t', 'h4'),
+            (3000, 4000, 'build/b/t.map', 'h4'),
+        )), mode='a')
+        self._write('a/a.build.ninja',
+                    'build build/a/a.o: cxx a/a.cc\n'
+                    'build build/a/liba.a: ar build/a/a.o\n'
+                    'build build/a/a.stamp: phony build/a/liba.a\n')
+        self._write('b/t.build.ninja',
+                    'build build/b/b.o: cxx b/b$ c.cc | build/a/a.stamp\n'
+                    'build build/b/t | build/b/t.map: link build/b/b.o || build/a/a.stamp\n')
+        self.ninja_files = [('a:a', self._path('a/a.build.ninja')),
+                            ('b:t', self._path('b/t.build.ninja'))]
+
+    def _path(self, path):
+        return os.path.join(self.build_dir, path)
+
+    def _write(self, path, content, mode='w'):
+        path = self._path(path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, mode) as f:
+            f.write(content)
+
+    def _edges(self):
+        edges = build_trace.read_ninja_log(self.build_dir, self.offset, 0)
+        build_trace.link_edges(edges, self.ninja_files)
+        return {edge.outputs[0]: edge for edge in edges}
+
+    def test_read_ninja_log(self):
+        edges = build_trace.read_ninja_log(self.build_dir, self.offset, 0)
+        self.assertEqual(5, len(edges))
+        self.assertEqual(['build/b/t', 'build/b/t.map'], edges[-1].outputs)
+        self.assertEqual((3.0, 1.0), (edges[-1].start, edges[-1].duration))
+
+    def test_recompacted_log(self):
+        now = time.time()
+        self._write('.ninja_log', '# ninja log v5\n0\t1\t%d\tbuild/new.o\tbb\n'
+                                  '0\t1\t%d\tbuild/old.o\tcc\n' % (now * 1e9, now - 3600))
+        edges = build_trace.read_ninja_log(self.build_dir, 10 ** 6, now)
+        self.assertEqual([['build/new.o']], [e.outputs for e in edges])
+
+    def test_owners_and_deps(self):
+        edges = self._edges()
+        self.assertEqual('a:a', edges['build/a/liba.a'].owner)
+        self.assertEqual('b:t', edges['build/b/t'].owner)
+        self.assertEqual('(blade)', edges['build/c.o'].owner)
+        self.assertEqual([edges['build/a/a.o']], edges['build/a/liba.a'].deps)
+        # Through the phony stamp
+        self.assertEqual(['build/a/liba.a'], [e.outputs[0] for e in edges['build/b/b.o'].deps])
+        self.assertEqual(['build/a/liba.a', 'build/b/b.o'],
+                         sorted(e.outputs[0] for e in edges['build/b/t'].deps))
+
+    def test_critical_path(self):
+        edges = self._edges()
+        path = build_trace.critical_path(list(edges.values()))
+        self.assertEqual(['build/a/a.o', 'build/a/liba.a', 'build/b/b.o', 'build/b/t'],
+                         [e.outputs[0] for e in path])
+        times = build_trace.target_times(list(edges.values()), path)
+        self.assertEqual([2, 1.5, 1.5], times['a:a'])
+        self.assertEqual([2, 2.5, 2.5], times['b:t'])
+
+    def test_write_trace(self):
+        self._write('build.ninja', 'build all: phony build/b/t\n')
+        trace_file = self._path('trace.json')
+        build_trace.write_trace(trace_file, [('load', 100.0, 101.0)], 102.0, self.build_dir,
+                                self.offset, self._path('build.ninja'), self.ninja_files)
+        with open(trace_file) as f:
+            trace = json.load(f)
+        events = trace['traceEvents']
+        stage = [e for e in events if e.get('cat') == 'stage'][0]
+        self.assertEqual((0, 1000000), (stage['ts'], stage['dur']))
+        link = [e for e in events if e.get('cat') == 'edge' and e['name'] == 't'][0]
+        self.assertEqual((5000000, 'b:t', True),
+                         (link['ts'], link['args']['target'], link['args']['critical']))
+        # a.o and c.o ran at the same time
+        lanes = {e['name']: e['tid'] for e in events if e.get('cat') == 'edge'}
+        self.assertNotEqual(lanes['a.o'], lanes['c.o'])
+        self.assertEqual(lanes['a.o'], lanes['liba.a'])
+        self.assertEqual(4, len([e for e in events if e.get('cat') == 'critical']))
+        self.assertEqual(4.0, sum(e['duration'] for e in trace['blade']['critical_path']))
+
+
+if __name__ == '__main__':
+    unittest.main()
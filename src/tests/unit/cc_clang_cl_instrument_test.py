@@ -150,6 +150,7 @@ def _windows_gen(is_clang_cl, coverage=False, generate=None, use=None,
     gen.options.sanitizers = []
     gen.build_dir = 'build64_release_coverage'
     gen._msvc_tee_wrapper_py = mock.Mock(return_value='cc_wrapper.py')
+    gen._memory_pool = mock.Mock(return_value=None)
     gen._msvc_link_wrapper_py = mock.Mock(return_value='lw.py')
     gen._builtin_command = lambda b, args='': 'cmd'
     gen.generate_rule = mock.Mock()
@@ -171,6 +171,19 @@ class CcArchiveRulesTest(unittest.TestCase):
         cmd = self._capture_ar_command(gen, deterministic=True, thin=True)
         self.assertIn('ar rcsDT ', cmd)
 
+    def test_linux_thin_full_archive_rule(self):
+        gen = self._make_gen('linux')
+        with mock.patch.object(gen, 'generate_rule') as mock_rule:
+            with mock.patch('blade.cc_rule_support.config') as mock_config:
+                mock_config.get_section.return_value = {'deterministic': True, 'thin': True}
+                gen._generate_cc_ar_rules()
+        rules = {c[1]['name']: c[1]['command'] for c in mock_rule.call_args_list}
+        # A real archive of the members of the thin one, for packaging
+        self.assertEqual('rm -f $out; ar rcsD $out $$(ar t $in)', rules['arfull'])
+        with mock.patch.object(gen, 'generate_rule') as mock_rule:
+            self._capture_ar_command(gen, thin=False)
+        self.assertNotIn('arfull', [c[1]['name'] for c in mock_rule.call_args_list])
+
     # --- macOS ---
 
     def test_darwin_default(self):
@@ -235,5 +248,28 @@ class CcArchiveRulesTest(unittest.TestCase):
         self.assertNotIn('T', cmd)
 
 
+class ThinArchivePackageTest(unittest.TestCase):
+    """A thin static library is packaged as a real archive."""
+
+    def test_package(self):
+        from blade import package_target
+        lib = mock.Mock()
+        lib._get_target_file.return_value = 'build64_release/lib/libfoo.a'
+        lib.data = {'thin_archive': 'build64_release/lib/libfoo.a'}
+        pkg = package_target.PackageTarget.__new__(package_target.PackageTarget)
+        pkg.name = 'pkg'
+        pkg.target_dir = 'build64_release/app'
+        pkg.attr = {'sources': [], 'locations': [('lib:foo', 'a', '')], 'out': 'pkg.tgz',
+                    'shell': False}
+        pkg.blade = mock.Mock()
+        pkg.blade.get_build_targets.return_value = {'lib:foo': lib}
+        pkg.generate_build = mock.Mock()
+        pkg.generate()
+        archive = 'build64_release/app/pkg.archives/lib/foo/libfoo.a'
+        pkg.generate_build.assert_any_call('arfull', archive, inputs='build64_release/lib/libfoo.a')
+        pkg.generate_build.assert_called_with('package', 'build64_release/app/pkg.tgz',
+                                              inputs=[archive], variables={'entries': 'libfoo.a'})
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for the linker selection and the link benchmark.
+
+"""Pin `cc_config.linker` and the "benchmark" subcommand.
+
+* 'auto' selects the fastest linker the driver accepts by `-fuse-ld=`, but
+  not lld for the LTO objects of gcc; 'default' and non-Linux toolchains
+  keep the default one, an unusable linker is warned about.
+* The benchmark links each binary with each linker by its link command, in
+  place of the configured linker, and reports the best time of each.
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import cc_rule_support  # noqa: E402  (sys.path tweak above)
+from blade import link_benchmark  # noqa: E402
+
+
+def _toolchain(vendor='gcc', target_os='linux', linkers=('mold', 'lld')):
+    toolchain = mock.Mock()
+    toolchain.target_os = target_os
+    toolchain.cc_is.side_effect = lambda v: v == vendor
+    toolchain.supports_link_flag.side_effect = lambda flag: flag[len('-fuse-ld='):] in linkers
+    return toolchain
+
+
+class SelectLinkerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.setting = 'auto'
+        self.options = mock.Mock(spec=[])
+        patcher = mock.patch.object(cc_rule_support.config, 'get_item',
+                                    side_effect=lambda section, name: self.setting)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _select(self, **kwargs):
+        return cc_rule_support._select_linker(self.options, _toolchain(**kwargs))
+
+    def test_auto(self):
+        self.assertEqual('mold', self._select())
+        self.assertEqual('lld', self._select(linkers=('lld',)))
+        self.assertEqual('', self._select(linkers=()))
+        self.assertEqual('', self._select(target_os='darwin'))
+        self.assertEqual('', self._select(vendor='msvc', target_os='windows'))
+        with mock.patch.object(cc_rule_support, '_lto_mode', return_value='thin'):
+            self.assertEqual('', self._select(linkers=('lld',)))
+            self.assertEqual('lld', self._select(vendor='clang', linkers=('lld',)))
+
+    def test_explicit(self):
+        self.setting = 'default'
+        self.assertEqual('', self._select())
+        self.setting = 'lld'
+        self.assertEqual('lld', self._select())
+        self.setting = 'gold'
+        with mock.patch.object(cc_rule_support.console, 'warning') as warning:
+            self.assertEqual('', self._select())
+            warning.assert_called_once()
+
+
+class LinkBenchmarkTest(unittest.TestCase):
+
+    def test_time_link(self):
+        commands = []
+        with mock.patch.object(link_benchmark.subprocess, 'call',
+                               side_effect=lambda cmd, **kwargs: commands.append(cmd) or 0):
+            self.assertIsNotNone(link_benchmark._time_link(
+                    'g++ -o app -fuse-ld=mold @app.rsp', 'lld', 2))
+            link_benchmark._time_link('g++ -o app -fuse-ld=mold @app.rsp', 'default', 1)
+        self.assertEqual(['g++ -o app @app.rsp -fuse-ld=lld'] * 2 + ['g++ -o app @app.rsp'], commands)
+        with mock.patch.object(link_benchmark.subprocess, 'call', return_value=1):
+            self.assertIsNone(link_benchmark._time_link('g++ -o app', 'lld', 3))
+
+    def test_run(self):
+        costs = {'default': 4.0, 'mold': 0.5}
+        with mock.patch.object(link_benchmark, '_link_command', return_value='g++ -o app'), \
+                mock.patch.object(link_benchmark, '_time_link',
+                                  side_effect=lambda command, linker, runs: costs.get(linker)), \
+                mock.patch.object(link_benchmark.console, 'info'), \
+                mock.patch.object(link_benchmark.console, 'warning') as warning, \
+                mock.patch.object(link_benchmark.console, 'output') as output:
+            self.assertEqual(0, link_benchmark.run(
+                    'build.ninja', _toolchain(), [('app:a', 'a'), ('app:b', 'b')], 'mold,lld,gold', 3))
+            warning.assert_called_once_with('Linker gold is not usable, ignored')
+        lines = output.call_args[0][0].splitlines()
+        self.assertEqual('Link time, the best of 3 runs:', lines[0])
+        self.assertEqual(['target', 'default', 'mold', 'lld'], lines[1].split())
+        self.assertEqual(['app:a', '4.00s', '0.50s', 'failed'], lines[2].split())
+        self.assertEqual(['total', '8.00s', '1.00s', 'failed'], lines[4].split())
+
+
+if __name__ == '__main__':
+    unittest.main()
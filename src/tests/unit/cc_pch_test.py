@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for the precompiled headers of cc targets.
+
+"""Pin the precompiled header (`pch` attribute) of cc targets.
+
+* Targets with the same header and compile vars share one precompiled
+  header, each other set of vars gets its own, with the compile deps of all
+  of the targets which use it.
+* gcc gets a `.gch` next to a wrapper it includes, clang the `.pch` itself;
+  MSVC is not supported.
+* Only the C++ sources are compiled with it, and depend on it, not the C or
+  the Objective-C++ ones.
+* The builds are emitted once, with the inclusion stack of the header.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock as mock
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import backend  # noqa: E402  (sys.path tweak above)
+from blade import build_manager  # noqa: E402
+from blade.cc_targets import CcLibrary  # noqa: E402
+
+
+def _blade():
+    blade = build_manager.Blade.__new__(build_manager.Blade)
+    blade._Blade__pch_specs = {}
+    return blade
+
+
+class PchTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.build_dir = os.path.join(self._tmp.name, 'build64_release')
+        self.blade = _blade()
+        self.vendor = 'gcc'
+
+    def _target(self, name, cc_vars, compile_deps=()):
+        t = CcLibrary.__new__(CcLibrary)
+        t.name = name
+        t.path = 'app'
+        t.build_dir = self.build_dir
+        t.target_dir = os.path.join(self.build_dir, 'app')
+        t.attr = {'pch': 'common/pch.h', 'extra_cxxflags': ['-fno-rtti'],
+                  'expanded_srcs': [], 'expanded_hdrs': []}
+        t.data = {}
+        toolchain = mock.Mock()
+        toolchain.cc_is = lambda v: v == self.vendor
+        toolchain.object_file_of = lambda src: src + '.o'
+        t.blade = mock.Mock(wraps=self.blade)
+        t.blade.get_build_toolchain.return_value = toolchain
+        t.blade.get_command.return_value = 'build'
+        t._get_cc_vars = lambda: dict(cc_vars)
+        t._collect_cc_compile_deps = lambda: list(compile_deps)
+        return t
+
+    def test_shared_by_same_flags(self):
+        a = self._target('a', {'cppflags': '-DA'}, ['a.pb.h'])
+        b = self._target('b', {'cppflags': '-DA'}, ['b.pb.h'])
+        c = self._target('c', {'cppflags': '-DC'})
+        for t in (a, b, c):
+            t._register_pch()
+        self.assertEqual(a.data['pch'], b.data['pch'])
+        self.assertNotEqual(a.data['pch']['output'], c.data['pch']['output'])
+
+        wrapper = a.data['pch']['wrapper']
+        self.assertEqual('pch.h', os.path.basename(wrapper))
+        self.assertEqual(wrapper + '.gch', a.data['pch']['output'])
+        self.assertEqual('-Winvalid-pch -fpch-preprocess -include %s' % wrapper, a.data['pch']['flags'])
+        with open(wrapper) as f:
+            self.assertEqual('#include "common/pch.h"\n', f.read())
+
+        specs = self.blade.pch_specs()
+        self.assertEqual(2, len(specs))
+        spec = [s for s in specs if s['output'] == a.data['pch']['output']][0]
+        self.assertEqual(['a.pb.h', 'b.pb.h'], spec['order_only_deps'])
+        self.assertEqual({'cppflags': '-DA', 'extra_compile_flags': '-fno-rtti'}, spec['variables'])
+
+    def test_clang_and_msvc(self):
+        self.vendor = 'clang'
+        t = self._target('a', {})
+        t._register_pch()
+        output = t.data['pch']['output']
+        self.assertTrue(output.endswith('/pch.h.pch'))
+        self.assertEqual('-include-pch %s' % output, t.data['pch']['flags'])
+        self.assertFalse(os.path.exists(t.data['pch']['wrapper']))
+
+        self.vendor = 'msvc'
+        t = self._target('b', {})
+        with mock.patch.object(t, 'warning') as warning:
+            t._register_pch()
+            warning.assert_called_once()
+        self.assertNotIn('pch', t.data)
+
+    def test_cxx_sources_use_it(self):
+        t = self._target('a', {'cppflags': '-DA'})
+        t._register_pch()
+        t.generate_build = mock.Mock()
+        t._remove_on_clean = mock.Mock()
+        t._cc_objects([('a.cc', 'app/a.cc'), ('b.c', 'app/b.c'), ('c.mm', 'app/c.mm')])
+        calls = {c.kwargs['inputs']: c.kwargs for c in t.generate_build.call_args_list}
+        self.assertEqual(t.data['pch']['flags'], calls['app/a.cc']['variables']['pch'])
+        self.assertIn(t.data['pch']['output'], calls['app/a.cc']['implicit_deps'])
+        for src in ('app/b.c', 'app/c.mm'):
+            self.assertNotIn('pch', calls[src]['variables'])
+            self.assertNotIn(t.data['pch']['output'], calls[src]['implicit_deps'])
+
+    def test_emitted_once(self):
+        for name in ('a', 'b'):
+            self._target(name, {'cppflags': '-DA'}, ['a.pb.h'])._register_pch()
+        generator = backend.NinjaFileGenerator.__new__(backend.NinjaFileGenerator)
+        generator.blade = self.blade
+        code = ''.join(generator._emit_pch_builds())
+        spec = self.blade.pch_specs()[0]
+        self.assertEqual(1, code.count('build '))
+        self.assertIn('build %s | %s: cxxpch common/pch.h || a.pb.h\n' % (
+                      spec['output'], spec['inclusion_stack']), code)
+        self.assertIn('  inclusion_stack = %s\n' % spec['inclusion_stack'], code)
+        self.assertIn('  cppflags = -DA\n', code)
+
+
+if __name__ == '__main__':
+    unittest.main()
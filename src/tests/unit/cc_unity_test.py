@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for the unity build of cc targets.
+
+"""Pin the unity build of cc targets.
+
+* The C and the C++ sources, not the generated ones, are compiled in
+  batches, which are mostly kept when a source is added.
+* The `unity` attribute overrides `cc_config.unity`.
+* A batch is compiled from its unity source, depending on its sources; the
+  other sources are compiled as usual.
+* The inclusion stack of a unity source is split into those of its sources,
+  which are checked on their own.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import unittest.mock as mock
+
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import cc_targets  # noqa: E402  (sys.path tweak above)
+from blade import inclusion_check  # noqa: E402
+from blade.cc_targets import CcLibrary  # noqa: E402
+
+
+class UnityTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.build_dir = os.path.join(self._tmp.name, 'build64_release')
+        self.config = {'unity': True, 'unity_batch_size': 4}
+        patcher = mock.patch.object(cc_targets.config, 'get_item',
+                                    side_effect=lambda section, name: self.config[name])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _target(self, srcs, **attr):
+        t = CcLibrary.__new__(CcLibrary)
+        t.name = 'lib'
+        t.path = 'app'
+        t.build_dir = self.build_dir
+        t.target_dir = os.path.join(self.build_dir, 'app')
+        t.attr = {'expanded_srcs': [(src, os.path.join('app', src)) for src in srcs]}
+        t.attr.update(attr)
+        t.data = {}
+        toolchain = mock.Mock()
+        toolchain.cc_is.return_value = False
+        toolchain.object_file_of = lambda src: src + '.o'
+        t.blade = mock.Mock()
+        t.blade.get_build_toolchain.return_value = toolchain
+        t.blade.get_command.return_value = 'build'
+        return t
+
+    def _batches(self, srcs, **attr):
+        t = self._target(srcs, **attr)
+        t._write_unity_sources()
+        return t.data.get('unity_batches', [])
+
+    def test_batches(self):
+        srcs = ['f%02d.cc' % i for i in range(40)] + ['a.c', 'b.c', 'c.mm', 'd.S']
+        batches = self._batches(srcs)
+        batched = [src for _, batch in batches for src, _ in batch]
+        self.assertEqual(len(set(batched)), len(batched))
+        self.assertNotIn('c.mm', batched)
+        self.assertNotIn('d.S', batched)
+        for unity_src, batch in batches:
+            self.assertTrue(2 <= len(batch) <= 8)
+            self.assertEqual(os.path.splitext(batch[0][0])[0],
+                             unity_src[:unity_src.index('.unity.')])
+            with open(os.path.join(self.build_dir, 'app', 'lib.objs', unity_src)) as f:
+                self.assertEqual(''.join('#include "%s"\n' % s for _, s in batch), f.read())
+        self.assertEqual(['a.unity.c'], [u for u, _ in batches if u.endswith('.c')])
+
+        # A source added changes at most the batch it is put in, and the next one
+        def keys(batches):
+            return {tuple(batch) for _, batch in batches}
+        added = keys(self._batches(srcs + ['f15a.cc']))
+        self.assertLessEqual(len(added - keys(batches)), 2)
+
+    def test_disabled(self):
+        srcs = ['f%02d.cc' % i for i in range(40)]
+        self.assertEqual([], self._batches(srcs, unity=False))
+        self.assertEqual([], self._batches(srcs, secret=True))
+        self.config['unity'] = False
+        self.assertEqual([], self._batches(srcs))
+        self.assertTrue(self._batches(srcs, unity=True))
+        # Generated sources are not batched
+        self.config['unity'] = True
+        t = self._target([])
+        t.attr['expanded_srcs'] = [(s, os.path.join(self.build_dir, 'app', s)) for s in srcs]
+        t._write_unity_sources()
+        self.assertEqual([], t.data['unity_batches'])
+
+    def test_compile(self):
+        t = self._target(['a.cc', 'b.cc', 'c.cc'])
+        t.data['unity_batches'] = [('a.unity.cc', [('a.cc', 'app/a.cc'), ('b.cc', 'app/b.cc')])]
+        t._get_cc_vars = lambda: {}
+        t._cc_compile_deps = lambda: []
+        t.generate_build = mock.Mock()
+        t._remove_on_clean = mock.Mock()
+        objs, _ = t._cc_objects(t.attr['expanded_srcs'])
+        objs_dir = os.path.join(self.build_dir, 'app', 'lib.objs')
+        self.assertEqual([os.path.join(objs_dir, 'c.cc.o'), os.path.join(objs_dir, 'a.unity.cc.o')], objs)
+        kwargs = t.generate_build.call_args_list[1].kwargs
+        self.assertEqual(os.path.join(objs_dir, 'a.unity.cc'), kwargs['inputs'])
+        self.assertEqual(['app/a.cc', 'app/b.cc'], kwargs['implicit_deps'])
+        self.assertEqual([os.path.join(objs_dir, 'a.unity.cc.incstk')], kwargs['implicit_outputs'])
+
+    def test_split_inclusion_stack(self):
+        objs_dir = os.path.join(self.build_dir, 'app', 'lib.objs')
+        os.makedirs(objs_dir)
+        stack_file = os.path.join(objs_dir, 'a.unity.cc.incstk')
+        with open(stack_file, 'w') as f:
+            f.write('. ./app/a.cc\n'
+                    '.. ./app/a.h\n'
+                    '... ./common/base.h\n'
+                    '. ./app/b.cc\n'
+                    '.. ./app/b.h\n'
+                    'Multiple include guards may be useful for:\n')
+        checker = inclusion_check.Checker.__new__(inclusion_check.Checker)
+        checker.build_dir = self.build_dir
+        checker.path = 'app'
+        checker.name = 'lib'
+        checker.system_incs = ()
+        checker.expanded_srcs = [('a.cc', 'app/a.cc'), ('b.cc', 'app/b.cc')]
+        checker.unity = {'a.cc': stack_file, 'b.cc': stack_file}
+        checker._write_unity_inclusion_stacks()
+        with open(os.path.join(objs_dir, 'a.cc.incstk')) as f:
+            self.assertEqual('. ./app/a.h\n.. ./common/base.h\n', f.read())
+        with open(os.path.join(objs_dir, 'b.cc.incstk')) as f:
+            self.assertEqual('. ./app/b.h\n', f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
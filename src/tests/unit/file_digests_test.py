@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.file_digests.
+
+"""Pin the remembered file digests.
+
+* A digest is reused while the size and the mtime of the file are the same,
+  also by the next instance, and computed again when either changes.
+* Files which are gone are forgotten on save.
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import unittest
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import file_digests  # noqa: E402  (sys.path tweak above)
+
+
+class FileDigestsTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = os.path.join(self._tmp.name, '.blade.file.digests')
+        self.file = os.path.join(self._tmp.name, 'data')
+        with open(self.file, 'w') as f:
+            f.write('data')
+
+    def test_remembered_by_size_and_mtime(self):
+        digests = file_digests.FileDigests(self.path)
+        self.assertEqual(hashlib.sha256(b'data').hexdigest(), digests.digest(self.file))
+        digests.save()
+        digests = file_digests.FileDigests(self.path)
+        st = os.stat(self.file)
+        digests.remember(self.file, 'remembered', st)
+        self.assertEqual('remembered', digests.digest(self.file))
+        os.utime(self.file, ns=(st.st_atime_ns, st.st_mtime_ns + 1000))
+        self.assertEqual(hashlib.sha256(b'data').hexdigest(), digests.digest(self.file))
+
+    def test_gone_files_are_forgotten(self):
+        digests = file_digests.FileDigests(self.path)
+        digests.digest(self.file)
+        os.remove(self.file)
+        digests.save()
+        self.assertEqual({}, file_digests.FileDigests(self.path).digests)
+
+
+if __name__ == '__main__':
+    unittest.main()
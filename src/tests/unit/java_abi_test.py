@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.java_abi.
+
+"""Pin what ``java_abi.class_abi`` keeps and what it strips.
+
+There is no JDK in the unit test environment, so the class files are
+assembled by hand with ``_ClassBuilder``. The property that matters most is
+the last test: two classes that differ only in a method body (and in a
+constant only that body uses) must produce byte-identical ABI output,
+otherwise the restat on the ``javaabi`` edge prunes nothing.
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import unittest
+import zipfile
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import builtin_tools  # noqa: E402  (sys.path tweak above)
+from blade import java_abi  # noqa: E402
+
+_ACC_PUBLIC = 0x0001
+_ACC_PRIVATE = 0x0002
+_ACC_STATIC = 0x0008
+_ACC_FINAL = 0x0010
+
+
+class _ClassBuilder:
+    """Assemble a minimal class file."""
+
+    def __init__(self):
+        self.pool = []
+        self.indexes = {}
+
+    def _add(self, key, encoded):
+        if key not in self.indexes:
+            self.pool.append(encoded)
+            self.indexes[key] = len(self.pool)
+        return self.indexes[key]
+
+    def utf8(self, s):
+        data = s.encode('utf-8')
+        return self._add(('utf8', s), struct.pack('>BH', 1, len(data)) + data)
+
+    def integer(self, v):
+        return self._add(('int', v), struct.pack('>Bi', 3, v))
+
+    def klass(self, name):
+        return self._add(('class', name), struct.pack('>BH', 7, self.utf8(name)))
+
+    def string(self, s):
+        return self._add(('string', s), struct.pack('>BH', 8, self.utf8(s)))
+
+    def attribute(self, name, body):
+        return struct.pack('>HI', self.utf8(name), len(body)) + body
+
+    def member(self, access, name, descriptor, attributes=()):
+        return (struct.pack('>HHHH', access, self.utf8(name), self.utf8(descriptor),
+                            len(attributes)) + b''.join(attributes))
+
+    def code(self, constant):
+        # ldc <constant>; return -- the body refers to the pool like real code.
+        bytecode = struct.pack('>BBB', 0x12, self.string(constant), 0xb1)
+        body = struct.pack('>HHI', 1, 1, len(bytecode)) + bytecode + struct.pack('>HH', 0, 0)
+        return self.attribute('Code', body)
+
+    def build(self, this, fields, methods, attributes):
+        this_index, super_index = self.klass(this), self.klass('java/lang/Object')
+        out = [struct.pack('>IHH', 0xCAFEBABE, 0, 55),
+               struct.pack('>H', len(self.pool) + 1)] + self.pool
+        out.append(struct.pack('>HHHH', _ACC_PUBLIC, this_index, super_index, 0))
+        out.append(struct.pack('>H', len(fields)) + b''.join(fields))
+        out.append(struct.pack('>H', len(methods)) + b''.join(methods))
+        out.append(struct.pack('>H', len(attributes)) + b''.join(attributes))
+        return b''.join(out)
+
+
+def _foo_class(body_constant='hello'):
+    b = _ClassBuilder()
+    # Build the bodies first so their constants land early in the pool, as
+    # javac would interleave them.
+    f_code = b.code(body_constant)
+    g_code = b.code('private')
+    clinit_code = b.code('static')
+    fields = [
+        b.member(_ACC_PUBLIC | _ACC_STATIC | _ACC_FINAL, 'C', 'I',
+                 [b.attribute('ConstantValue', struct.pack('>H', b.integer(42)))]),
+        b.member(_ACC_PRIVATE, 'secret', 'I'),
+    ]
+    methods = [
+        b.member(_ACC_PUBLIC, 'f', '()V', [f_code]),
+        b.member(_ACC_PRIVATE, 'g', '()V', [g_code]),
+        b.member(_ACC_STATIC, '<clinit>', '()V', [clinit_code]),
+    ]
+    inner_classes = struct.pack('>H', 2) + struct.pack(
+        '>HHHH', b.klass('Foo$Bar'), b.klass('Foo'), b.utf8('Bar'), _ACC_PUBLIC) + struct.pack(
+        '>HHHH', b.klass('Foo$1'), 0, 0, 0)
+    attributes = [
+        b.attribute('SourceFile', struct.pack('>H', b.utf8('Foo.java'))),
+        b.attribute('InnerClasses', inner_classes),
+    ]
+    return b.build('Foo', fields, methods, attributes)
+
+
+def _parse(data):
+    """Return (pool utf8 set, fields, methods, class attribute names)."""
+    reader = java_abi._Reader(data)
+    reader.u4()
+    reader.u2()
+    reader.u2()
+    pool = java_abi._ConstantPool(java_abi._read_constant_pool(reader))
+    reader.u2()
+    reader.u2()
+    reader.u2()
+    for _ in range(reader.u2()):
+        reader.u2()
+    fields = java_abi._read_members(reader, pool)
+    methods = java_abi._read_members(reader, pool)
+    attributes = java_abi._read_attributes(reader, pool)
+    strings = {p.decode() for tag, p in pool.old.values() if tag == 1}
+
+    def describe(members):
+        return {pool.utf8(name): [a[0] for a in attrs] for _, name, _, attrs in members}
+
+    return strings, describe(fields), describe(methods), [a[0] for a in attributes]
+
+
+class ClassAbiTest(unittest.TestCase):
+
+    def test_strips_private_members_and_code(self):
+        strings, fields, methods, attributes = _parse(java_abi.class_abi(_foo_class()))
+        self.assertEqual({'C': ['ConstantValue']}, fields)
+        self.assertEqual({'f': []}, methods)
+        self.assertEqual(['InnerClasses'], attributes)
+        for gone in ('secret', 'g', 'hello', 'private', 'Code', 'SourceFile', 'Foo.java', 'Foo$1'):
+            self.assertNotIn(gone, strings)
+        self.assertIn('Foo$Bar', strings)
+
+    def test_body_only_change_gives_identical_abi(self):
+        self.assertNotEqual(_foo_class('hello'), _foo_class('changed'))
+        self.assertEqual(java_abi.class_abi(_foo_class('hello')),
+                         java_abi.class_abi(_foo_class('changed')))
+
+    def test_anonymous_class_is_dropped(self):
+        b = _ClassBuilder()
+        inner_classes = struct.pack('>H', 1) + struct.pack('>HHHH', b.klass('Foo$1'), 0, 0, 0)
+        data = b.build('Foo$1', [], [], [b.attribute('InnerClasses', inner_classes)])
+        self.assertIsNone(java_abi.class_abi(data))
+
+    def test_bad_input_raises(self):
+        with self.assertRaises(java_abi.ClassFormatError):
+            java_abi.class_abi(b'not a class')
+        with self.assertRaises(java_abi.ClassFormatError):
+            java_abi.class_abi(_foo_class()[:40])
+
+
+class GenerateJavaAbiTest(unittest.TestCase):
+
+    def _abi_jar(self, entries):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            jar = os.path.join(tmpdir, 'lib.jar')
+            abi_jar = os.path.join(tmpdir, 'lib.abi.jar')
+            builtin_tools._write_jar(jar, entries, '')
+            builtin_tools.generate_java_abi([abi_jar, jar])
+            with zipfile.ZipFile(abi_jar) as z:
+                return {name: z.read(name) for name in z.namelist()}
+
+    def test_classes_are_stripped_and_resources_dropped(self):
+        entries = self._abi_jar({'Foo.class': _foo_class(), 'app.properties': b'k=v',
+                                 'Broken.class': b'broken'})
+        self.assertEqual(java_abi.class_abi(_foo_class()), entries['Foo.class'])
+        self.assertEqual(b'broken', entries['Broken.class'])
+        self.assertNotIn('app.properties', entries)
+
+    def test_annotation_processor_jar_is_kept_whole(self):
+        entries = self._abi_jar({'Foo.class': _foo_class(),
+                                 builtin_tools._JAVA_PROCESSOR_SERVICE: b'Foo'})
+        self.assertEqual(_foo_class(), entries['Foo.class'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for the in-process jar writer in blade.builtin_tools.
+
+"""Pin the contract of ``builtin_tools._write_jar`` and ``generate_java_jar``.
+
+The ``javac`` and ``javajar`` edges used to shell out to the JDK ``jar``
+command, one JVM per edge. They now pack jars with ``zipfile``, and the
+output has to be reproducible for ninja's ``restat`` to prune anything:
+
+* entries are sorted, with the manifest leading the archive;
+* every entry carries the same fixed timestamp;
+* an unchanged jar is not rewritten, so its mtime is stable;
+* ``jar_compression_level`` maps ``0`` to stored and the rest to deflate;
+* javac flags in the ``--name=value`` form reach javac, not the tool options.
+"""
+
+import os
+import stat
+import sys
+import tempfile
+import time
+import unittest
+import zipfile
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import builtin_tools  # noqa: E402  (sys.path tweak above)
+from blade import util  # noqa: E402
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as f:
+        f.write(content)
+
+
+class WriteJarTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmpdir = self._tmp.name
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _jar(self, entries, level=''):
+        output = os.path.join(self.tmpdir, 'out.jar')
+        builtin_tools._write_jar(output, entries, level)
+        return output
+
+    def test_manifest_first_then_sorted_with_dirs(self):
+        jar = self._jar({'b/Y.class': b'y', 'a/X.class': b'x'})
+        with zipfile.ZipFile(jar) as z:
+            self.assertEqual(
+                ['META-INF/', 'META-INF/MANIFEST.MF', 'a/', 'a/X.class', 'b/', 'b/Y.class'],
+                z.namelist())
+            self.assertIn(b'Manifest-Version: 1.0', z.read('META-INF/MANIFEST.MF'))
+
+    def test_user_manifest_is_kept(self):
+        jar = self._jar({'META-INF/MANIFEST.MF': b'Main-Class: Foo\r\n'})
+        with zipfile.ZipFile(jar) as z:
+            self.assertEqual(b'Main-Class: Foo\r\n', z.read('META-INF/MANIFEST.MF'))
+
+    def test_timestamps_are_fixed(self):
+        jar = self._jar({'a/X.class': b'x'})
+        with zipfile.ZipFile(jar) as z:
+            for info in z.infolist():
+                self.assertEqual(builtin_tools._JAR_ENTRY_DATE_TIME, info.date_time)
+
+    def test_identical_inputs_give_identical_bytes(self):
+        src = os.path.join(self.tmpdir, 'X.class')
+        _write(src, b'x' * 100)
+        first = os.path.join(self.tmpdir, 'first.jar')
+        second = os.path.join(self.tmpdir, 'second.jar')
+        builtin_tools._write_jar(first, {'X.class': src}, '')
+        builtin_tools._write_jar(second, {'X.class': b'x' * 100}, '')
+        with open(first, 'rb') as f1, open(second, 'rb') as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+    def test_unchanged_jar_is_not_rewritten(self):
+        jar = self._jar({'a/X.class': b'x'})
+        old = time.time() - 100
+        os.utime(jar, (old, old))
+        self._jar({'a/X.class': b'x'})
+        self.assertEqual(old, os.path.getmtime(jar))
+        self.assertFalse(os.path.exists(jar + '.tmp'))
+        self._jar({'a/X.class': b'changed'})
+        self.assertNotEqual(old, os.path.getmtime(jar))
+
+    def test_compression_levels(self):
+        jar = self._jar({'X.class': b'x' * 1000}, '0')
+        with zipfile.ZipFile(jar) as z:
+            self.assertEqual(zipfile.ZIP_STORED, z.getinfo('X.class').compress_type)
+        jar = self._jar({'X.class': b'x' * 1000}, '9')
+        with zipfile.ZipFile(jar) as z:
+            self.assertEqual(zipfile.ZIP_DEFLATED, z.getinfo('X.class').compress_type)
+        jar = self._jar({'X.class': b'x' * 1000}, '')
+        with zipfile.ZipFile(jar) as z:
+            self.assertEqual(zipfile.ZIP_DEFLATED, z.getinfo('X.class').compress_type)
+
+
+class GenerateJavaJarTest(unittest.TestCase):
+
+    def test_merges_classes_jar_and_resources(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            classes_jar = os.path.join(tmpdir, 'lib__classes__.jar')
+            builtin_tools._write_jar(classes_jar, {'com/Foo.class': b'foo'}, '')
+            resource = os.path.join(tmpdir, 'lib.resources', 'conf', 'app.properties')
+            _write(resource, b'k=v')
+            target = os.path.join(tmpdir, 'lib.jar')
+            builtin_tools.generate_java_jar('', [target, classes_jar, resource])
+            with zipfile.ZipFile(target) as z:
+                self.assertEqual(b'foo', z.read('com/Foo.class'))
+                self.assertEqual(b'k=v', z.read('conf/app.properties'))
+
+    def test_resources_only(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            resource = os.path.join(tmpdir, 'lib.resources', 'app.properties')
+            _write(resource, b'k=v')
+            target = os.path.join(tmpdir, 'lib.jar')
+            builtin_tools.generate_java_jar('0', [target, resource])
+            with zipfile.ZipFile(target) as z:
+                self.assertEqual(b'k=v', z.read('app.properties'))
+
+
+# A stand-in for javac: records its arguments and writes a class into `-d`.
+_FAKE_JAVAC = '''#!%s
+import os, sys
+args = sys.argv[1:]
+classes_dir = args[args.index('-d') + 1]
+with open(os.path.join(classes_dir, 'A.class'), 'w') as f:
+    f.write('\\n'.join(args))
+'''
+
+
+class GenerateJavacCompileTest(unittest.TestCase):
+
+    def test_javacflags_with_equal_sign(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            javac = os.path.join(tmpdir, 'javac')
+            with open(javac, 'w') as f:
+                f.write(_FAKE_JAVAC % sys.executable)
+            os.chmod(javac, stat.S_IRWXU)
+            classes_dir = os.path.join(tmpdir, 'classes')
+            jar = os.path.join(tmpdir, 'out.jar')
+            options, args = util.parse_command_line([
+                    '--javac=' + javac, '--compression_level=0',
+                    classes_dir, jar, 'UTF-8', '.', '--',
+                    '-source', '11', '--release=11', '--add-exports=java.base/sun.nio.ch=ALL-UNNAMED',
+                    '--', 'A.java'])
+            builtin_tools.generate_javac_compile(args, **options)
+            with zipfile.ZipFile(jar) as z:
+                javac_args = z.read('A.class').decode().split('\n')
+            self.assertEqual(['-source', '11', '--release=11',
+                              '--add-exports=java.base/sun.nio.ch=ALL-UNNAMED', 'A.java'],
+                             javac_args[-5:])
+
+
+if __name__ == '__main__':
+    unittest.main()
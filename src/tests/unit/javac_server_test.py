@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.javac_server client side.
+
+"""Pin the client half of the warm javac server protocol.
+
+No JDK is needed: a Python thread stands in for ``BladeJavacServer`` on a
+real Unix domain socket, so the tests exercise the exact bytes the Java side
+parses. What we pin:
+
+* the request carries the protocol line, the cwd and the argument list;
+* the exit code and diagnostics come back unchanged;
+* a rejected request (wrong cwd), an unstartable server and ``-J`` flags
+  all make ``run`` return None, which sends the caller back to a local
+  ``javac``;
+* each ``javac`` gets its own server.
+"""
+
+import os
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import javac_server  # noqa: E402  (sys.path tweak above)
+
+
+class _FakeServer(threading.Thread):
+    """Serve one request the way BladeJavacServer does."""
+
+    def __init__(self, path, exit_code, diagnostics):
+        super().__init__(daemon=True)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(path)
+        self.sock.listen(1)
+        self.exit_code = exit_code
+        self.diagnostics = diagnostics
+        self.request = None
+
+    def run(self):
+        conn, _ = self.sock.accept()
+        with conn, conn.makefile('rb') as f:
+            lines = [f.readline().decode().rstrip('\n') for _ in range(3)]
+            argc = int(lines[2])
+            args = [f.readline().decode().rstrip('\n') for _ in range(argc)]
+            self.request = lines[:2] + args
+            conn.sendall(b'%d\n' % self.exit_code + self.diagnostics)
+        self.sock.close()
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires Unix domain sockets')
+class RunTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.build_dir = self._tmp.name
+        os.makedirs(javac_server.server_dir(self.build_dir, 'javac'))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _serve(self, exit_code, diagnostics=b''):
+        server = _FakeServer(javac_server.socket_path(self.build_dir, 'javac'), exit_code, diagnostics)
+        server.start()
+        return server
+
+    def test_request_and_response(self):
+        server = self._serve(0, b'warning: x\n')
+        result = javac_server.run(self.build_dir, 'javac', 2, 60, ['-d', 'out', 'A.java'])
+        server.join(5)
+        self.assertEqual((0, b'warning: x\n'), result)
+        self.assertEqual([javac_server._PROTOCOL, os.getcwd(), '-d', 'out', 'A.java'],
+                         server.request)
+
+    def test_compile_error_is_returned(self):
+        server = self._serve(1, b'A.java:1: error\n')
+        result = javac_server.run(self.build_dir, 'javac', 2, 60, ['A.java'])
+        server.join(5)
+        self.assertEqual((1, b'A.java:1: error\n'), result)
+
+    def test_rejected_request_falls_back(self):
+        server = self._serve(javac_server._REJECTED)
+        self.assertIsNone(javac_server.run(self.build_dir, 'javac', 2, 60, ['A.java']))
+        server.join(5)
+
+    def test_unstartable_server_falls_back(self):
+        with mock.patch.object(javac_server, '_start_server',
+                               side_effect=OSError('no java')) as start:
+            self.assertIsNone(javac_server.run(self.build_dir, 'javac', 2, 60, ['A.java']))
+            start.assert_called_once()
+
+    def test_jvm_flags_fall_back(self):
+        with mock.patch.object(javac_server, '_request') as request:
+            self.assertIsNone(javac_server.run(self.build_dir, 'javac', 2, 60,
+                                               ['-J-Xmx2g', 'A.java']))
+            request.assert_not_called()
+
+    def test_server_per_javac(self):
+        self._serve(0)
+        with mock.patch.object(javac_server, '_start_server',
+                               side_effect=OSError('no java')) as start:
+            self.assertIsNone(javac_server.run(self.build_dir, '/other/jdk/bin/javac', 2, 60,
+                                               ['A.java']))
+            start.assert_called_once()
+        self.assertNotEqual(javac_server.socket_path(self.build_dir, 'javac'),
+                            javac_server.socket_path(self.build_dir, '/other/jdk/bin/javac'))
+
+
+class JavaOfTest(unittest.TestCase):
+
+    def test_java_next_to_javac(self):
+        self.assertEqual(os.path.join('/jdk/bin', 'java'), javac_server._java_of('/jdk/bin/javac'))
+        self.assertEqual('java', javac_server._java_of('javac'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -37,6 +37,7 @@ class MsvcCompileFlagsTest(unittest.TestCase):
         gen.options.sanitizers = []
         gen.build_dir = 'build64_release'
         gen._msvc_tee_wrapper_py = mock.Mock(return_value='cc_wrapper.py')
+        gen._memory_pool = mock.Mock(return_value=None)
         gen.generate_rule = mock.Mock()
         return gen
 
@@ -53,6 +53,7 @@ def _compile_rules(profile='release', debug_info='mid', cppflags=None, cxxflags=
     _set_pgo(gen.options, profile_generate, profile_use)
     gen.build_dir = 'build64_%s' % profile
     gen._msvc_tee_wrapper_py = mock.Mock(return_value='cc_wrapper.py')
+    gen._memory_pool = mock.Mock(return_value=None)
     gen.generate_rule = mock.Mock()
     section = {
         'msvc_config': {'cppflags': cppflags or [], 'cflags': [],
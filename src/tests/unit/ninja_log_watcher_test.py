@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.ninja_runner.NinjaLogWatcher.
+
+"""Pin how the outputs ninja builds are told while it runs.
+
+* Only the lines appended after the watcher was created are told, and a
+  partial last line waits for the rest of it.
+* After ninja recompacts the log, it is read again from the start, and
+  only the outputs modified since the watcher was created are told.
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import ninja_runner  # noqa: E402  (sys.path tweak above)
+
+
+def _line(output):
+    return '1\t2\t3\t%s\tabcdef\n' % output
+
+
+class NinjaLogWatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.build_dir = self._tmp.name
+        self.log = os.path.join(self.build_dir, '.ninja_log')
+        self._append('# ninja log v5\n' + _line('old/out'))
+
+    def _append(self, data, mode='a'):
+        with open(self.log, mode) as f:
+            f.write(data)
+
+    def test_new_lines(self):
+        watcher = ninja_runner.NinjaLogWatcher(self.build_dir)
+        self.assertEqual([], watcher.new_outputs())
+        self._append(_line('a/./t') + _line('b/t')[:5])
+        self.assertEqual(['a/t'], watcher.new_outputs())
+        self._append(_line('b/t')[5:])
+        self.assertEqual(['b/t'], watcher.new_outputs())
+        self.assertEqual([], watcher.new_outputs())
+
+    def test_missing_log(self):
+        os.remove(self.log)
+        watcher = ninja_runner.NinjaLogWatcher(self.build_dir)
+        self.assertEqual([], watcher.new_outputs())
+        self._append(_line('a/t'))
+        self.assertEqual(['a/t'], watcher.new_outputs())
+
+    def test_recompaction(self):
+        old = os.path.join(self.build_dir, 'old')
+        new = os.path.join(self.build_dir, 'new')
+        for path in (old, new):
+            with open(path, 'w'):
+                pass
+        past = time.time() - 3600
+        os.utime(old, (past, past))
+        self._append(''.join(_line('old/out%d' % i) for i in range(100)))
+        watcher = ninja_runner.NinjaLogWatcher(self.build_dir)
+        self._append('# ninja log v5\n' + _line(old) + _line(new), mode='w')
+        self.assertEqual([new], watcher.new_outputs())
+
+
+if __name__ == '__main__':
+    unittest.main()
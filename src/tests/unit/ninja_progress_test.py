@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for the build progress of blade.ninja_runner.
+
+"""Pin how the output of ninja is streamed to the build panel.
+
+* The output read from the pipe is written to the log as it is, and a
+  line split between two reads is handled once complete.
+* Consecutive non-status lines are printed at once, in order with the
+  status lines printed without a live panel.
+* The panel is redrawn at most once a frame, and only when it changed.
+* ``on_progress`` is called while ninja runs.
+"""
+
+import io
+import os
+import sys
+import threading
+import unittest
+from unittest import mock
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import console  # noqa: E402  (sys.path tweak above)
+from blade import ninja_runner  # noqa: E402
+
+
+class _Process:
+    """The ninja process writing `chunks` to its stdout pipe."""
+
+    def __init__(self, chunks):
+        read_fd, write_fd = os.pipe()
+        self.stdout = os.fdopen(read_fd, 'rb')
+        self.returncode = None
+
+        def write():
+            with os.fdopen(write_fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    f.flush()
+
+        self.writer = threading.Thread(target=write)
+        self.writer.start()
+
+    def wait(self):
+        self.writer.join()
+        self.returncode = 0
+        return 0
+
+
+class BuildProgressTest(unittest.TestCase):
+
+    def _show(self, chunks, cursor_control):
+        process = _Process(chunks)
+        log = io.BytesIO()
+        printed = []
+        on_progress = mock.Mock()
+        with mock.patch.object(console, 'support_cursor_control', return_value=cursor_control), \
+                mock.patch.object(console, 'is_quiet', return_value=False), \
+                mock.patch.object(console, 'render_build_panel') as render, \
+                mock.patch.object(console, 'print_line',
+                                  side_effect=lambda s: printed.append(('status', s))), \
+                mock.patch.object(console, 'output',
+                                  side_effect=lambda s: printed.append(('output', s))), \
+                mock.patch.object(console, 'info'):
+            ninja_runner._show_progress(process, log, on_progress)
+        process.stdout.close()
+        return log.getvalue(), printed, render, on_progress
+
+    def test_streamed_to_log_and_console(self):
+        chunks = [b'[1/3](2) CC a.cc\n[2/3](1) CC b', b'.cc\nwarning: x\n  in b.cc\n',
+                  b'[3/3](1) LINK t\nninja: no work to do.\n']
+        log, printed, _, on_progress = self._show(chunks, cursor_control=False)
+        self.assertEqual(b''.join(chunks), log)
+        self.assertEqual([('status', '[1/3](2) CC a.cc\n[2/3](1) CC b.cc'),
+                          ('output', 'warning: x\n  in b.cc'),
+                          ('status', '[3/3](1) LINK t')], printed)
+        self.assertTrue(on_progress.called)
+
+    def test_panel_frames(self):
+        chunks = [('[%d/100](4) CC %d.cc\n' % (i, i)).encode() for i in range(1, 101)]
+        _, printed, render, _ = self._show([b''.join(chunks)], cursor_control=True)
+        self.assertEqual([], printed)
+        # All the lines are read at once, and drawn in one frame
+        self.assertEqual(1, render.call_count)
+        finished, running, total, window, _ = render.call_args[0]
+        self.assertEqual((100, 3, 100, 'CC 100.cc'), (finished, running, total, window[-1]))
+
+    def test_render_only_when_changed_and_due(self):
+        panel = ninja_runner._BuildPanel()
+        with mock.patch.object(console, 'render_build_panel') as render:
+            panel.render()
+            self.assertEqual(0, render.call_count)
+            panel.changed = True
+            panel.render()
+            panel.changed = True
+            panel.render()
+            self.assertEqual(1, render.call_count)
+            self.assertGreaterEqual(panel.next_frame_time - panel.start,
+                                    ninja_runner._PANEL_FRAME_INTERVAL)
+
+
+if __name__ == '__main__':
+    unittest.main()
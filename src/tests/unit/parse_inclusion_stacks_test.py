@@ -25,12 +25,12 @@ from blade import inclusion_check  # noqa: E402  (sys.path tweak above)
 _BUILD_DIR = 'build64_release'
 
 
-def _parse(content):
+def _parse(content, transparent_hdr=None):
     with tempfile.NamedTemporaryFile('w', suffix='.incstk', delete=False) as f:
         f.write(content)
         path = f.name
     try:
-        return inclusion_check._parse_inclusion_stacks(path, _BUILD_DIR)
+        return inclusion_check._parse_inclusion_stacks(path, _BUILD_DIR, transparent_hdr=transparent_hdr)
     finally:
         os.unlink(path)
 
@@ -74,6 +74,18 @@ class ParseInclusionStacksTest(unittest.TestCase):
         self.assertEqual(['foo/a.h', 'foo/c.h'], direct)
         self.assertEqual([], stacks)
 
+    def test_precompiled_header_wrapper_is_transparent(self):
+        # gcc fell back from the precompiled header to its wrapper, which
+        # includes the real header: that one is included by the source.
+        wrapper = 'build64_release/.pch/0123456789abcdef/pch.h'
+        direct, stacks = _parse(
+            '. %s\n'
+            '.. ./common/pch.h\n'
+            '... build64_release/common/rpc/rpc_options.pb.h\n'
+            '. ./common/rpc/rpc_client.h\n' % wrapper, transparent_hdr=wrapper)
+        self.assertEqual(['common/pch.h', 'common/rpc/rpc_client.h'], direct)
+        self.assertEqual([['common/pch.h', 'common/rpc/rpc_options.pb.h']], stacks)
+
 
 class MsvcExternalHeaderTest(unittest.TestCase):
     """MSVC's /showIncludes prints every header absolute. A header under a
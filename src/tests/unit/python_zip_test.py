@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.python_zip.
+
+"""Pin the incremental py_binary zip assembly.
+
+* Unchanged sources are copied raw from the previous zip, changed ones are
+  compressed again, and the zip stays readable either way.
+* Wheel members are copied raw, whatever their compression.
+* With precompile, every ``.py`` gets an importable ``.pyc`` next to it, and
+  ``zipimport`` loads it instead of compiling the source.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+import zipfile
+import zipimport
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import python_zip  # noqa: E402  (sys.path tweak above)
+
+
+class PythonBinaryZipTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmpdir = self._tmp.name
+        self.zip_path = os.path.join(self.tmpdir, 'bin.zip')
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def _source(self, name, content):
+        path = os.path.join(self.tmpdir, 'src', name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def _build(self, sources, precompile=False):
+        z = python_zip.PythonBinaryZip(self.zip_path, precompile)
+        for name, path in sources.items():
+            z.write(path, name)
+        z.writestr('__init__.py', '')
+        z.close()
+        return z
+
+    def test_unchanged_members_are_reused(self):
+        sources = {'pkg/a.py': self._source('a.py', 'A = 1\n'),
+                   'pkg/b.py': self._source('b.py', 'B = 1\n')}
+        first = self._build(sources)
+        self.assertEqual((0, 3), (first.reused, first.compressed))
+        self._source('b.py', 'B = 2\n')
+        second = self._build(sources)
+        self.assertEqual((2, 1), (second.reused, second.compressed))
+        with zipfile.ZipFile(self.zip_path) as z:
+            self.assertIsNone(z.testzip())
+            self.assertEqual(b'A = 1\n', z.read('pkg/a.py'))
+            self.assertEqual(b'B = 2\n', z.read('pkg/b.py'))
+        self.assertFalse(os.path.exists(self.zip_path + '.tmp'))
+
+    def test_wheel_members_are_copied_raw(self):
+        wheel = os.path.join(self.tmpdir, 'lib.whl')
+        with zipfile.ZipFile(wheel, 'w') as w:
+            w.writestr('stored.py', 'S = 1\n', compress_type=zipfile.ZIP_STORED)
+            w.writestr('deflated.py', 'D = 1\n' * 100, compress_type=zipfile.ZIP_DEFLATED)
+        z = python_zip.PythonBinaryZip(self.zip_path, False)
+        with zipfile.ZipFile(wheel) as w:
+            for name in w.namelist():
+                z.copy_member(w, name)
+        z.close()
+        with zipfile.ZipFile(self.zip_path) as out, zipfile.ZipFile(wheel) as w:
+            self.assertIsNone(out.testzip())
+            for name in w.namelist():
+                self.assertEqual(w.getinfo(name).compress_type, out.getinfo(name).compress_type)
+                self.assertEqual(w.read(name), out.read(name))
+
+    def test_precompiled_zip_imports_from_pyc(self):
+        sources = {'pkg/__init__.py': self._source('__init__.py', ''),
+                   'pkg/mod.py': self._source('mod.py', 'VALUE = 42\n')}
+        self._build(sources, precompile=True)
+        with zipfile.ZipFile(self.zip_path) as z:
+            self.assertIn('pkg/mod.pyc', z.namelist())
+            self.assertEqual(python_zip._PYC_TAG, z.comment)
+        # Reusing the pycs of the previous zip keeps them loadable.
+        self._build(sources, precompile=True)
+        code = zipimport.zipimporter(os.path.join(self.zip_path, 'pkg')).get_code('mod')
+        # Compiled from the source, the filename would be under the zip path.
+        self.assertEqual('pkg/mod.py', code.co_filename)
+        namespace = {}
+        exec(code, namespace)  # pylint: disable=exec-used
+        self.assertEqual(42, namespace['VALUE'])
+
+    def test_syntax_error_is_left_to_import_time(self):
+        self._build({'bad.py': self._source('bad.py', 'def (:\n')}, precompile=True)
+        with zipfile.ZipFile(self.zip_path) as z:
+            self.assertIn('bad.py', z.namelist())
+            self.assertNotIn('bad.pyc', z.namelist())
+
+
+if __name__ == '__main__':
+    unittest.main()
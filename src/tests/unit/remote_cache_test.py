@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.remote_cache and blade.remote_cache_server.
+
+"""Pin the remote build cache, against the bundled server in a thread.
+
+* Contents and actions round trip; the server rejects a content whose
+  digest is not its key, and the client a downloaded one.
+* Connections are kept alive and reused, also after the server closed one.
+* An action stored by one machine is restored by another without running
+  it, and into its local cache; the policy keeps a cache from being read or
+  written.
+* An unreachable server makes the action run locally, and writes the down
+  stamp which keeps the other actions of the build from connecting to it.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import action_cache  # noqa: E402  (sys.path tweak above)
+from blade import remote_cache  # noqa: E402
+from blade import remote_cache_server  # noqa: E402
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class RemoteCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = self._tmp.name
+        self.server = remote_cache_server.make_server(os.path.join(self.root, 'server'))
+        thread = threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True)
+        thread.start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = 'http://127.0.0.1:%d/' % self.server.server_address[1]
+        cwd = os.getcwd()
+        os.chdir(self.root)
+        self.addCleanup(os.chdir, cwd)
+
+    def _remote(self, policy='readwrite', url=None, down_stamp=''):
+        remote = remote_cache.RemoteCache(url or self.url, policy, timeout=5, down_stamp=down_stamp)
+        self.addCleanup(remote.close)
+        return remote
+
+    def _write(self, path, data):
+        with open(path, 'w') as f:
+            f.write(data)
+
+    def _read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_round_trip(self):
+        remote = self._remote()
+        self._write('blob', 'content')
+        digest = _digest(b'content')
+        self.assertFalse(remote.has_blob(digest))
+        self.assertTrue(remote.put_blob(digest, 'blob'))
+        self.assertTrue(remote.has_blob(digest))
+        self.assertTrue(remote.get_blob(digest, 'downloaded'))
+        self.assertEqual('content', self._read('downloaded'))
+        # The content is checked by the server, and by the client
+        self.assertFalse(remote.put_blob(_digest(b'other'), 'blob'))
+        path = remote_cache_server._Storage(os.path.join(self.root, 'server'), 0).path('cas', digest)
+        self._write(path, 'corrupted')
+        self.assertFalse(remote.get_blob(digest, 'downloaded'))
+
+        entries = [{'path': 'out', 'mode': 0o644, 'digest': digest}]
+        self.assertIsNone(remote.get_action('ab' * 32))
+        self.assertTrue(remote.put_action('ab' * 32, entries))
+        self.assertEqual(entries, remote.get_action('ab' * 32))
+        self.assertEqual(1, remote._connections.qsize())  # Kept alive
+
+    def test_stale_connection(self):
+        remote = self._remote()
+        self.assertIsNone(remote.get_action('ab' * 32))
+        remote._connections.queue[0].sock.close()
+        self.assertTrue(remote.put_action('ab' * 32, []))
+
+    def _run(self, remote, cache_dir=''):
+        return action_cache.run('out.action', '', ['out', 'out.map'], ['in'],
+                                cache_dir=cache_dir, remote=remote)
+
+    def test_action_shared_by_machines(self):
+        self._write('in', 'input')
+        self._write('out.action', 'link out')
+
+        def command(cmd, shell):
+            self._write('out', 'output')
+            self._write('out.map', 'map')
+            return 0
+
+        with mock.patch.object(action_cache.subprocess, 'call', side_effect=command) as call:
+            self.assertEqual(0, self._run(self._remote('readonly')))
+            self.assertEqual(0, self._run(self._remote('writeonly')))
+            os.remove('out')
+            os.remove('out.map')
+            self.assertEqual(2, call.call_count)
+            # Another machine
+            local_cache = os.path.join(self.root, 'local')
+            self.assertEqual(0, self._run(self._remote('readonly'), local_cache))
+            self.assertEqual(2, call.call_count)
+            self.assertEqual('output', self._read('out'))
+            self.assertTrue(action_cache.ActionCache(local_cache).get(
+                    action_cache.action_key(['link out', None], ['out', 'out.map'], ['in']),
+                    ['out', 'out.map']))
+            self.assertEqual(0, self._run(self._remote('writeonly')))
+            self.assertEqual(3, call.call_count)
+
+        with open(self.server.RequestHandlerClass.storage.path(
+                'ac', action_cache.action_key(['link out', None], ['out', 'out.map'], ['in']))) as f:
+            self.assertEqual(['out', 'out.map'], [e['path'] for e in json.load(f)])
+
+    def test_unreachable_server(self):
+        self._write('in', 'input')
+        self._write('out.action', 'link out')
+        down_stamp = action_cache.remote_down_stamp(self.root)
+        remote = self._remote(url='http://127.0.0.1:1/', down_stamp=down_stamp)
+        with mock.patch.object(action_cache.subprocess, 'call', return_value=0) as call:
+            self.assertEqual(0, self._run(remote))
+            call.assert_called_once()
+        self.assertTrue(os.path.exists(down_stamp))
+        self.assertFalse(remote.readable or remote.writable)
+        # The next actions don't connect, even to a reachable server
+        remote = self._remote(down_stamp=down_stamp)
+        self.assertFalse(remote.readable or remote.writable)
+        with mock.patch.object(remote, '_connection_class') as connection_class:
+            self.assertIsNone(remote.get_action('ab' * 32))
+            connection_class.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
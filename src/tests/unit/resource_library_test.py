@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for the resource_library generators in blade.builtin_tools.
+
+"""Pin the two ways ``resource_library`` embeds a file.
+
+* The C fallback fills its hex digits in with slice assignments; the array
+  it writes must still hold exactly the input bytes, whatever the size
+  relative to the line length and the block size.
+* The ``.incbin`` stub must define the same ``RESOURCE_<name>`` and
+  ``RESOURCE_<name>_len`` symbols the resource index refers to, and quote
+  the resource path for the assembler.
+
+Assembling the stub needs a toolchain, which unit tests don't use.
+"""
+
+import os
+import re
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import builtin_tools  # noqa: E402  (sys.path tweak above)
+
+
+class ResourceGeneratorTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def _resource(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def _generate(self, resource, incbin=''):
+        output = resource + ('.S' if incbin else '.c')
+        builtin_tools.generate_resource([output, resource], incbin=incbin)
+        with open(output) as f:
+            return f.read()
+
+    def _c_array(self, source):
+        match = re.search(r'const char RESOURCE_(\w+)\[\] = \{(.*?)\};\n'
+                          r'const unsigned int RESOURCE_\1_len = (\d+);', source, re.S)
+        self.assertIsNotNone(match)
+        items = [item for item in match.group(2).split(',') if item.strip()]
+        return match.group(1), bytes(int(item, 16) for item in items), int(match.group(3))
+
+    def test_c_array_holds_the_bytes(self):
+        for size in (0, 1, 15, 16, 17, 1000):
+            data = bytes(range(256)) * (size // 256) + bytes(range(size % 256))
+            name, array, length = self._c_array(self._generate(
+                self._resource('data/file.bin', data)))
+            self.assertEqual('data_file_bin', name)
+            self.assertEqual((data, size), (array, length))
+
+    def test_c_array_lines(self):
+        source = self._generate(self._resource('data/file.bin', b'\xff' * 20))
+        self.assertIn('\n' + '0xff, ' * 15 + '0xff,\n' + '0xff, ' * 3 + '0xff,\n};', source)
+
+    def test_c_array_across_blocks(self):
+        data = os.urandom(100)
+        with mock.patch.object(builtin_tools, '_C_RESOURCE_BLOCK_SIZE', 32):
+            _, array, length = self._c_array(self._generate(self._resource('data/file.bin', data)))
+        self.assertEqual((data, 100), (array, length))
+
+    def test_incbin_stub(self):
+        source = self._generate(self._resource('data/file.bin', b'x' * 10), incbin='1')
+        self.assertIn('BLADE_RESOURCE_SYMBOL(RESOURCE_data_file_bin):\n'
+                      '    .incbin "data/file.bin"\n', source)
+        self.assertIn('BLADE_RESOURCE_SYMBOL(RESOURCE_data_file_bin_len):\n'
+                      '    .long 10\n', source)
+        self.assertIn('.note.GNU-stack', source)
+
+    def test_incbin_path_is_quoted(self):
+        source = self._generate(self._resource('data/a"b.bin', b'x'), incbin='1')
+        self.assertIn('.incbin "data/a\\"b.bin"', source)
+
+
+if __name__ == '__main__':
+    unittest.main()
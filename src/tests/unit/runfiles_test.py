@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.runfiles.
+
+"""Pin the incremental runfiles staging.
+
+* Read-only files are hardlinked to read-only objects of a content addressed
+  store, so the tests sharing a fixture share its blocks, executable ones to
+  executable objects; ``copy`` mode copies.
+* The other files are writable copies with the mode of their sources.
+* Restaging skips the entries which already match, and removes anything
+  else, such as what the last run wrote.
+* A store object changed in place through a hardlink is not linked again.
+* Store objects no runfiles dir links to are pruned.
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import file_digests  # noqa: E402  (sys.path tweak above)
+from blade import runfiles  # noqa: E402
+
+
+class RunfilesStagerTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = self._tmp.name
+        self.data = self._write('src/data.txt', 'data')
+        self.script = self._write('src/run.sh', '#!/bin/sh\n')
+        os.chmod(self.script, 0o755)
+        self.runfiles_dir = os.path.join(self.root, 'build', 't.runfiles')
+        # Reflinks depend on the file system, pin the hardlink path
+        patcher = mock.patch.object(runfiles.RunfilesStager, '_reflink', return_value=False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _write(self, path, data):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(data)
+        return path
+
+    def _stager(self, mode='auto'):
+        digests = file_digests.FileDigests(os.path.join(self.root, 'build', '.blade.file.digests'))
+        return runfiles.RunfilesStager(os.path.join(self.root, 'build', '.store'), digests, mode)
+
+    def _entries(self):
+        return {
+            'data.txt': (runfiles.READONLY_FILE, self.data),
+            'copy/data.txt': (runfiles.READONLY_FILE, self.data),
+            'run.sh': (runfiles.READONLY_FILE, self.script),
+            'writable/data.txt': (runfiles.FILE, self.data),
+            'writable/run.sh': (runfiles.FILE, self.script),
+            'lib': (runfiles.LINK, os.path.join(self.root, 'src')),
+            'empty': (runfiles.DIR, ''),
+        }
+
+    def _path(self, dest):
+        return os.path.join(self.runfiles_dir, dest)
+
+    def test_stage_from_scratch(self):
+        stager = self._stager()
+        self.assertEqual(7, stager.stage(self.runfiles_dir, self._entries()))
+        with open(self._path('copy/data.txt')) as f:
+            self.assertEqual('data', f.read())
+        st = os.stat(self._path('data.txt'))
+        self.assertEqual(st.st_ino, os.stat(self._path('copy/data.txt')).st_ino)
+        self.assertEqual(3, st.st_nlink)  # And the store object
+        self.assertEqual(0o444, st.st_mode & 0o777)
+        self.assertEqual(0o555, os.stat(self._path('run.sh')).st_mode & 0o777)
+        for dest, src in (('writable/data.txt', self.data), ('writable/run.sh', self.script)):
+            st = os.stat(self._path(dest))
+            self.assertEqual(1, st.st_nlink)
+            self.assertEqual(os.stat(src).st_mode, st.st_mode)
+            self.assertTrue(st.st_mode & 0o200)
+        self.assertEqual(os.path.join(self.root, 'src'), os.readlink(self._path('lib')))
+        self.assertTrue(os.path.isdir(self._path('empty')))
+
+    def test_copy_mode(self):
+        self._stager('copy').stage(self.runfiles_dir, self._entries())
+        self.assertEqual(1, os.stat(self._path('data.txt')).st_nlink)
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'build', '.store')))
+
+    def test_restage_is_incremental(self):
+        stager = self._stager()
+        stager.stage(self.runfiles_dir, self._entries())
+        self._write('build/t.runfiles/blade-test.log', 'log')
+        self._write('build/t.runfiles/empty/output/result.txt', 'output')
+        self.assertEqual(0, stager.stage(self.runfiles_dir, self._entries()))
+        self.assertEqual(['copy', 'data.txt', 'empty', 'lib', 'run.sh', 'writable'],
+                         sorted(os.listdir(self.runfiles_dir)))
+        self.assertEqual([], os.listdir(self._path('empty')))
+
+        entries = self._entries()
+        del entries['copy/data.txt']
+        entries['lib'] = (runfiles.LINK, self.data)
+        self.assertEqual(1, stager.stage(self.runfiles_dir, entries))
+        self.assertEqual(['data.txt', 'empty', 'lib', 'run.sh', 'writable'],
+                         sorted(os.listdir(self.runfiles_dir)))
+        self.assertEqual(self.data, os.readlink(self._path('lib')))
+
+    def test_changed_store_object_is_not_linked(self):
+        stager = self._stager()
+        stager.stage(self.runfiles_dir, self._entries())
+        # A test running as root can write it in place
+        path = self._path('data.txt')
+        os.chmod(path, 0o644)
+        with open(path, 'w') as f:
+            f.write('changed')
+        stager.stage(self.runfiles_dir, self._entries())
+        for dest in ('data.txt', 'copy/data.txt'):
+            with open(self._path(dest)) as f:
+                self.assertEqual('data', f.read())
+
+    def test_written_file_is_restaged(self):
+        stager = self._stager()
+        stager.stage(self.runfiles_dir, self._entries())
+        with open(self._path('writable/data.txt'), 'w') as f:
+            f.write('changed')
+        self.assertEqual(1, stager.stage(self.runfiles_dir, self._entries()))
+        with open(self._path('writable/data.txt')) as f:
+            self.assertEqual('data', f.read())
+
+    def test_prune(self):
+        stager = self._stager()
+        stager.stage(self.runfiles_dir, self._entries())
+        store_dir = os.path.join(self.root, 'build', '.store')
+        stager.prune()
+        self.assertEqual(2, sum(len(files) for _, _, files in os.walk(store_dir)))
+        stager.stage(self.runfiles_dir, {})
+        stager.prune()
+        self.assertEqual(0, sum(len(files) for _, _, files in os.walk(store_dir)))
+
+
+if __name__ == '__main__':
+    unittest.main()
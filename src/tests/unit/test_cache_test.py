@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.test_cache.
+
+"""Pin the content addressed test result cache.
+
+* The key follows the content of the files and the extra data, not their
+  mtimes or the dirs they are in, so another build dir hits it.
+* Only passed results are returned, with the stored log.
+* Over the size limit, the least recently used entries are removed first.
+* The key of a py_test or a sh_test follows the code its wrapper runs.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import unittest
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import file_digests  # noqa: E402  (sys.path tweak above)
+from blade import test_cache  # noqa: E402
+from blade import test_runner  # noqa: E402
+from blade import test_scheduler  # noqa: E402
+
+
+def _result(exit_code=0, cost_time=2.0):
+    return test_scheduler.TestRunResult(exit_code=exit_code, start_time=100.0,
+                                        cost_time=cost_time)
+
+
+class TestResultCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.root = self._tmp.name
+        self.cache_dir = os.path.join(self.root, 'cache')
+
+    def _cache(self, max_size=1 << 20):
+        digests = file_digests.FileDigests(os.path.join(self.root, '.blade.file.digests'))
+        return test_cache.TestResultCache(self.cache_dir, max_size, digests)
+
+    def _write(self, path, data):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(data)
+        return path
+
+    def test_key_follows_content(self):
+        cache = self._cache()
+        binary = self._write('a/t', 'binary')
+        data = self._write('a/data/input.txt', 'input')
+        key = cache.key('pkg:t', [binary], [os.path.dirname(data)], {'args': []})
+        # The same content in another build dir
+        other_binary = self._write('b/t', 'binary')
+        other_data = self._write('b/data/input.txt', 'input')
+        self.assertEqual(key, cache.key('pkg:t', [other_binary], [os.path.dirname(other_data)],
+                                        {'args': []}))
+        self.assertNotEqual(key, cache.key('pkg:t', [binary], [], {'args': []}))
+        self.assertNotEqual(key, cache.key('pkg:t', [binary], [os.path.dirname(data)],
+                                           {'args': ['--v']}))
+        self._write('a/data/input.txt', 'changed')
+        self.assertNotEqual(key, cache.key('pkg:t', [binary], [os.path.dirname(data)],
+                                           {'args': []}))
+
+    def test_put_and_get(self):
+        cache = self._cache()
+        log = self._write('t.runfiles/blade-test.log', 'ok\n')
+        self.assertIsNone(cache.get('ab' * 32))
+        cache.put('ab' * 32, _result(), [log])
+        cache.put('cd' * 32, _result(exit_code=1), [log])
+        hit = cache.get('ab' * 32)
+        self.assertIsNotNone(hit)
+        assert hit is not None  # For the type checker
+        run_result, cached_log = hit
+        self.assertEqual((0, 2.0), (run_result.exit_code, run_result.cost_time))
+        with open(cached_log) as f:
+            self.assertEqual('ok\n', f.read())
+        self.assertIsNone(cache.get('cd' * 32))
+        self.assertEqual((1, 1), (cache.hits, cache.puts - 1))
+
+    def test_lru_eviction(self):
+        cache = self._cache(max_size=1000)
+        log = self._write('blade-test.log', 'x' * 400)
+        for index, key in enumerate(('aa' * 32, 'bb' * 32, 'cc' * 32)):
+            cache.put(key, _result(), [log])
+            os.utime(cache._entry_dir(key), (index, index))
+        cache.get('aa' * 32)  # The oldest one is used again
+        cache.evict()
+        self.assertIsNotNone(cache.get('aa' * 32))
+        self.assertIsNone(cache.get('bb' * 32))
+        self.assertIsNotNone(cache.get('cc' * 32))
+
+
+class _Target:
+
+    def __init__(self, type, srcs=()):
+        self.type = type
+        self.name = 't'
+        self.path = 'pkg'
+        self.key = 'pkg:t'
+        self.srcs = list(srcs)
+        self.attr = {'testdata': []}
+
+
+class TestCacheKeyTest(unittest.TestCase):
+    """The wrappers of py_test and sh_test don't change with the code they run."""
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        cwd = os.getcwd()
+        os.chdir(self._tmp.name)
+        self.addCleanup(os.chdir, cwd)
+
+    def _write(self, path, data):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(data)
+
+    def _key(self, target):
+        runner = test_runner.TestRunner.__new__(test_runner.TestRunner)
+        runner.build_dir = 'build64_release'
+        runner.options = argparse.Namespace(args=[])
+        runner.test_history = {'env': {}}
+        runner.test_cache_keys = {}
+        runner.test_cache = test_cache.TestResultCache(
+                'cache', 1 << 20, file_digests.FileDigests('.blade.file.digests'))
+        return runner._test_cache_key(target)
+
+    def test_py_test(self):
+        target = _Target('py_test')
+        self._write('build64_release/pkg/t', 'wrapper')
+        self._write('build64_release/pkg/t.zip', 'code')
+        key = self._key(target)
+        self._write('build64_release/pkg/t.zip', 'changed code')
+        self.assertNotEqual(key, self._key(target))
+
+    def test_sh_test(self):
+        target = _Target('sh_test', ['t.sh'])
+        self._write('build64_release/pkg/t', 'wrapper')
+        self._write('pkg/t.sh', 'exit 0')
+        key = self._key(target)
+        self._write('pkg/t.sh', 'exit 1 # changed')
+        self.assertNotEqual(key, self._key(target))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for blade.test_history.
+
+"""Pin the SQLite test history store.
+
+* Items round-trip unchanged, and saving only touches the tests passed in.
+* Runs and pass/fail flips are counted per test, for the flakiest query.
+* The old ``repr`` history file is migrated once, then removed.
+* A corrupt database is discarded with a warning rather than failing.
+* The resource usage is kept, and a history of the first schema is
+  upgraded in place.
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import test_history  # noqa: E402  (sys.path tweak above)
+from blade import test_scheduler  # noqa: E402
+
+
+def _item(exit_code=0, start_time=100.0, cost_time=1.0, fail_count=0, max_rss=0):
+    return test_history.TestHistoryItem(
+        job=test_history.TestJob(reason='NO_HISTORY', binary_md5='b', testdata_md5='d',
+                                 env_md5='e', args=['--v']),
+        first_fail_time=start_time if exit_code else 0,
+        fail_count=fail_count,
+        result=test_scheduler.TestRunResult(exit_code=exit_code, start_time=start_time,
+                                            cost_time=cost_time, max_rss=max_rss))
+
+
+class TestHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.path = os.path.join(self._tmp.name, '.blade.test.db')
+        self.legacy_path = os.path.join(self._tmp.name, '.blade.test.stamp')
+
+    def _open(self):
+        history = test_history.TestHistory(self.path, self.legacy_path)
+        self.addCleanup(history.close)
+        return history, history.load()
+
+    def test_round_trip_and_point_update(self):
+        history, (items, env) = self._open()
+        self.assertEqual(({}, {}), (items, env))
+        history.save({'LANG': 'C'}, {'a:t': _item(), 'b:t': _item(exit_code=1, fail_count=1)})
+        history.save({'LANG': 'C'}, {'a:t': _item(cost_time=2.0)})
+        history.close()
+        _, (items, env) = self._open()
+        self.assertEqual({'LANG': 'C'}, env)
+        self.assertEqual(_item(cost_time=2.0), items['a:t'])
+        self.assertEqual(_item(exit_code=1, fail_count=1), items['b:t'])
+
+    def test_queries(self):
+        history, _ = self._open()
+        history.save({}, {'fast:t': _item(cost_time=1.0, start_time=100.0),
+                          'slow:t': _item(cost_time=9.0, start_time=100.0),
+                          'old:t': _item(cost_time=20.0, start_time=50.0)})
+        for exit_code in (1, 0, 1):
+            history.save({}, {'flaky:t': _item(exit_code=exit_code)})
+        history.save({}, {'fast:t': _item(exit_code=1)})
+        self.assertEqual([(9.0, 'slow:t')], history.slower_than(5.0, since=100.0))
+        self.assertEqual([(20.0, 'old:t'), (9.0, 'slow:t')], history.slowest(2))
+        self.assertEqual([(2, 3, 'flaky:t'), (1, 2, 'fast:t')], history.flakiest(10))
+
+    def test_legacy_history_is_migrated(self):
+        legacy = {'items': {'a:t': _item()}, 'env': {'LANG': 'C'}}
+        with open(self.legacy_path, 'w') as f:
+            f.write(str(legacy))
+        _, (items, env) = self._open()
+        self.assertEqual(({'a:t': _item()}, {'LANG': 'C'}), (items, env))
+        self.assertFalse(os.path.exists(self.legacy_path))
+
+    def test_corrupt_history_is_discarded(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'not a database' * 100)
+        history, (items, env) = self._open()
+        self.assertEqual(({}, {}), (items, env))
+        history.save({}, {'a:t': _item()})
+        self.assertEqual([(1.0, 'a:t')], history.slowest(1))
+
+
+    def test_resource_usage(self):
+        history, _ = self._open()
+        history.save({}, {'big:t': _item(max_rss=4096), 'small:t': _item(max_rss=1024),
+                          'unknown:t': _item()})
+        self.assertEqual([(4096, 'big:t'), (1024, 'small:t')], history.most_memory(10))
+        history.close()
+        _, (items, _) = self._open()
+        self.assertEqual(_item(max_rss=4096), items['big:t'])
+
+    def test_first_schema_is_upgraded(self):
+        db = sqlite3.connect(self.path)
+        db.executescript('''
+            CREATE TABLE tests (
+                key TEXT PRIMARY KEY, reason TEXT, binary_md5 TEXT, testdata_md5 TEXT,
+                env_md5 TEXT, args TEXT, first_fail_time REAL, fail_count INTEGER,
+                exit_code INTEGER, start_time REAL, cost_time REAL,
+                run_count INTEGER NOT NULL DEFAULT 0, flip_count INTEGER NOT NULL DEFAULT 0);
+            INSERT INTO tests VALUES ('a:t', 'NO_HISTORY', 'b', 'd', 'e', '["--v"]',
+                                      0, 0, 0, 100.0, 1.0, 1, 0);
+            PRAGMA user_version = 1;
+        ''')
+        db.close()
+        history, (items, _) = self._open()
+        self.assertEqual(_item(), items['a:t'])
+        history.save({}, {'a:t': _item(max_rss=2048)})
+        self.assertEqual([(2048, 'a:t')], history.most_memory(1))
+
+
+if __name__ == '__main__':
+    unittest.main()
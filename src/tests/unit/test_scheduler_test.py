@@ -4,7 +4,7 @@
 #
 # Unit tests for blade.test_scheduler.
 
-"""Unit tests for the test scheduler's timeout logic.
+"""Unit tests for the test scheduler's timeout logic and job order.
 
 These tests pin down the documented semantics of
 ``global_config.test_timeout``: a value of 0 (or any non-positive value)
@@ -18,6 +18,8 @@ the first tick.
 
 import os
 import sys
+import threading
+import time
 import unittest  # lgtm[py/import-and-import-from]
 from unittest import mock
 
@@ -111,6 +113,45 @@ class CheckJobTimeoutTest(unittest.TestCase):
         _terminate_mock(t).assert_not_called()
 
 
+class TimeoutHeapTest(unittest.TestCase):
+    """Pin that timeouts fire from the heap, without polling."""
+
+    def _scheduler_with(self, *workers):
+        scheduler = test_scheduler.TestScheduler([], 2)
+        for t in workers:
+            t.finished = False
+            scheduler._notify(t)
+        return scheduler
+
+    def test_waits_until_the_earliest_deadline(self):
+        late = _make_worker(timeout=30, start_time=1000.0)
+        early = _make_worker(timeout=10, start_time=1000.0)
+        scheduler = self._scheduler_with(late, early)
+        self.assertTrue(scheduler.worker_event.is_set())
+        self.assertEqual(4.0, scheduler._check_timeouts(1006.0))
+        _terminate_mock(early).assert_not_called()
+        self.assertEqual(19.0, scheduler._check_timeouts(1011.0))
+        _terminate_mock(early).assert_called_once()
+        _terminate_mock(late).assert_not_called()
+        self.assertIsNone(scheduler._check_timeouts(1031.0))
+        _terminate_mock(late).assert_called_once()
+
+    def test_deadline_of_a_finished_job_is_ignored(self):
+        t = _make_worker(timeout=10, start_time=1000.0)
+        scheduler = self._scheduler_with(t)
+        t.job_start_time = 1005.0  # The worker moved on to another job
+        scheduler._check_timeouts(1011.0)
+        _terminate_mock(t).assert_not_called()
+
+    def test_exiting_worker_only_wakes_up(self):
+        t = _make_worker(timeout=10, start_time=1000.0)
+        t.finished = True
+        scheduler = test_scheduler.TestScheduler([], 2)
+        scheduler._notify(t)
+        self.assertTrue(scheduler.worker_event.is_set())
+        self.assertEqual([], scheduler.timeouts)
+
+
 class ConfigDefaultTest(unittest.TestCase):
     """Pin the default value so the scheduler fix stays coherent with config."""
 
@@ -124,5 +165,217 @@ class ConfigDefaultTest(unittest.TestCase):
         self.assertEqual(c.get_section('global_config')['test_timeout'], 0)
 
 
+class _Target:
+    def __init__(self, key, type='cc_test', exclusive=False, **attr):
+        self.key = key
+        self.type = type
+        self.attr = dict(attr, exclusive=exclusive)
+
+
+def _job(key, shard=None, **kwargs):
+    return (_Target(key, **kwargs), '', {}, [], shard)
+
+
+class LongestFirstTest(unittest.TestCase):
+    """Pin the history-driven job order and makespan prediction."""
+
+    def _scheduler(self, jobs, costs, num_jobs=2):
+        return test_scheduler.TestScheduler(jobs, num_jobs, test_costs=costs)
+
+    def test_unknown_test_gets_median_of_its_type(self):
+        jobs = [_job('a'), _job('b'), _job('c'), _job('new'),
+                _job('py', type='py_test'), _job('new_py', type='py_test')]
+        costs = {'a': 1.0, 'b': 5.0, 'c': 9.0, 'py': 3.0}
+        predicted = self._scheduler(jobs, costs)._predict_costs(jobs)
+        self.assertEqual(5.0, predicted['new'])
+        self.assertEqual(3.0, predicted['new_py'])
+
+    def test_no_history_uses_default(self):
+        jobs = [_job('a')]
+        predicted = self._scheduler(jobs, {})._predict_costs(jobs)
+        self.assertEqual(test_scheduler._DEFAULT_TEST_COST, predicted['a'])
+
+    def test_makespan(self):
+        makespan = test_scheduler.TestScheduler._makespan
+        self.assertEqual(10.0, makespan([10.0, 4.0, 3.0, 3.0], 2))
+        # Shortest first leaves the slow test for last.
+        self.assertEqual(13.0, makespan([3.0, 3.0, 4.0, 10.0], 2))
+        self.assertEqual(0.0, makespan([], 2))
+
+    def test_queue_is_longest_first(self):
+        jobs = [_job('fast'), _job('slow'), _job('excl', exclusive=True), _job('mid')]
+        scheduler = self._scheduler(jobs, {'fast': 1.0, 'slow': 8.0, 'mid': 3.0, 'excl': 2.0})
+        handled = []
+        with mock.patch.object(scheduler, '_process_job',
+                               side_effect=lambda job, *args: handled.append(job[0].key)), \
+                mock.patch.object(scheduler, '_wait_worker_threads',
+                                  side_effect=lambda threads: [t.join() for t in threads]):
+            scheduler.num_jobs = 1
+            scheduler.schedule_jobs()
+        self.assertEqual(['slow', 'mid', 'fast', 'excl'], handled)
+        self.assertEqual(14.0, scheduler.predicted_makespan)
+
+    def test_shard_cost_is_a_part_of_the_test(self):
+        jobs = [_job('big', shard=(i, 4)) for i in range(4)]
+        scheduler = self._scheduler(jobs, {'big': 8.0})
+        predicted = scheduler._predict_costs(jobs)
+        self.assertEqual(2.0, scheduler._job_cost(predicted, jobs[0]))
+
+
+class ShardResultTest(unittest.TestCase):
+    """Pin how the results of the shards of a test are merged."""
+
+    def test_merged_when_all_shards_finished(self):
+        scheduler = test_scheduler.TestScheduler([], 2)
+        result = test_scheduler.TestRunResult
+        self.assertIsNone(scheduler._merge_shard_result('t', 3, result(0, 10.0, 2.0)))
+        self.assertIsNone(scheduler._merge_shard_result('t', 3, result(1, 9.0, 3.0)))
+        merged = scheduler._merge_shard_result('t', 3, result(2, 11.0, 4.0))
+        self.assertEqual(result(exit_code=1, start_time=9.0, cost_time=9.0), merged)
+
+    def test_process_job_records_the_test_once(self):
+        scheduler = test_scheduler.TestScheduler([], 2)
+        with mock.patch.object(scheduler, '_run_job', return_value=(0, None)):
+            scheduler._process_job(_job('t', shard=(0, 2)), False, None)
+            self.assertEqual({}, scheduler.passed_run_results)
+            scheduler._process_job(_job('t', shard=(1, 2)), False, None)
+        self.assertEqual(['t'], list(scheduler.passed_run_results))
+        self.assertEqual(2, scheduler.num_of_finished_tests)
+
+    def test_resource_usage_of_shards(self):
+        scheduler = test_scheduler.TestScheduler([], 2)
+        rusage = mock.Mock(ru_maxrss=2048, ru_utime=1.5, ru_stime=0.5,
+                           ru_inblock=10, ru_oublock=20)
+        with mock.patch.object(scheduler, '_run_job', return_value=(0, rusage)), \
+                mock.patch.object(test_scheduler.sys, 'platform', 'linux'):
+            scheduler._process_job(_job('t', shard=(0, 2)), False, None)
+            rusage.ru_maxrss = 1024
+            scheduler._process_job(_job('t', shard=(1, 2)), False, None)
+        result = scheduler.passed_run_results['t']
+        self.assertEqual((2048, 3.0, 1.0, 20, 40),
+                         (result.max_rss, result.user_time, result.system_time,
+                          result.read_blocks, result.write_blocks))
+
+
+class ResourcePoolTest(unittest.TestCase):
+    """Pin how the declared cores, memory and locks limit concurrent tests."""
+
+    def test_demand_is_clamped_to_the_host(self):
+        pool = test_scheduler.ResourcePool(cpu=4, memory=1000)
+        big = _Target('big', test_cpu=16, test_memory=4096)
+        self.assertTrue(pool.acquire(big))
+        self.assertEqual((4, 1000), (pool.used_cpu, pool.used_memory))
+        self.assertFalse(pool._available(*pool._demand(_Target('small'))))
+        pool.release(big)
+        self.assertEqual((0, 0), (pool.used_cpu, pool.used_memory))
+
+    def test_memory_sizes(self):
+        from blade.target import _parse_memory_size
+        self.assertEqual(512, _parse_memory_size(512))
+        self.assertEqual(512, _parse_memory_size('512M'))
+        self.assertEqual(1536, _parse_memory_size('1.5GiB'))
+        self.assertEqual(1, _parse_memory_size('100k'))
+        for invalid in ('lots', -1, True, '4X'):
+            self.assertIsNone(_parse_memory_size(invalid))
+
+    def test_unknown_memory_is_not_limited(self):
+        pool = test_scheduler.ResourcePool(cpu=4, memory=0)
+        self.assertTrue(pool.acquire(_Target('a', test_memory=4096)))
+        self.assertTrue(pool._available(*pool._demand(_Target('b', test_memory=4096))))
+
+    def test_cancel_fails_waiting_acquire(self):
+        pool = test_scheduler.ResourcePool(cpu=1, memory=0)
+        pool.acquire(_Target('a'))
+        pool.cancel()
+        self.assertFalse(pool.acquire(_Target('b')))
+
+    def _max_concurrency(self, jobs, pool, num_jobs=4):
+        scheduler = test_scheduler.TestScheduler(jobs, num_jobs, resource_pool=pool)
+        lock = threading.Lock()
+        running, max_running = [0], [0]
+
+        def process_job(job, redirect, thread):
+            with lock:
+                running[0] += 1
+                max_running[0] = max(max_running[0], running[0])
+            time.sleep(0.05)
+            with lock:
+                running[0] -= 1
+
+        with mock.patch.object(scheduler, '_process_job', side_effect=process_job):
+            scheduler.schedule_jobs()
+        return max_running[0]
+
+    def test_jobs_are_packed_by_resources(self):
+        pool = test_scheduler.ResourcePool(cpu=8, memory=1000)
+        jobs = [_job(str(i), test_memory=400) for i in range(4)]
+        self.assertEqual(2, self._max_concurrency(jobs, pool))
+        jobs = [_job(str(i), test_cpu=3) for i in range(4)]
+        self.assertEqual(2, self._max_concurrency(jobs, pool))
+        jobs = [_job(str(i)) for i in range(6)]
+        self.assertEqual(4, self._max_concurrency(jobs, pool))  # Capped by -j
+
+    def test_tests_with_the_same_lock_run_one_by_one(self):
+        pool = test_scheduler.ResourcePool(cpu=8, memory=0)
+        jobs = [_job(str(i), test_lock='db') for i in range(3)]
+        self.assertEqual(1, self._max_concurrency(jobs, pool))
+
+    def test_waiting_jobs_are_backfilled(self):
+        pool = test_scheduler.ResourcePool(cpu=8, memory=0)
+        jobs = ([_job('locked%d' % i, test_lock='db') for i in range(3)] +
+                [_job('free%d' % i) for i in range(3)])
+        # The locked ones don't hold the workers from the free ones
+        self.assertEqual(4, self._max_concurrency(jobs, pool))
+        self.assertEqual([], pool.deferred)
+
+
+class PipelinedJobsTest(unittest.TestCase):
+    """Pin the jobs added to the started workers while the tests are built."""
+
+    def _scheduler(self, num_jobs, process_job):
+        scheduler = test_scheduler.TestScheduler(
+                [], num_jobs, resource_pool=test_scheduler.ResourcePool(cpu=8, memory=0))
+        patcher = mock.patch.object(scheduler, '_process_job', side_effect=process_job)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return scheduler
+
+    def test_added_jobs_run_exclusive_ones_last(self):
+        processed = []
+        scheduler = self._scheduler(2, lambda job, redirect, thread: processed.append(job[0].key))
+        scheduler.start()
+        scheduler.add_jobs([_job('a'), _job('x', exclusive=True)])
+        scheduler.add_jobs([_job('b')])
+        scheduler.finish()
+        self.assertEqual(['a', 'b'], sorted(processed[:2]))
+        self.assertEqual('x', processed[-1])
+        self.assertEqual(3, len(scheduler.tests_list))
+
+    def test_deferred_jobs_run_after_the_last_job(self):
+        processed = []
+        scheduler = self._scheduler(2, lambda job, redirect, thread: processed.append(job[0].key))
+        scheduler.start()
+        scheduler.add_jobs([_job(str(i), test_lock='db') for i in range(4)])
+        scheduler.finish()
+        self.assertEqual(['0', '1', '2', '3'], sorted(processed))
+
+    def test_cancel_drops_the_jobs_not_started(self):
+        started, proceed = threading.Event(), threading.Event()
+        processed = []
+
+        def process_job(job, redirect, thread):
+            started.set()
+            proceed.wait(5)
+            processed.append(job[0].key)
+
+        scheduler = self._scheduler(1, process_job)
+        scheduler.start()
+        scheduler.add_jobs([_job('a'), _job('b'), _job('x', exclusive=True)])
+        started.wait(5)
+        threading.Timer(0.1, proceed.set).start()
+        scheduler.finish(cancel=True)
+        self.assertEqual(['a'], processed)
+
+
 if __name__ == '__main__':
     unittest.main()
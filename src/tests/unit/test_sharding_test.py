@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# Copyright (c) 2026 The Blade Authors.
+# All rights reserved.
+#
+# Unit tests for test sharding in blade.test_runner.
+
+"""Pin how ``TestRunner`` splits a test into shards.
+
+* An explicit ``shard_count`` wins; otherwise only a ``cc_test`` whose last
+  run exceeded ``global_config.test_shard_time`` is split, at most into one
+  shard per test job.
+* Exclusive tests and coverage runs are never split.
+* Each shard gets the gtest and generic shard variables and a run dir of its
+  own, whose entries link back to the runfiles dir.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# Make ``import blade.*`` resolve against the in-tree sources without
+# requiring blade to be installed.
+_REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+sys.path.insert(0, os.path.join(_REPO_ROOT, 'src'))
+
+from blade import test_runner  # noqa: E402  (sys.path tweak above)
+from blade import test_scheduler  # noqa: E402
+
+
+class _Target:
+    def __init__(self, type='cc_test', **attr):
+        self.key = 'pkg:t'
+        self.type = type
+        self.attr = attr
+
+
+def _runner(cost_time=None, coverage=False, test_jobs_num=4):
+    runner = test_runner.TestRunner.__new__(test_runner.TestRunner)
+    runner.options = argparse.Namespace(coverage=coverage)
+    runner.test_history = {'items': {}}
+    if cost_time is not None:
+        runner.test_history['items']['pkg:t'] = test_runner.TestHistoryItem(
+            job=None, first_fail_time=0, fail_count=0,
+            result=test_scheduler.TestRunResult(exit_code=0, start_time=0, cost_time=cost_time))
+    runner._TestRunner__test_jobs_num = test_jobs_num
+    return runner
+
+
+def _shard_time(seconds):
+    return mock.patch.object(test_runner.config, 'get_item', return_value=seconds)
+
+
+class ShardCountTest(unittest.TestCase):
+
+    def test_explicit_count(self):
+        self.assertEqual(3, _runner()._shard_count(_Target('sh_test', shard_count=3)))
+
+    def test_automatic_from_history(self):
+        with _shard_time(60):
+            self.assertEqual(3, _runner(cost_time=150)._shard_count(_Target()))
+            self.assertEqual(4, _runner(cost_time=900)._shard_count(_Target()))
+            self.assertEqual(1, _runner(cost_time=30)._shard_count(_Target()))
+            self.assertEqual(1, _runner()._shard_count(_Target()))
+            # Other tests may not honor the protocol.
+            self.assertEqual(1, _runner(cost_time=900)._shard_count(_Target('py_test')))
+        with _shard_time(0):
+            self.assertEqual(1, _runner(cost_time=900)._shard_count(_Target()))
+
+    def test_never_sharded(self):
+        self.assertEqual(1, _runner()._shard_count(_Target(shard_count=3, exclusive=True)))
+        self.assertEqual(1, _runner(coverage=True)._shard_count(_Target(shard_count=3)))
+
+
+class ShardJobsTest(unittest.TestCase):
+
+    def test_shard_jobs(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            run_dir = os.path.join(tmpdir, 't.runfiles')
+            os.makedirs(os.path.join(run_dir, 'data'))
+            with open(os.path.join(run_dir, 'data', 'input.txt'), 'w') as f:
+                f.write('x')
+            target = _Target(shard_count=2)
+            jobs = _runner()._shard_jobs(target, run_dir, {'PATH': '/bin'}, ['t'])
+            self.assertEqual(2, len(jobs))
+            for index, (job_target, shard_dir, env, cmd, shard) in enumerate(jobs):
+                self.assertIs(target, job_target)
+                self.assertEqual(['t'], cmd)
+                self.assertEqual((index, 2), shard)
+                self.assertEqual('%s.shard%d' % (run_dir, index), shard_dir)
+                self.assertTrue(os.path.isfile(os.path.join(shard_dir, 'data', 'input.txt')))
+                self.assertEqual({'PATH': '/bin',
+                                  'GTEST_TOTAL_SHARDS': '2', 'GTEST_SHARD_INDEX': str(index),
+                                  'TEST_TOTAL_SHARDS': '2', 'TEST_SHARD_INDEX': str(index)}, env)
+
+    def test_unsharded_job(self):
+        jobs = _runner()._shard_jobs(_Target(), 'run', {}, ['t'])
+        self.assertEqual([(jobs[0][0], 'run', {}, ['t'], None)], jobs)
+
+
+if __name__ == '__main__':
+    unittest.main()